@@ -1,19 +1,40 @@
-from datetime import datetime
-from flask_openapi3 import OpenAPI, Info, Tag
-from flask import redirect
+from datetime import datetime, timedelta
+from flask_openapi3 import APIBlueprint, OpenAPI, Info, Tag
+from flask import redirect, request, Response, after_this_request,\
+                  stream_with_context, g
 from urllib.parse import unquote
 
 from sqlalchemy.exc import IntegrityError
 
-from model import Session, Agendamento, Cliente, Profissional, Servico
-from logger import logger
+from model import Session, Agendamento, Cliente, Profissional, Servico,\
+                  consulta_agendamentos, consulta_linhas_agendamentos,\
+                  pagina_keyset, engine, migra,\
+                  verifica_versao, versoes_tabelas, insere_agendamentos,\
+                  atualiza_agendamentos, exclui_agendamentos, conflito_agenda,\
+                  horarios_livres, inicia_medicao, encerra_medicao,\
+                  medicao_atual, observadores_espera, observadores_bloqueio,\
+                  gera_dados, reconstroi_resumo, faturamento, ocupacao,\
+                  busca_nomes, exclui_com_agendamentos, TAMANHO_LOTE_EXCLUSAO,\
+                  excede_limite_exclusao, LIMITE_EXCLUSAO_ROTA,\
+                  cria_diretorio_base
+from logger import logger, logger_acesso, configura_log
+from cache import cache
+from metricas import metricas
+from serializacao import CodificadorJSON, resposta_json
+import perfilador
+import hashlib
+import json
+import logging
+import time
 from schemas import *
 from flask_cors import CORS
+import click
 
 
 info = Info(title="Minha API", version="1.0.0")
-app = OpenAPI(__name__, info=info)
-CORS(app)
+# as rotas são registradas no blueprint e a aplicação é criada apenas
+# quando create_app() é chamada (flask run, gunicorn "app:create_app()")
+api = APIBlueprint("api", __name__, cli_group=None)
 
 # definindo tags
 home_tag = Tag(name="Documentação",
@@ -34,9 +55,274 @@ profissional_tag = Tag(
 servico_tag = Tag(
     name="Servico", description="Adição, visualização,\
                                  edição e remoção de serviços à base")
+relatorio_tag = Tag(
+    name="Relatorio", description="Faturamento e ocupação por dia, lidos\
+                                   do resumo de agendamentos")
 
 
-@app.get('/', tags=[home_tag])
+class AplicacaoAPI(OpenAPI):
+    """Aplicação OpenAPI que serializa as respostas em dicionário com o
+    codificador json configurado (serializacao.resposta_json) no lugar do
+    jsonify.
+    """
+    json_encoder = CodificadorJSON
+
+    def make_response(self, rv):
+        if isinstance(rv, dict):
+            rv = resposta_json(rv)
+        elif isinstance(rv, tuple) and rv and isinstance(rv[0], dict):
+            rv = (resposta_json(rv[0]),) + rv[1:]
+        return super().make_response(rv)
+
+
+def create_app():
+    """Cria a aplicação da API.
+
+    Os diretórios da base e dos logs e as threads do log são criados aqui,
+    e não na importação. A conexão com a base de dados só é aberta na
+    primeira requisição.
+    """
+    cria_diretorio_base()
+    configura_log()
+    app = AplicacaoAPI(__name__, info=info)
+    CORS(app)
+    app.register_api(api)
+    # fora do blueprint para não aparecer na documentação OpenAPI
+    app.add_url_rule("/metrics", "metrics", exporta_metricas)
+    return app
+
+
+# métricas coletadas pelo /metrics
+metricas.histograma("http_request_duration_seconds",
+                    "Duração das requisições por rota")
+metricas.contador("http_request_errors_total",
+                  "Respostas com erro (status >= 400) por rota")
+metricas.histograma("db_pool_checkout_wait_seconds",
+                    "Espera por uma conexão livre do pool",
+                    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1,
+                             0.5, 1.0, 5.0, 30.0))
+metricas.contador("sqlite_lock_errors_total",
+                  "Comandos recusados pelo sqlite por bloqueio da base")
+observadores_espera.append(
+    lambda espera: metricas.observa("db_pool_checkout_wait_seconds", espera))
+observadores_bloqueio.append(
+    lambda: metricas.incrementa("sqlite_lock_errors_total"))
+
+
+def exporta_metricas():
+    """Retorna as métricas no formato de texto do Prometheus."""
+    return Response(metricas.exporta(),
+                    mimetype="text/plain; version=0.0.4")
+
+
+@api.before_app_first_request
+def confere_versao_base():
+    """Confere, uma única vez por worker, se a base já recebeu todas as
+       migrações. As migrações são aplicadas pelo comando 'flask migrate'.
+    """
+    try:
+        verifica_versao(engine)
+    except RuntimeError as e:
+        logger.error(str(e))
+        raise
+
+
+@api.cli.command("migrate")
+def migrate():
+    """Aplica as migrações pendentes na base de dados."""
+    aplicadas = migra(engine)
+    for versao, descricao in aplicadas:
+        click.echo(f"Migração {versao} aplicada: {descricao}")
+    if not aplicadas:
+        click.echo("A base de dados já está atualizada.")
+
+
+@api.cli.command("rebuild-resumo")
+def rebuild_resumo():
+    """Refaz o resumo de agendamentos usado pelos relatórios."""
+    verifica_versao(engine)
+    comeco = time.perf_counter()
+    linhas = reconstroi_resumo(engine)
+    click.echo(f"Resumo refeito com {linhas} linhas em "
+               f"{time.perf_counter() - comeco:.1f} s")
+
+
+@api.cli.command("purge")
+@click.argument("cadastro", type=click.Choice(["cliente", "profissional"]))
+@click.argument("codigo", type=int)
+@click.option("--lote", default=TAMANHO_LOTE_EXCLUSAO, show_default=True,
+              help="agendamentos excluídos por transação")
+def purge(cadastro, codigo, lote):
+    """Exclui um cliente ou profissional e os seus agendamentos em lotes."""
+    verifica_versao(engine)
+    modelo = Cliente if cadastro == "cliente" else Profissional
+    comeco = time.perf_counter()
+    with engine.connect() as conexao:
+        excluido, agendamentos = exclui_com_agendamentos(conexao, modelo,
+                                                         codigo, lote)
+    if not excluido:
+        raise click.ClickException(f"{cadastro} {codigo} não encontrado")
+    cache.invalida(cadastro)
+    click.echo(f"{cadastro} {codigo} excluído com {agendamentos} "
+               f"agendamentos em {time.perf_counter() - comeco:.1f} s")
+
+
+@api.before_app_request
+def inicia_requisicao():
+    """Marca o início da requisição e da medição dos comandos SQL."""
+    g.inicio_requisicao = time.perf_counter()
+    inicia_medicao()
+
+
+def conta_registros(dados):
+    """Quantidade de registros devolvidos: o tamanho das listas de uma
+       listagem ou 1 para um único registro.
+    """
+    if isinstance(dados, list):
+        return len(dados)
+    if not isinstance(dados, dict):
+        return 0
+    listas = [valor for valor in dados.values() if isinstance(valor, list)]
+    return sum(len(lista) for lista in listas) if listas else 1
+
+
+@api.after_app_request
+def registra_acesso(response):
+    """Grava um registro json no log de acesso com a rota, o status, a
+       duração, a quantidade e o tempo dos comandos SQL e a quantidade de
+       registros devolvidos pela requisição.
+
+    Nas respostas em streaming a duração não inclui o envio do corpo.
+    """
+    medicao = encerra_medicao()
+    inicio = g.get("inicio_requisicao")
+    if inicio is None or not logger_acesso.isEnabledFor(logging.INFO):
+        return response
+    registros = None
+    if response.status_code >= 400:
+        registros = 0
+    elif hasattr(response, "dados"):
+        # resposta montada por serializacao.resposta_json
+        registros = conta_registros(response.dados)
+    elif response.is_json and not response.is_streamed:
+        registros = conta_registros(response.get_json(silent=True))
+    logger_acesso.info(json.dumps({
+        "data": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+        "metodo": request.method,
+        "rota": request.url_rule.rule if request.url_rule else None,
+        "caminho": request.path,
+        "status": response.status_code,
+        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3),
+        "sql_comandos": medicao.comandos,
+        "sql_ms": round(medicao.tempo * 1000, 3),
+        "registros": registros,
+    }, ensure_ascii=False))
+    return response
+
+
+@api.after_app_request
+def registra_metricas(response):
+    """Registra a duração da requisição e, se houver, o erro nas métricas
+       da rota.
+    """
+    inicio = g.get("inicio_requisicao")
+    if inicio is None:
+        return response
+    rotulos = (("method", request.method),
+               ("route", request.url_rule.rule if request.url_rule
+                else "desconhecida"))
+    metricas.observa("http_request_duration_seconds",
+                     time.perf_counter() - inicio, rotulos)
+    if response.status_code >= 400:
+        status = str(response.status_code)
+        metricas.incrementa("http_request_errors_total",
+                            rotulos + (("status", status),))
+    # com vários processos, grava os valores no diretório compartilhado
+    metricas.grava()
+    return response
+
+
+@api.before_app_request
+def inicia_perfil():
+    """Inicia o perfil (cProfile) da requisição quando o cabeçalho
+       X-Profile (ou o parâmetro profile) traz o PERFIL_SEGREDO.
+
+    Sem PERFIL_SEGREDO configurado nada é verificado.
+    """
+    if not perfilador.segredo:
+        return
+    valor = request.headers.get("X-Profile") or request.args.get("profile")
+    if not perfilador.solicitado(valor):
+        return
+    medicao = medicao_atual.get()
+    if medicao is not None:
+        medicao.sql = []
+    g.perfil = perfilador.PerfilRequisicao()
+    g.perfil.inicia()
+
+
+@api.after_app_request
+def encerra_perfil(response):
+    """Grava o perfil da requisição e informa o seu id no cabeçalho
+       X-Profile-Id da resposta.
+
+    Nas respostas em streaming o perfil não inclui o envio do corpo.
+    """
+    perfil = g.pop("perfil", None)
+    if perfil is None:
+        return response
+    medicao = medicao_atual.get()
+    inicio = g.get("inicio_requisicao")
+    id = perfil.encerra({
+        "metodo": request.method,
+        "caminho": request.full_path,
+        "status": response.status_code,
+        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3)
+        if inicio is not None else None,
+    }, medicao.sql if medicao is not None else [])
+    logger.info("Perfil %s gravado para %s %s", id, request.method,
+                request.path)
+    response.headers["X-Profile-Id"] = id
+    return response
+
+
+@api.cli.command("seed")
+@click.option("--clientes", default=1000, show_default=True)
+@click.option("--profissionais", default=20, show_default=True)
+@click.option("--servicos", default=10, show_default=True)
+@click.option("--agendamentos", default=10000, show_default=True)
+@click.option("--semente", default=42, show_default=True,
+              help="a mesma semente gera os mesmos dados")
+@click.option("--inicio", default=None,
+              help="data (dd/mm/aaaa) do primeiro dia de agendamentos")
+def seed(clientes, profissionais, servicos, agendamentos, semente, inicio):
+    """Gera dados sintéticos para testes de volume."""
+    verifica_versao(engine)
+    if inicio:
+        inicio = datetime.strptime(inicio, "%d/%m/%Y")
+    comeco = time.perf_counter()
+    gerados = gera_dados(
+        engine, clientes, profissionais, servicos, agendamentos, semente,
+        inicio, progresso=lambda total: click.echo(
+            f"{total} agendamentos gravados "
+            f"({time.perf_counter() - comeco:.1f} s)"))
+    click.echo(", ".join(f"{quantidade} {tabela}"
+                         for tabela, quantidade in gerados.items()) +
+               f" gerados em {time.perf_counter() - comeco:.1f} s")
+
+
+@api.teardown_app_request
+def encerra_sessao(exception=None):
+    """Encerra a sessão da requisição, devolvendo a conexão ao pool.
+
+    Em caso de erro não tratado desfaz a transação pendente.
+    """
+    if exception is not None:
+        Session.rollback()
+    Session.remove()
+
+
+@api.get('/', tags=[home_tag])
 def home():
     """Redireciona para /openapi, tela que permite\
        a escolha do estilo de documentação.
@@ -46,9 +332,10 @@ def home():
 
 # ***************************************************  Metodos do Agendamento ***************************************
 # Novo registro na tabela de agendamento -  metodo demonstrado no video do mvp
-@app.post('/agendamento', tags=[agendamento_tag],
+@api.post('/agendamento', tags=[agendamento_tag],
           responses={"201": AgendamentoViewSchema,
                      "404": ErrorSchema,
+                     "409": ErrorSchema,
                      "500": ErrorSchema})
 def add_agendamento(form: AgendamentoSchema):
     """Adicionar o Agendamento de serviços do cliente
@@ -64,96 +351,136 @@ def add_agendamento(form: AgendamentoSchema):
         servico_id=form.servico_id
     )
     logger.debug(
-        f"Adicionando agendamento de serviço de cliente na\
-         data de: '{agendamento.data_agenda}'")
+        "Adicionando agendamento de serviço de cliente na\
+         data de: '%s'", agendamento.data_agenda)
     try:
         # criando conexão com a base
         session = Session()
+        servico = session.query(Servico)\
+                         .filter(Servico.id == agendamento.servico_id).first()
+        if not servico:
+            error_msg = "Serviço não encontrado na base :/"
+            logger.warning(
+                "Erro ao adicionar o agendamento do cliente, %s", error_msg)
+            return {"message": error_msg}, 404
+        # verifica se o horário do profissional já está ocupado
+        if conflito_agenda(session, agendamento.profissional_id,
+                           agendamento.data_agenda, servico.duracao):
+            error_msg = "Existe outro agendamento com\
+                         o mesmo profissional neste horário!"
+            logger.warning(
+                "Erro ao adicionar o agendamento do cliente, %s", error_msg)
+            return {"message": error_msg}, 409
         # adicionando agendamento
         session.add(agendamento)
         # efetivando o comando de adição de novo item na tabela
         session.commit()
+        # recarrega o agendamento já com cliente, profissional e serviço
+        agendamento = consulta_agendamentos(session)\
+            .filter(Agendamento.id == agendamento.id).one()
         logger.debug(
-            f"Adicionado agendamento do cliente com\
-             data em: '{agendamento.data_agenda}'")
+            "Adicionado agendamento do cliente com\
+             data em: '%s'", agendamento.data_agenda)
         return apresenta_agendamento(agendamento), 200
 
-    except IntegrityError:
+    except IntegrityError as e:
+        if "FOREIGN KEY" in str(e.orig):
+            # a base recusa o cliente ou o profissional inexistente
+            error_msg = "Cliente ou profissional não encontrado na base :/"
+            logger.warning(
+                "Erro ao adicionar o agendamento do cliente, %s", error_msg)
+            return {"message": error_msg}, 404
         # como a duplicidade do nome é a provável razão do IntegrityError
         error_msg = "Agendamento com a mesma data já salvo na base :/"
         logger.warning(
-            f"Erro ao adicionar  o agendamento do cliente com data = '\
-            {agendamento.data_agenda}', {error_msg}")
+            "Erro ao adicionar  o agendamento do cliente com data = '\
+            %s', %s", agendamento.data_agenda, error_msg)
         return {"message": error_msg}, 409
 
     except Exception:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar novo item :/"
-        logger.warning(f"Erro ao adicionar cliente, {error_msg}")
+        logger.warning("Erro ao adicionar cliente, %s", error_msg)
         return {"message": error_msg}, 400
 
 
 # Edição de um agendamento
-@app.put('/agendamento', tags=[agendamento_tag],
+@api.put('/agendamento', tags=[agendamento_tag],
          responses={"204": None,
                     "404": ErrorSchema,
+                    "409": ErrorSchema,
                     "500": ErrorSchema})
 def upd_agendamento(form: AgendamentoEditSchema):
     """Editar uma agenda já cadastrado na base """
     id = form.id
     data_agenda = datetime.strptime(form.data_agenda, "%Y-%m-%d %H:%M:%S")
     print(form.data_agenda)
-    logger.debug(f"Editando o agendamento #{id}")
+    logger.debug("Editando o agendamento #%s", id)
     try:
 
         # criando conexão com a base
         session = Session()
-        # Consulta se ja existe a descricao com outro codigo
-        agendamento = session.query(Agendamento)\
-                             .filter(Agendamento.profissional_id
-                                     == form.profissional_id)\
-                             .filter(Agendamento.data_agenda == data_agenda)\
-                             .filter(Agendamento.id != id)\
-                             .filter(
-                                    Agendamento.cliente_id != form.cliente_id)\
-                             .first()
+        servico = session.query(Servico)\
+                         .filter(Servico.id == form.servico_id).first()
+        if not servico:
+            error_msg = "Serviço não encontrado na base :/"
+            logger.warning(
+                "Erro ao editar o agendamento ID #%s, %s", id, error_msg)
+            return {"message": error_msg}, 404
+        # Consulta se o horário do profissional já está ocupado por outro
+        # agendamento durante a duração do serviço
+        conflito = conflito_agenda(session, form.profissional_id,
+                                   data_agenda, servico.duracao,
+                                   ignora_id=id)
 
-        if agendamento:
+        if conflito:
             # se foi encontrado retorna sem dar o commit
             error_msg = "Existe outro agendamento com\
-                         o mesmo profissional para outro cliente!"
+                         o mesmo profissional neste horário!"
             logger.warning(
-                f"Erro ao editar o profissional ID #{id}, {error_msg}")
-            return {"message": error_msg}, 400
+                "Erro ao editar o profissional ID #%s, %s", id, error_msg)
+            return {"message": error_msg}, 409
         else:
-            logger.warning(f"observacao = {form.observacao}")
+            logger.warning("observacao = %s", form.observacao)
             count = session.query(Agendamento)\
                            .filter(Agendamento.id == id)\
-                           .update({"cliente_id": form.cliente_id,
+                           .update({"data_agenda": data_agenda,
+                                    "cliente_id": form.cliente_id,
                                     "profissional_id": form.profissional_id,
                                     "servico_id": form.servico_id,
                                     "observacao": form.observacao})
             session.commit()
             if count:
                 # retorna sem representação com apenas o codigo http 204
-                logger.debug(f"Editado o agendamento ID #{id}")
+                logger.debug("Editado o agendamento ID #%s", id)
                 return '', 204
             else:
                 # se não foi encontrado, retorna o codigo not found 404
                 error_msg = "O agendamento não foi encontrado"
                 logger.warning(
-                    f"Erro ao editar o agendamento ID #'{id}', {error_msg}")
+                    "Erro ao editar o agendamento ID #'%s', %s", id, error_msg)
                 return '', 404
+    except IntegrityError as e:
+        if "FOREIGN KEY" in str(e.orig):
+            # a base recusa o cliente ou o profissional inexistente
+            error_msg = "Cliente ou profissional não encontrado na base :/"
+            status = 404
+        else:
+            error_msg = "Agendamento com a mesma data já salvo na base :/"
+            status = 409
+        logger.warning(
+            "Erro ao editar o agendamento ID #%s, %s", id, error_msg)
+        return {"message": error_msg}, status
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível editar o agendamento :/{e.__str__}"
         logger.warning(
-            f"Erro ao editar o agendamento com ID #'{id}', {error_msg}")
+            "Erro ao editar o agendamento com ID #'%s', %s", id, error_msg)
         return {"message": error_msg}, 500
 
 
 # Remoção de um registro de um agendamento  - metodo demonstrado no video do mvp
-@app.delete('/agendamento', tags=[agendamento_tag],
+@api.delete('/agendamento', tags=[agendamento_tag],
             responses={"204": None, "404": ErrorSchema, "500": ErrorSchema})
 def del_agendamento(form: AgendamentoBuscaDelSchema):
     """Exclui um agendamento da base de dados com o codigo id
@@ -161,7 +488,7 @@ def del_agendamento(form: AgendamentoBuscaDelSchema):
     Retorna uma mensagem de exclusão com sucesso.
     """
     id = form.id
-    logger.debug(f"Excluindo o agendamento do Cliente ID #{id}")
+    logger.debug("Excluindo o agendamento do Cliente ID #%s", id)
     try:
         # criando conexão com a base
         session = Session()
@@ -172,56 +499,331 @@ def del_agendamento(form: AgendamentoBuscaDelSchema):
 
         if count:
             # retorna sem representação com apenas o codigo http 204
-            logger.debug(f"Excluindo o agendamento do cliente ID #{id}")
+            logger.debug("Excluindo o agendamento do cliente ID #%s", id)
             return '', 204
         else:
             # se o agendamento não foi encontrado retorno o codigo http 404
             error_msg = "O Agendamento não foi encontrado na base"
             logger.warning(
-                f"Erro ao excluir o agendamento do cliente do\
-                 ID #'{id}', {error_msg}")
+                "Erro ao excluir o agendamento do cliente do\
+                 ID #'%s', %s", id, error_msg)
             return '', 404
     except Exception:
         # caso um erro fora do previsto
         error_msg = "Não foi possível excluir o agendamento do cliente :/"
         logger.warning(
-            f"Erro ao excluir o agendamento do cliente com\
-            ID #'{id}', {error_msg}")
+            "Erro ao excluir o agendamento do cliente com\
+            ID #'%s', %s", id, error_msg)
+        return {"message": error_msg}, 500
+
+
+def versao_consulta(session, caminho: str, tabelas):
+    """Retorna o ETag e a data da última alteração da consulta, calculados
+       a partir da versão atual das tabelas usadas por ela.
+    """
+    versoes, alterado_em = versoes_tabelas(session, tabelas)
+    # o ETag muda com os parâmetros da consulta e com a versão das tabelas
+    chave = f"{caminho}|{'.'.join(map(str, versoes))}"
+    etag = hashlib.sha1(chave.encode()).hexdigest()[:24]
+    return etag, alterado_em.replace(microsecond=0)
+
+
+def esta_atualizado(requisicao, etag: str, alterado_em) -> bool:
+    """Informa se os cabeçalhos If-None-Match ou If-Modified-Since da
+       requisição indicam que o cliente já possui a versão atual.
+    """
+    if requisicao.if_none_match:
+        return requisicao.if_none_match.contains_weak(etag)
+    return requisicao.if_modified_since is not None and\
+        alterado_em <= requisicao.if_modified_since
+
+
+def cabecalhos_versao(response, etag: str, alterado_em):
+    """Adiciona o ETag e o Last-Modified às respostas 200 e 304."""
+    if response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        response.last_modified = alterado_em
+        # o cliente pode guardar a resposta, mas deve sempre revalidar
+        response.cache_control.no_cache = True
+    return response
+
+
+def resposta_condicional(*tabelas):
+    """Confere os cabeçalhos If-None-Match e If-Modified-Since da requisição
+       com a versão atual das tabelas usadas pela consulta.
+
+    Retorna a resposta 304 quando o cliente já possui os dados atualizados,
+    sem que os registros precisem ser consultados. Caso contrário retorna
+    None e o ETag e o Last-Modified são adicionados à resposta da rota.
+    """
+    etag, alterado_em = versao_consulta(Session(), request.full_path,
+                                        tabelas)
+    if esta_atualizado(request, etag, alterado_em):
+        return cabecalhos_versao(Response(status=304), etag, alterado_em)
+
+    after_this_request(
+        lambda response: cabecalhos_versao(response, etag, alterado_em))
+    return None
+
+
+def busca_condicional(entidade: str, chave, carrega, *tabelas):
+    """Consulta pelo cache (cache.busca), guardando junto da representação
+       o ETag e o Last-Modified das tabelas usadas pela consulta. A versão
+       das tabelas só é lida da base quando o item não está em cache, assim
+       uma consulta em cache não faz nenhum acesso à base.
+
+    Retorna (resposta 304, None) quando o cliente já possui a versão atual
+    ou (None, representação) com o ETag e o Last-Modified adicionados à
+    resposta da rota. A representação é None quando carrega() não encontra
+    o registro.
+    """
+    def carrega_com_versao():
+        # a versão é lida antes dos dados: se houver uma alteração entre as
+        # duas leituras o ETag fica mais antigo, e não o contrário
+        etag, alterado_em = versao_consulta(Session(), request.full_path,
+                                            tabelas)
+        dados = carrega()
+        if dados is None:
+            return None
+        return {"etag": etag, "alterado_em": alterado_em.isoformat(),
+                "dados": dados}
+
+    item = cache.busca(entidade, chave, carrega_com_versao)
+    if item is None:
+        return None, None
+    etag = item["etag"]
+    alterado_em = datetime.fromisoformat(item["alterado_em"])
+    if esta_atualizado(request, etag, alterado_em):
+        return cabecalhos_versao(Response(status=304), etag,
+                                 alterado_em), None
+
+    after_this_request(
+        lambda response: cabecalhos_versao(response, etag, alterado_em))
+    return None, item["dados"]
+
+
+def filtros_agendamento(query: AgendamentoFiltroSchema):
+    """Monta as condições SQL dos filtros informados na consulta de
+       agendamentos.
+
+    Gera ValueError quando alguma data não está no formato esperado.
+    """
+    filtros = []
+    if query.data_inicio:
+        filtros.append(Agendamento.data_agenda >= datetime.strptime(
+            query.data_inicio, "%d/%m/%Y %H:%M:%S"))
+    if query.data_fim:
+        filtros.append(Agendamento.data_agenda <= datetime.strptime(
+            query.data_fim, "%d/%m/%Y %H:%M:%S"))
+    if query.cliente_id is not None:
+        filtros.append(Agendamento.cliente_id == query.cliente_id)
+    if query.profissional_id is not None:
+        filtros.append(Agendamento.profissional_id == query.profissional_id)
+    if query.servico_id is not None:
+        filtros.append(Agendamento.servico_id == query.servico_id)
+    return filtros
+
+
+@api.post('/agendamentos/lote', tags=[agendamento_tag],
+          responses={"200": AgendamentoLoteResultadoSchema,
+                     "500": ErrorSchema})
+def add_agendamentos_lote(body: AgendamentoLoteSchema):
+    """Adiciona um lote de agendamentos em uma única transação
+
+    Retorna a quantidade de agendamentos inseridos e o erro de cada item
+    recusado, identificado pela posição na lista enviada.
+    """
+    total = len(body.agendamentos)
+    logger.debug("Adicionando lote de %s agendamentos", total)
+    itens, erros = [], []
+    for indice, item in enumerate(body.agendamentos):
+        try:
+            data_agenda = datetime.strptime(item.data_agenda,
+                                            "%d/%m/%Y %H:%M:%S")
+        except ValueError as e:
+            erros.append({"indice": indice, "message": str(e)})
+            continue
+        itens.append((indice, {"data_agenda": data_agenda,
+                               "observacao": item.observacao,
+                               "cliente_id": item.cliente_id,
+                               "profissional_id": item.profissional_id,
+                               "servico_id": item.servico_id}))
+    try:
+        # criando conexão com a base
+        session = Session()
+        inseridos, erros_lote = insere_agendamentos(session, itens)
+        erros = sorted(erros + erros_lote, key=lambda erro: erro["indice"])
+        logger.debug("Adicionados %s de %s agendamentos", inseridos, total)
+        return apresenta_resultado_lote(total, inseridos, erros), 200
+    except Exception as e:
+        # caso um erro fora do previsto
+        error_msg = f"Não foi possível salvar o lote :/{str(e)}"
+        logger.warning("Erro ao adicionar lote de agendamentos, %s", error_msg)
+        return {"message": error_msg}, 500
+
+
+@api.put('/agendamentos/lote', tags=[agendamento_tag],
+         responses={"200": AgendamentoLoteResultadoSchema,
+                    "500": ErrorSchema})
+def upd_agendamentos_lote(body: AgendamentoLoteEditSchema):
+    """Edita um lote de agendamentos em uma única transação
+
+    Retorna a quantidade de agendamentos editados e o erro de cada item
+    recusado, identificado pela posição na lista enviada.
+    """
+    total = len(body.agendamentos)
+    logger.debug("Editando lote de %s agendamentos", total)
+    itens, erros = [], []
+    for indice, item in enumerate(body.agendamentos):
+        try:
+            data_agenda = datetime.strptime(item.data_agenda,
+                                            "%Y-%m-%d %H:%M:%S")
+        except ValueError as e:
+            erros.append({"indice": indice, "message": str(e)})
+            continue
+        itens.append((indice, {"id": item.id,
+                               "data_agenda": data_agenda,
+                               "observacao": item.observacao,
+                               "cliente_id": item.cliente_id,
+                               "profissional_id": item.profissional_id,
+                               "servico_id": item.servico_id}))
+    try:
+        # criando conexão com a base
+        session = Session()
+        editados, erros_lote = atualiza_agendamentos(session, itens)
+        erros = sorted(erros + erros_lote, key=lambda erro: erro["indice"])
+        logger.debug("Editados %s de %s agendamentos", editados, total)
+        return apresenta_resultado_lote(total, editados, erros), 200
+    except Exception as e:
+        # caso um erro fora do previsto
+        error_msg = f"Não foi possível editar o lote :/{str(e)}"
+        logger.warning("Erro ao editar lote de agendamentos, %s", error_msg)
+        return {"message": error_msg}, 500
+
+
+@api.delete('/agendamentos/lote', tags=[agendamento_tag],
+            responses={"200": AgendamentoLoteResultadoSchema,
+                       "500": ErrorSchema})
+def del_agendamentos_lote(body: AgendamentoLoteDelSchema):
+    """Exclui um lote de agendamentos pelo codigo em uma única transação
+
+    Retorna a quantidade de agendamentos excluídos e os codigos que não
+    foram encontrados ou que foram repetidos, identificados pela posição
+    na lista enviada.
+    """
+    total = len(body.ids)
+    logger.debug("Excluindo lote de %s agendamentos", total)
+    try:
+        # criando conexão com a base
+        session = Session()
+        excluidos, erros = exclui_agendamentos(session, body.ids)
+        logger.debug("Excluídos %s de %s agendamentos", excluidos, total)
+        return apresenta_resultado_lote(total, excluidos, erros), 200
+    except Exception as e:
+        # caso um erro fora do previsto
+        error_msg = f"Não foi possível excluir o lote :/{str(e)}"
+        logger.warning("Erro ao excluir lote de agendamentos, %s", error_msg)
         return {"message": error_msg}, 500
 
 
 # Consulta de todos os agendamentos -  metodo demonstrado no video do mvp
-@app.get('/agendamentos', tags=[agendamento_tag],
-         responses={"200": ListagemAgendamentoSchema, "500": ErrorSchema})
-def get_agendamentos():
+@api.get('/agendamentos', tags=[agendamento_tag],
+         responses={"200": ListagemAgendamentoSchema, "400": ErrorSchema,
+                    "500": ErrorSchema})
+def get_agendamentos(query: AgendamentoListagemBuscaSchema):
     """Consulta os agendamentos dos clientes
 
-    Retorna uma listagem de representações dos clientes encontrados.
+    Retorna uma página da listagem de representações dos agendamentos
+    encontrados, ordenada pela data de agendamento. Para a próxima página
+    informe no parâmetro cursor o valor de next_cursor.
     """
-    logger.debug(f"Consultando os clientes ")
+    logger.debug("Consultando os clientes ")
+    try:
+        chave = None
+        if query.cursor:
+            data_agenda, pk = decodifica_cursor(query.cursor, str, int)
+            chave = (datetime.fromisoformat(data_agenda), pk)
+        filtros = filtros_agendamento(query)
+    except (TypeError, ValueError) as e:
+        # cursor ou datas em formato invalido
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning(
+            "Erro ao consultar os agendamentos dos clientes, %s", error_msg)
+        return {"message": error_msg}, 400
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "cliente",
+                                          "profissional", "servico")
+    if nao_modificado:
+        return nao_modificado
     try:
         # criando conexão com a base
         session = Session()
-        # fazendo a busca
-        agendamentos = session.query(Agendamento).all()
+        # aplicando os filtros na propria consulta, que lê só as colunas
+        # da listagem, sem montar os objetos do ORM
+        consulta = consulta_linhas_agendamentos(session).filter(*filtros)
+        # fazendo a busca da pagina
+        agendamentos, proxima = pagina_keyset(
+            consulta, [Agendamento.data_agenda, Agendamento.id],
+            chave, query.limit)
 
         if not agendamentos:
             # se não há agendamentos cadastrados
-            return {"agendamentos": []}, 200
+            return {"agendamentos": [], "next_cursor": None}, 200
         else:
-            logger.debug(f"%d agendamentos dos clientes encontrados" %
-                         len(agendamentos))
+            logger.debug(
+                "%d agendamentos dos clientes encontrados", len(agendamentos))
+            next_cursor = None
+            if proxima:
+                ultimo = agendamentos[-1]
+                next_cursor = codifica_cursor(
+                    ultimo.data_agenda.isoformat(), ultimo.agenda_id)
             # retorna a representação de agendamentos
-            return apresenta_agendamentos(agendamentos), 200
+            return apresenta_linhas_agendamentos(agendamentos,
+                                                 next_cursor), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar os agendamentos :/{str(e)}"
         logger.warning(
-            f"Erro ao consultar os agendamentos dos clientes, {error_msg}")
+            "Erro ao consultar os agendamentos dos clientes, %s", error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/agendamento_id', tags=[agendamento_tag],
+@api.get('/agendamentos/exportacao', tags=[agendamento_tag],
+         responses={"200": None, "400": ErrorSchema})
+def exporta_agendamentos(query: AgendamentoExportacaoSchema):
+    """Exporta todos os agendamentos em NDJSON ou CSV
+
+    Os registros são lidos da base em lotes e enviados conforme são lidos,
+    sem montar a listagem inteira em memória.
+    """
+    logger.debug("Exportando os agendamentos em %s", query.formato)
+    try:
+        filtros = filtros_agendamento(query)
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao exportar os agendamentos, %s", error_msg)
+        return {"message": error_msg}, 400
+
+    # criando conexão com a base
+    session = Session()
+    # a consulta só é executada quando o gerador começa a ser consumido
+    agendamentos = consulta_linhas_agendamentos(session)\
+        .filter(*filtros)\
+        .order_by(Agendamento.data_agenda, Agendamento.id)\
+        .yield_per(1000)
+
+    if query.formato == "csv":
+        gerador = exporta_agendamentos_csv(agendamentos)
+        mimetype = "text/csv"
+    else:
+        gerador = exporta_agendamentos_ndjson(agendamentos)
+        mimetype = "application/x-ndjson"
+
+    # mantém o contexto (e a sessão) da requisição até o fim da transmissão
+    return Response(stream_with_context(gerador), mimetype=mimetype)
+
+
+@api.get('/agendamento_id', tags=[agendamento_tag],
          responses={"200": AgendamentoViewSchema, "404": ErrorSchema,
                     "500": ErrorSchema})
 def get_agendamento_id(query: AgendamentoBuscaIdSchema):
@@ -231,33 +833,38 @@ def get_agendamento_id(query: AgendamentoBuscaIdSchema):
     """
     id = query.id
     logger.debug(
-        f"Consultando o agendamento por id = #{id} ")
+        "Consultando o agendamento por id = #%s ", id)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "cliente",
+                                          "profissional", "servico")
+    if nao_modificado:
+        return nao_modificado
     try:
         # criando conexão com a base
         session = Session()
         # fazendo a busca
-        agendamento = session.query(Agendamento)\
+        agendamento = consulta_agendamentos(session)\
                              .filter(Agendamento.id == id).first()
 
         if not agendamento:
             # se não há agendamento cadastrado
             error_msg = "Agendamento não encontrado na base :/"
-            logger.warning(f"Erro ao buscar o agendamento , {error_msg}")
+            logger.warning("Erro ao buscar o agendamento , %s", error_msg)
             return {"message": error_msg}, 404
         else:
             logger.debug(
-                f"Agendamento do cliente ID #{id} encontrado")
+                "Agendamento do cliente ID #%s encontrado", id)
             # retorna a representação de agendamentos
             return apresenta_agendamento(agendamento), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar o agendamento :/{str(e)}"
         logger.warning(
-            f"Erro ao consultar o agendamento do cliente, {error_msg}")
+            "Erro ao consultar o agendamento do cliente, %s", error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/agendamento', tags=[agendamento_tag],
+@api.get('/agendamento', tags=[agendamento_tag],
          responses={"200": AgendamentoViewSchema, "404": ErrorSchema,
                     "500": ErrorSchema})
 def get_agendamento(query: AgendamentoBuscaSchema):
@@ -268,12 +875,17 @@ def get_agendamento(query: AgendamentoBuscaSchema):
     cliente_id = query.cliente_id
     data_agenda = datetime.strptime(query.data_agenda, "%d/%m/%Y %H:%M:%S")
     logger.debug(
-        f"Consultando o cliente id = {cliente_id} , data = {data_agenda} ")
+        "Consultando o cliente id = %s , data = %s ", cliente_id, data_agenda)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "cliente",
+                                          "profissional", "servico")
+    if nao_modificado:
+        return nao_modificado
     try:
         # criando conexão com a base
         session = Session()
         # fazendo a busca
-        agendamento = session.query(Agendamento)\
+        agendamento = consulta_agendamentos(session)\
                              .filter(Agendamento.data_agenda ==
                                      data_agenda).\
             filter(Agendamento.cliente_id == cliente_id).first()
@@ -283,23 +895,23 @@ def get_agendamento(query: AgendamentoBuscaSchema):
         if not agendamento:
             # se não há agendamento cadastrado
             error_msg = "Agendamento não encontrado na base :/"
-            logger.warning(f"Erro ao buscar o agendamento , {error_msg}")
+            logger.warning("Erro ao buscar o agendamento , %s", error_msg)
             return {"message": error_msg}, 404
         else:
             logger.debug(
-                f"Agendamento do cliente ID #{cliente_id}\
-                e data de agenda {data_agenda} encontrado")
+                "Agendamento do cliente ID #%s\
+                e data de agenda %s encontrado", cliente_id, data_agenda)
             # retorna a representação de agendamentos
             return apresenta_agendamento(agendamento), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar o agendamento :/{str(e)}"
         logger.warning(
-            f"Erro ao consultar o agendamento do cliente, {error_msg}")
+            "Erro ao consultar o agendamento do cliente, %s", error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/agendamento_cliente', tags=[agendamento_tag],
+@api.get('/agendamento_cliente', tags=[agendamento_tag],
          responses={"200": AgendamentoViewSchema,
                     "404": ErrorSchema,
                     "500": ErrorSchema})
@@ -310,33 +922,38 @@ def get_agendamento_cliente(query: AgendamentoBuscaClienteSchema):
     """
     cliente_id = query.cliente_id
     logger.debug(
-        f"Consultando o cliente id = {cliente_id}")
+        "Consultando o cliente id = %s", cliente_id)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "cliente",
+                                          "profissional", "servico")
+    if nao_modificado:
+        return nao_modificado
     try:
         # criando conexão com a base
         session = Session()
         # fazendo a busca
-        agendamento = session.query(Agendamento).filter(
+        agendamento = consulta_agendamentos(session).filter(
             Agendamento.cliente_id == cliente_id).first()
 
         if not agendamento:
             # se não há agendamento cadastrado
             error_msg = "Agendamento não encontrado na base :/"
-            logger.warning(f"Erro ao buscar o agendamento , {error_msg}")
+            logger.warning("Erro ao buscar o agendamento , %s", error_msg)
             return {"message": error_msg}, 404
         else:
             logger.debug(
-                f"Agendamento do cliente ID #{cliente_id}  encontrado")
+                "Agendamento do cliente ID #%s  encontrado", cliente_id)
             # retorna a representação de agendamentos
             return apresenta_agendamento(agendamento), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar o agendamento :/{str(e)}"
         logger.warning(
-            f"Erro ao consultar o agendamento do cliente, {error_msg}")
+            "Erro ao consultar o agendamento do cliente, %s", error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/agendamento_profissional', tags=[agendamento_tag],
+@api.get('/agendamento_profissional', tags=[agendamento_tag],
          responses={"200": AgendamentoViewSchema,
                     "404": ErrorSchema,
                     "500": ErrorSchema})
@@ -347,34 +964,39 @@ def get_agendamento_profissional(query: AgendamentoBuscaProfissionalSchema):
     """
     id = query.profissional_id
     logger.debug(
-        f"Consultando o profissional id = {id}")
+        "Consultando o profissional id = %s", id)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "cliente",
+                                          "profissional", "servico")
+    if nao_modificado:
+        return nao_modificado
     try:
         # criando conexão com a base
         session = Session()
         # fazendo a busca
-        agendamento = session.query(Agendamento).filter(
+        agendamento = consulta_agendamentos(session).filter(
             Agendamento.profissional_id == id).first()
 
         if not agendamento:
             # se não há agendamento cadastrado
             error_msg = "Agendamento não encontrado na base :/"
-            logger.warning(f"Erro ao buscar o agendamento , {error_msg}")
+            logger.warning("Erro ao buscar o agendamento , %s", error_msg)
             return {"message": error_msg}, 404
         else:
             logger.debug(
-                f"Agendamento do profissional ID #{id}  encontrado")
+                "Agendamento do profissional ID #%s  encontrado", id)
             # retorna a representação de agendamentos
             return apresenta_agendamento(agendamento), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar o agendamento :/{str(e)}"
         logger.warning(
-            f"Erro ao consultar o agendamento do cliente, {error_msg}")
+            "Erro ao consultar o agendamento do cliente, %s", error_msg)
 
         return {f"message: {error_msg}"}, 500
 
 
-@app.get('/agendamento_servico', tags=[agendamento_tag],
+@api.get('/agendamento_servico', tags=[agendamento_tag],
          responses={"200": AgendamentoViewSchema,
                     "404": ErrorSchema,
                     "500": ErrorSchema})
@@ -384,35 +1006,92 @@ def get_agendamento_servico(query: AgendamentoBuscaServicoSchema):
         Retorna uma representação do primeiro agendamento encontrato
     """
     id = query.servico_id
-    logger.debug(f"Consultando o servico id = {id}")
+    logger.debug("Consultando o servico id = %s", id)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "cliente",
+                                          "profissional", "servico")
+    if nao_modificado:
+        return nao_modificado
     try:
         # criando conexão com a base
         session = Session()
         # fazendo a busca
-        agendamento = session.query(Agendamento)\
+        agendamento = consulta_agendamentos(session)\
                              .filter(Agendamento.servico_id == id)\
                              .first()
 
         if not agendamento:
             # se não há agendamento cadastrado
             error_msg = "Agendamento não encontrado na base :/"
-            logger.warning(f"Erro ao buscar o agendamento , {error_msg}")
+            logger.warning("Erro ao buscar o agendamento , %s", error_msg)
             return {"message": error_msg}, 404
         else:
             logger.debug(
-                f"Agendamento do servico ID #{id}  encontrado")
+                "Agendamento do servico ID #%s  encontrado", id)
             # retorna a representação de agendamentos
             return apresenta_agendamento(agendamento), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar o agendamento :/{str(e)}"
         logger.warning(
-            f"Erro ao consultar o agendamento do cliente, {error_msg}")
+            "Erro ao consultar o agendamento do cliente, %s", error_msg)
+        return {"message": error_msg}, 500
+
+
+@api.get('/horarios_livres', tags=[agendamento_tag],
+         responses={"200": DisponibilidadeViewSchema, "400": ErrorSchema,
+                    "404": ErrorSchema, "500": ErrorSchema})
+def get_horarios_livres(query: DisponibilidadeBuscaSchema):
+    """Consulta os horários livres de um profissional para um serviço
+
+    Retorna os horários de início, dentro do expediente, em que o serviço
+    pode ser agendado sem sobrepor outro agendamento do profissional.
+    """
+    profissional_id = query.profissional_id
+    logger.debug(
+        "Consultando os horários livres do profissional %s", profissional_id)
+    try:
+        inicio = datetime.strptime(query.data_inicio, "%d/%m/%Y")
+        fim = datetime.strptime(query.data_fim, "%d/%m/%Y") +\
+            timedelta(days=1)
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao consultar os horários livres, %s", error_msg)
+        return {"message": error_msg}, 400
+    if not timedelta(0) < fim - inicio <= timedelta(days=31):
+        error_msg = "O período deve ter entre 1 e 31 dias"
+        logger.warning("Erro ao consultar os horários livres, %s", error_msg)
+        return {"message": error_msg}, 400
+
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "servico")
+    if nao_modificado:
+        return nao_modificado
+    try:
+        # criando conexão com a base
+        session = Session()
+        servico = session.query(Servico)\
+                         .filter(Servico.id == query.servico_id).first()
+        if not servico:
+            error_msg = "Serviço não encontrado na base :/"
+            logger.warning(
+                "Erro ao consultar os horários livres, %s", error_msg)
+            return {"message": error_msg}, 404
+        # fazendo a busca
+        horarios = horarios_livres(session, profissional_id, servico.duracao,
+                                   inicio, fim, query.intervalo)
+        logger.debug("%s horários livres encontrados", len(horarios))
+        return apresenta_disponibilidade(profissional_id, servico.id,
+                                         servico.duracao, horarios), 200
+    except Exception as e:
+        # caso um erro fora do previsto
+        error_msg = f"Não foi possível consultar os horários :/{str(e)}"
+        logger.warning("Erro ao consultar os horários livres, %s", error_msg)
         return {"message": error_msg}, 500
 
 
 # ***************************************************  Metodos do Cliente ***************************************
-@app.post('/cliente', tags=[cliente_tag],
+@api.post('/cliente', tags=[cliente_tag],
           responses={"200": ClienteViewSchema, "409": ErrorSchema,
                      "500": ErrorSchema})
 def add_cliente(form: ClienteSchema):
@@ -423,7 +1102,7 @@ def add_cliente(form: ClienteSchema):
     cliente = Cliente(
         nome=form.nome.strip()
     )
-    logger.debug(f"Adicionando cliente de nome: '{cliente.nome}'")
+    logger.debug("Adicionando cliente de nome: '%s'", cliente.nome)
     try:
         # criando conexão com a base
         session = Session()
@@ -431,25 +1110,26 @@ def add_cliente(form: ClienteSchema):
         session.add(cliente)
         # efetivando o comando de adição de novo item na tabela
         session.commit()
-        logger.debug(f"Adicionado cliente de nome: '{cliente.nome}'")
+        cache.invalida("cliente")
+        logger.debug("Adicionado cliente de nome: '%s'", cliente.nome)
         return apresenta_cliente(cliente), 200
 
     except IntegrityError:
         # como a duplicidade do nome é a provável razão do IntegrityError
         error_msg = "Cliente de mesmo nome já cadastrado na base de dados!"
         logger.warning(
-            f"Erro ao adicionar cliente '{cliente.nome}', {error_msg}")
+            "Erro ao adicionar cliente '%s', %s", cliente.nome, error_msg)
         return {"message": error_msg}, 409
 
     except Exception:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar novo item :/"
         logger.warning(
-            f"Erro ao adicionar cliente '{cliente.nome}', {error_msg}")
+            "Erro ao adicionar cliente '%s', %s", cliente.nome, error_msg)
         return {"message": error_msg}, 500
 
 
-@app.put('/cliente', tags=[cliente_tag],
+@api.put('/cliente', tags=[cliente_tag],
          responses={"204": None, "400": ErrorSchema,
                     "404": None, "500": ErrorSchema})
 def put_cliente(form: ClienteViewSchema):
@@ -461,7 +1141,7 @@ def put_cliente(form: ClienteViewSchema):
     id = form.id
     nome = unquote(unquote(form.nome))
 
-    logger.debug(f"Editando o Cliente {nome}")
+    logger.debug("Editando o Cliente %s", nome)
 
     try:
         # criando conexão com a base
@@ -474,97 +1154,137 @@ def put_cliente(form: ClienteViewSchema):
             # se foi encontrado retorna o codigo http 400
             error_msg = "Cliente já cadastrado na base"
             logger.warning(
-                f"Erro ao editar o cliente '{cliente.nome}', {error_msg}")
+                "Erro ao editar o cliente '%s', %s", cliente.nome, error_msg)
             return {"message": error_msg}, 400
         else:
 
             count = session.query(Cliente).filter(
                 Cliente.id == id).update({"nome": nome})
             session.commit()
+            cache.invalida("cliente")
             if count:
                 # retorna sem representação com apenas o codigo http 204
-                logger.debug(f"Editado o cliente {nome}")
+                logger.debug("Editado o cliente %s", nome)
                 return '', 204
             else:
                 error_msg = f"O cliente com ID {id} não foi encontrado na base"
                 logger.warning(
-                    f"Erro ao editar o cliente '{nome}', {error_msg}")
+                    "Erro ao editar o cliente '%s', %s", nome, error_msg)
                 return '', 404
 
     except Exception:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar novo item :/"
         logger.warning(
-            f"Erro ao adicionar cliente '{cliente.nome}', {error_msg}")
+            "Erro ao adicionar cliente '%s', %s", cliente.nome, error_msg)
         return {"message": error_msg}, 500
 
 
-@app.delete('/cliente', tags=[cliente_tag],
-            responses={"204": None, "404": None,
-                       "409": ErrorSchema, "500": ErrorSchema})
+@api.delete('/cliente', tags=[cliente_tag],
+            responses={"204": None, "404": None, "409": ErrorSchema,
+                       "500": ErrorSchema})
 def del_cliente(form: ClenteBuscaDeleteSchema):
     """Exclui um cliente da base de dados com base no codigo id do cliente
 
-    Retorna uma mensagem de exclusão com sucesso.
+    Os agendamentos do cliente também são excluídos, em lotes. Com mais
+    agendamentos que o limite da variável de ambiente EXCLUSAO_LIMITE_ROTA
+    a exclusão é recusada com o código 409 e deve ser feita pelo comando
+    'flask purge'.
     """
     id = form.id
-    logger.debug(f"Excluindo o Cliente ID #{id}")
+    logger.debug("Excluindo o Cliente ID #%s", id)
     try:
-        # criando conexão com a base
-        session = Session()
-
-        # fazendo a remoção
-        count = session.query(Cliente).filter(Cliente.id == id).delete()
-        session.commit()
-
-        if count:
+        with engine.connect() as conexao:
+            if excede_limite_exclusao(conexao, Cliente, id,
+                                      LIMITE_EXCLUSAO_ROTA):
+                error_msg = f"O cliente possui mais de "\
+                    f"{LIMITE_EXCLUSAO_ROTA} agendamentos, exclua-o com "\
+                    f"'flask purge cliente {id}' :/"
+                logger.warning(
+                    "Erro ao excluir o cliente #'%s', %s", id, error_msg)
+                return {"message": error_msg}, 409
+            # fazendo a remoção do cliente e dos seus agendamentos
+            excluido, agendamentos = exclui_com_agendamentos(conexao,
+                                                             Cliente, id)
+        cache.invalida("cliente")
+
+        if excluido:
             # retorna sem representação com apenas o codigo http 204
-            logger.debug(f"Excluindo o cliente ID #{id}")
+            logger.debug("Excluido o cliente ID #%s e %s agendamentos",
+                         id, agendamentos)
             return '', 204
         else:
             # quando não encontrado retorno o codigo http 404 not found
             error_msg = "Cliente não encontrado na base :/"
-            logger.warning(f"Erro ao excluir o cliente #'{id}', {error_msg}")
+            logger.warning(
+                "Erro ao excluir o cliente #'%s', %s", id, error_msg)
             return '', 404
-    except IntegrityError as e:
-        # caso de referencia na tabela agendamento retorna o erro na exclusao
-        error_msg = "o cadastro do cliente está\
-                     referenciado em um agendamento!"
-        logger.warning(f"Erro ao excluir cliente', {error_msg}")
-        return {"message": error_msg}, 409
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = "Não foi possível excluir o cliente :/"
         logger.warning(
-            f"Erro ao excluir o cliente com ID #'{id}', {error_msg}")
+            "Erro ao excluir o cliente com ID #'%s', %s", id, error_msg)
         print(e)
         return {"message": error_msg}, 500
 
 
-@app.get('/clientes', tags=[cliente_tag],
-         responses={"200": ListagemClienteSchema, "404": ErrorSchema})
-def get_clientes():
+@api.get('/clientes', tags=[cliente_tag],
+         responses={"200": ListagemClienteSchema, "400": ErrorSchema,
+                    "404": ErrorSchema})
+def get_clientes(query: PaginacaoSchema):
     """Faz a busca por todos os clientes cadastrados
 
-    Retorna uma representacao da listagem de clientes
+    Retorna uma página da representacao da listagem de clientes
     """
-    logger.debug(f"Coletando clientes ")
+    logger.debug("Coletando clientes ")
+    try:
+        chave = decodifica_cursor(query.cursor, int) if query.cursor else None
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao consultar os clientes, %s", error_msg)
+        return {"message": error_msg}, 400
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("cliente")
+    if nao_modificado:
+        return nao_modificado
     # criando conexão com a base
     session = Session()
     # fazendo a busca
-    clientes = session.query(Cliente).all()
+    clientes, proxima = pagina_keyset(session.query(Cliente), [Cliente.id],
+                                      chave, query.limit)
 
     if not clientes:
         # se não há clientes cadastrados
-        return {"clientes": []}, 200
+        return {"clientes": [], "next_cursor": None}, 200
     else:
-        logger.debug(f"%d clientes encontrados" % len(clientes))
+        logger.debug("%d clientes encontrados", len(clientes))
+        next_cursor = codifica_cursor(clientes[-1].id) if proxima else None
         # retorna a representação de cliente
-        print(clientes)
-        return apresenta_clientes(clientes), 200
+        return apresenta_clientes(clientes, next_cursor), 200
 
 
-@app.get('/cliente', tags=[cliente_tag],
+@api.get('/clientes/busca', tags=[cliente_tag],
+         responses={"200": ListagemClienteSchema})
+def busca_clientes(query: BuscaTextoSchema):
+    """Busca os clientes pelas palavras do nome, mesmo incompletas,
+    sem diferenciar acentos e maiúsculas
+
+    Retorna os clientes mais relevantes, até o limite informado
+    """
+    logger.debug("Buscando os clientes por '%s'", query.termo)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("cliente")
+    if nao_modificado:
+        return nao_modificado
+    # criando conexão com a base
+    session = Session()
+    # fazendo a busca
+    clientes = busca_nomes(session, Cliente, query.termo, query.limit)
+    logger.debug("%d clientes encontrados", len(clientes))
+    return apresenta_clientes(clientes), 200
+
+
+@api.get('/cliente', tags=[cliente_tag],
          responses={"200": ClienteViewSchema, "404": ErrorSchema})
 def get_cliente(query: ClienteBuscaSchema):
     """Faz a busca por um cliente a partir do nome do cliente
@@ -572,26 +1292,36 @@ def get_cliente(query: ClienteBuscaSchema):
     Retorna uma representação do cliente
     """
     cliente_nome = query.nome.strip()
-    logger.debug(f"Coletando dados sobre cliente {cliente_nome}")
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    cliente = session.query(Cliente).filter(
-        Cliente.nome == cliente_nome).first()
+    logger.debug("Coletando dados sobre cliente %s", cliente_nome)
+
+    def carrega():
+        # criando conexão com a base
+        session = Session()
+        # fazendo a busca
+        cliente = session.query(Cliente).filter(
+            Cliente.nome == cliente_nome).first()
+        return apresenta_cliente(cliente) if cliente else None
+
+    # consulta a base apenas se o cliente não estiver em cache e responde
+    # 304 sem consultar os registros quando nada foi alterado
+    nao_modificado, cliente = busca_condicional(
+        "cliente", cliente_nome, carrega, "cliente")
+    if nao_modificado:
+        return nao_modificado
 
     if not cliente:
         # se o cliente não for encontrado
         error_msg = "Cliente não encontrado na base :/"
         logger.warning(
-            f"Erro ao buscar o cliente '{cliente_nome}', {error_msg}")
+            "Erro ao buscar o cliente '%s', %s", cliente_nome, error_msg)
         return {"mesage": error_msg}, 404
     else:
-        logger.debug(f"Cliente encontrado: '{cliente.nome}'")
+        logger.debug("Cliente encontrado: '%s'", cliente['nome'])
         # retorna a representação de cliente
-        return apresenta_cliente(cliente), 200
+        return cliente, 200
 
 # ***************************************************  Metodos do Profissional ***************************************
-@app.post('/profissional', tags=[profissional_tag],
+@api.post('/profissional', tags=[profissional_tag],
           responses={"200": ProfissionalViewSchema,
                      "409": ErrorSchema,
                      "400": ErrorSchema})
@@ -605,7 +1335,7 @@ def add_profissional(form: ProfissionalSchema):
     )
 
     logger.debug(
-        f"Adicionando um profissional com o nome: '{profissional.nome}'")
+        "Adicionando um profissional com o nome: '%s'", profissional.nome)
     try:
         # criando conexão com a base
         session = Session()
@@ -613,34 +1343,36 @@ def add_profissional(form: ProfissionalSchema):
         session.add(profissional)
         # efetivando o camando de adição de novo item na tabela
         session.commit()
-        logger.debug(f"Adicionado profissional de nome: '{profissional.nome}'")
+        cache.invalida("profissional")
+        logger.debug(
+            "Adicionado profissional de nome: '%s'", profissional.nome)
         return apresenta_profissional(profissional), 200
 
     except IntegrityError:
         # como a duplicidade do nome é a provável razão do IntegrityError
         error_msg = "Profissional de mesmo nome já salvo na base :/"
         logger.warning(
-            f"Erro ao adicionar profissional\
-            '{profissional.nome}', {error_msg}")
+            "Erro ao adicionar profissional\
+            '%s', %s", profissional.nome, error_msg)
         return {"mesage": error_msg}, 409
 
     except Exception:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar novo item :/"
         logger.warning(
-            f"Erro ao adicionar profissional '\
-            {profissional.nome}', {error_msg}")
+            "Erro ao adicionar profissional '\
+            %s', %s", profissional.nome, error_msg)
         return {"mesage": error_msg}, 400
 
 
-@app.put('/profissional', tags=[profissional_tag],
+@api.put('/profissional', tags=[profissional_tag],
          responses={"204": None, "400": ErrorSchema,
                     "404": None, "500": ErrorSchema})
 def put_profissional(form: ProfissionalViewSchema):
     """Editar um profissional já cadastrado na base """
     id = form.id
     nome = unquote(unquote(form.nome))
-    logger.debug(f"Editando o Profissional {nome}")
+    logger.debug("Editando o Profissional %s", nome)
     try:
 
         # criando conexão com a base
@@ -653,89 +1385,142 @@ def put_profissional(form: ProfissionalViewSchema):
             # se o profissional foi encontrado retorna sem dar o commit
             error_msg = "Profissional já cadastrado na base"
             logger.warning(
-                f"Erro ao editar o profissional ID #{id},\
-                '{profissional.nome}', {error_msg}")
+                "Erro ao editar o profissional ID #%s,\
+                '%s', %s", id, profissional.nome, error_msg)
             return {"message": error_msg}, 400
         else:
             count = session.query(Profissional).filter(
                 Profissional.id == id).update({"nome": nome})
             session.commit()
+            cache.invalida("profissional")
             if count:
                 # retorna sem representação com apenas o codigo http 204
-                logger.debug(f"Editado o profissional {nome}")
+                logger.debug("Editado o profissional %s", nome)
                 return '', 204
             else:
                 # se não foi encontrado, retorna o codigo not found 404
                 error_msg = "O profissional não foi encontrado"
                 logger.warning(
-                    f"Erro ao editar o profissional '{nome}', {error_msg}")
+                    "Erro ao editar o profissional '%s', %s", nome, error_msg)
                 return '', 404
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível editar o profissional :/{e.__str__}"
         logger.warning(
-            f"Erro ao editar o profissional com ID #'{id}'\
-            e profissional {nome}, {error_msg}")
+            "Erro ao editar o profissional com ID #'%s'\
+            e profissional %s, %s", id, nome, error_msg)
         return {"message": error_msg}, 500
 
 
-@app.delete('/profissional', tags=[profissional_tag],
-            responses={"204": None, "404": None, "500": ErrorSchema})
+@api.delete('/profissional', tags=[profissional_tag],
+            responses={"204": None, "404": None, "409": ErrorSchema,
+                       "500": ErrorSchema})
 def del_profissional(form: ProfissionalBuscaExclusaoSchema):
-    """Excluiu um profissional cadastrado com base no Id"""
+    """Excluiu um profissional cadastrado com base no Id
+
+    Os agendamentos do profissional também são excluídos, em lotes. Com
+    mais agendamentos que o limite da variável de ambiente
+    EXCLUSAO_LIMITE_ROTA a exclusão é recusada com o código 409 e deve ser
+    feita pelo comando 'flask purge'.
+    """
     id = form.id
-    logger.debug(f"Excluindo o Profissional ID #{id}")
+    logger.debug("Excluindo o Profissional ID #%s", id)
     try:
-        # criando conexão com a base
-        session = Session()
-        # fazendo a remoção
-        count = session.query(Profissional).filter(
-            Profissional.id == id).delete()
-        session.commit()
-
-        if count:
+        with engine.connect() as conexao:
+            if excede_limite_exclusao(conexao, Profissional, id,
+                                      LIMITE_EXCLUSAO_ROTA):
+                error_msg = f"O profissional possui mais de "\
+                    f"{LIMITE_EXCLUSAO_ROTA} agendamentos, exclua-o com "\
+                    f"'flask purge profissional {id}' :/"
+                logger.warning(
+                    "Erro ao excluir o profissional #'%s', %s", id,
+                    error_msg)
+                return {"message": error_msg}, 409
+            # fazendo a remoção do profissional e dos seus agendamentos
+            excluido, agendamentos = exclui_com_agendamentos(
+                conexao, Profissional, id)
+        cache.invalida("profissional")
+
+        if excluido:
             # retorna sem representação com apenas o codigo http 204
-            logger.debug(f"Excluindo o profissional ID #{id}")
+            logger.debug("Excluido o profissional ID #%s e %s agendamentos",
+                         id, agendamentos)
             return '', 204
         else:
             # se não foi encontrado, retorna o codigo not found 404
             error_msg = "Profissional não encontrado na base :/"
             logger.warning(
-                f"Erro ao excluir o profissional #'{id}', {error_msg}")
+                "Erro ao excluir o profissional #'%s', %s", id, error_msg)
             return '', 404
 
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível excluir o profissional :/{e.__str__}"
         logger.warning(
-            f"Erro ao excluir o profissional com ID #'{id}', {error_msg}")
+            "Erro ao excluir o profissional com ID #'%s', %s", id, error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/profissionais', tags=[profissional_tag],
-         responses={"200": ListagemProfissionalSchema, "404": ErrorSchema})
-def get_profissionais():
+@api.get('/profissionais', tags=[profissional_tag],
+         responses={"200": ListagemProfissionalSchema, "400": ErrorSchema,
+                    "404": ErrorSchema})
+def get_profissionais(query: PaginacaoSchema):
     """Faz a busca por todos os profissionais cadastrados
 
-    Retorna uma representacao da listagem de profissionais
+    Retorna uma página da representacao da listagem de profissionais
     """
-    logger.debug(f"Coletando profissionais ")
+    logger.debug("Coletando profissionais ")
+    try:
+        chave = decodifica_cursor(query.cursor, int) if query.cursor else None
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao consultar os profissionais, %s", error_msg)
+        return {"message": error_msg}, 400
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("profissional")
+    if nao_modificado:
+        return nao_modificado
     # criando conexão com a base
     session = Session()
     # fazendo a busca
-    profissionais = session.query(Profissional).all()
+    profissionais, proxima = pagina_keyset(session.query(Profissional),
+                                           [Profissional.id],
+                                           chave, query.limit)
 
     if not profissionais:
         # se não há produtos cadastrados
-        return {"profissionais": []}, 200
+        return {"profissionais": [], "next_cursor": None}, 200
     else:
-        logger.debug(f"%d profissionais encontrados" % len(profissionais))
+        logger.debug("%d profissionais encontrados", len(profissionais))
+        next_cursor = codifica_cursor(profissionais[-1].id)\
+            if proxima else None
         # retorna a representação de cliente
-        print(profissionais)
-        return apresenta_profissionais(profissionais), 200
+        return apresenta_profissionais(profissionais, next_cursor), 200
 
 
-@app.get('/profissional', tags=[profissional_tag],
+@api.get('/profissionais/busca', tags=[profissional_tag],
+         responses={"200": ListagemProfissionalSchema})
+def busca_profissionais(query: BuscaTextoSchema):
+    """Busca os profissionais pelas palavras do nome, mesmo incompletas,
+    sem diferenciar acentos e maiúsculas
+
+    Retorna os profissionais mais relevantes, até o limite informado
+    """
+    logger.debug("Buscando os profissionais por '%s'", query.termo)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("profissional")
+    if nao_modificado:
+        return nao_modificado
+    # criando conexão com a base
+    session = Session()
+    # fazendo a busca
+    profissionais = busca_nomes(session, Profissional, query.termo,
+                                query.limit)
+    logger.debug("%d profissionais encontrados", len(profissionais))
+    return apresenta_profissionais(profissionais), 200
+
+
+@api.get('/profissional', tags=[profissional_tag],
          responses={"200": ProfissionalViewSchema, "404": ErrorSchema})
 def get_profissional(query: ProfissionalBuscaSchema):
     """Faz a busca por um profissional a partir do nome
@@ -743,38 +1528,49 @@ def get_profissional(query: ProfissionalBuscaSchema):
     Retorna uma representação do profissional
     """
     profissional_nome = query.nome
-    logger.debug(f"Coletando dados sobre profissional {profissional_nome}")
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    profissional = session.query(Profissional).filter(
-        Profissional.nome == profissional_nome).first()
+    logger.debug("Coletando dados sobre profissional %s", profissional_nome)
+
+    def carrega():
+        # criando conexão com a base
+        session = Session()
+        # fazendo a busca
+        profissional = session.query(Profissional).filter(
+            Profissional.nome == profissional_nome).first()
+        return apresenta_profissional(profissional) if profissional else None
+
+    # consulta a base apenas se o profissional não estiver em cache e
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado, profissional = busca_condicional(
+        "profissional", profissional_nome, carrega, "profissional")
+    if nao_modificado:
+        return nao_modificado
 
     if not profissional:
         # se o profissional não for encontrado
         error_msg = "Profissional não encontrado na base :/"
         logger.warning(
-            f"Erro ao buscar o profissional '{profissional_nome}'\
-            , {error_msg}")
+            "Erro ao buscar o profissional '%s'\
+            , %s", profissional_nome, error_msg)
         return {"message": error_msg}, 404
     else:
-        logger.debug(f"Profissional encontrado: '{profissional.nome}'")
+        logger.debug("Profissional encontrado: '%s'", profissional['nome'])
         # retorna a representação de profissional
-        return apresenta_profissional(profissional), 200
+        return profissional, 200
 
 
 # ***************************************************  Metodos do Serviço ***************************************
-@app.post('/servico', tags=[servico_tag],
+@api.post('/servico', tags=[servico_tag],
           responses={"201": None, "400": ErrorSchema})
 def post_servico(form: ServicoSchema):
     """Adiciona um novo serviço à base de dados """
     servico = Servico(
         descricao=form.descricao.strip(),
-        valor=form.valor
+        valor=form.valor,
+        duracao=form.duracao
     )
     logger.debug(
-        f"Adicionando um servico com a descrição: '{servico.descricao}'\
-         e valor = {servico.valor}")
+        "Adicionando um servico com a descrição: '%s'\
+         e valor = %s", servico.descricao, servico.valor)
     try:
         # criando conexão com a base
         session = Session()
@@ -782,25 +1578,28 @@ def post_servico(form: ServicoSchema):
         session.add(servico)
         # efetivando o camando de adição de novo item na tabela
         session.commit()
+        cache.invalida("servico")
         logger.debug(
-            f"Adicionado o serviço com a descrição: '{servico.descricao}'\
-              e valor = {servico.valor}")
+            "Adicionado o serviço com a descrição: '%s'\
+              e valor = %s", servico.descricao, servico.valor)
         return apresenta_servico(servico), 201
     except IntegrityError:
         # como a duplicidade do nome é a provável razão do IntegrityError
         error_msg = "Serviço de mesma descrição já salvo na base :/"
         logger.warning(
-            f"Erro ao adicionar o serviço '{servico.descricao}', {error_msg}")
+            "Erro ao adicionar o serviço '%s', %s",
+            servico.descricao, error_msg)
         return {"mesage": error_msg}, 409
     except Exception:
         # caso um erro fora do previsto
         error_msg = "Não foi possível salvar novo item :/"
         logger.warning(
-            f"Erro ao adicionar o serviço '{servico.descricao}', {error_msg}")
+            "Erro ao adicionar o serviço '%s', %s",
+            servico.descricao, error_msg)
         return {"mesage": error_msg}, 400
 
 
-@app.put('/servico', tags=[servico_tag],
+@api.put('/servico', tags=[servico_tag],
          responses={"204": None, "404": None,
                     "409": ErrorSchema, "500": ErrorSchema})
 def put_servico(form: ServicoEditSchema):
@@ -809,7 +1608,7 @@ def put_servico(form: ServicoEditSchema):
     descricao = unquote(unquote(form.descricao))
     valor = form.valor
 
-    logger.debug(f"Editando o Serviço {descricao}")
+    logger.debug("Editando o Serviço %s", descricao)
     try:
         # criando conexão com a base
         session = Session()
@@ -821,58 +1620,98 @@ def put_servico(form: ServicoEditSchema):
             # se o serviço for encontrado retorna sem dar o commit
             error_msg = "Serviço já cadastrado na base"
             logger.warning(
-                f"Erro ao editar o serviço '{descricao}', {error_msg}")
+                "Erro ao editar o serviço '%s', %s", descricao, error_msg)
             return {"message": error_msg}, 400
         else:
-            count = session.query(Servico).filter(Servico.id == id).update(
-                {"descricao": descricao, "valor": valor})
+            campos = {"descricao": descricao, "valor": valor}
+            # a duração só é alterada quando informada
+            if form.duracao is not None:
+                campos["duracao"] = form.duracao
+            count = session.query(Servico).filter(Servico.id == id)\
+                .update(campos)
             session.commit()
+            cache.invalida("servico")
             if count:
                 # retorna sem representação com apenas o codigo http 204
-                logger.debug(f"Editado o serviço {descricao}")
+                logger.debug("Editado o serviço %s", descricao)
                 return '', 204
             else:
                 # se o serviço não foi encontrado, retorna o codigo 404
                 error_msg = "O serviço não foi encontrado"
                 logger.warning(
-                    f"Erro ao editar o serviço '{descricao}', {error_msg}")
+                    "Erro ao editar o serviço '%s', %s", descricao, error_msg)
                 return '', 404
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível editar o serviço :/{e.__str__}"
-        logger.warning(f"Erro ao editar o serviço com ID #'{id}', {error_msg}")
+        logger.warning(
+            "Erro ao editar o serviço com ID #'%s', %s", id, error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/servicos', tags=[servico_tag],
-         responses={"200": ListagemServicoSchema, "500": ErrorSchema})
-def get_servicos():
+@api.get('/servicos', tags=[servico_tag],
+         responses={"200": ListagemServicoSchema, "400": ErrorSchema,
+                    "500": ErrorSchema})
+def get_servicos(query: PaginacaoSchema):
     """Consultar todos os serviços cadastrados na base de dados
 
-    Retorna uma lista de serviços
+    Retorna uma página da lista de serviços
     """
-    logger.debug(f"Consulta de serviço")
+    logger.debug("Consulta de serviço")
+    try:
+        chave = decodifica_cursor(query.cursor, int) if query.cursor else None
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao consultar o serviços , %s", error_msg)
+        return {"message": error_msg}, 400
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("servico")
+    if nao_modificado:
+        return nao_modificado
     # criando conexão com a base
     session = Session()
     # fazendo a busca
-    servicos = session.query(Servico).all()
+    servicos, proxima = pagina_keyset(session.query(Servico), [Servico.id],
+                                      chave, query.limit)
     try:
         if not servicos:
             # se não há servicos cadastrados
-            return {"servicos": []}, 200
+            return {"servicos": [], "next_cursor": None}, 200
         else:
-            logger.debug(f"%d servicos encontrados" % len(servicos))
+            logger.debug("%d servicos encontrados", len(servicos))
+            next_cursor = codifica_cursor(servicos[-1].id)\
+                if proxima else None
             # retorna a representação de cliente
-            print(servicos)
-            return apresenta_servicos(servicos), 200
+            return apresenta_servicos(servicos, next_cursor), 200
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível consultar os serviços :/{e.__str__}"
-        logger.warning(f"Erro ao consultar o serviços , {error_msg}")
+        logger.warning("Erro ao consultar o serviços , %s", error_msg)
         return {"message": error_msg}, 500
 
 
-@app.get('/servico', tags=[servico_tag],
+@api.get('/servicos/busca', tags=[servico_tag],
+         responses={"200": ListagemServicoSchema})
+def busca_servicos(query: BuscaTextoSchema):
+    """Busca os serviços pelas palavras da descrição, mesmo incompletas,
+    sem diferenciar acentos e maiúsculas
+
+    Retorna os serviços mais relevantes, até o limite informado
+    """
+    logger.debug("Buscando os serviços por '%s'", query.termo)
+    # responde 304 sem consultar os registros quando nada foi alterado
+    nao_modificado = resposta_condicional("servico")
+    if nao_modificado:
+        return nao_modificado
+    # criando conexão com a base
+    session = Session()
+    # fazendo a busca
+    servicos = busca_nomes(session, Servico, query.termo, query.limit)
+    logger.debug("%d servicos encontrados", len(servicos))
+    return apresenta_servicos(servicos), 200
+
+
+@api.get('/servico', tags=[servico_tag],
          responses={"200": ServicoViewSchema, "500": ErrorSchema})
 def get_servico(query: ServicoBuscaSchema):
     """Consulta um serviço com base no codigo id
@@ -880,52 +1719,154 @@ def get_servico(query: ServicoBuscaSchema):
     Retorna a representação de um serviço
     """
     servico_descricao = query.descricao
-    logger.debug(f"Consulta de dados sobre serviço {servico_descricao}")
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    servico = session.query(Servico).filter(
-        Servico.descricao == servico_descricao).first()
+    logger.debug("Consulta de dados sobre serviço %s", servico_descricao)
+
+    def carrega():
+        # criando conexão com a base
+        session = Session()
+        # fazendo a busca
+        servico = session.query(Servico).filter(
+            Servico.descricao == servico_descricao).first()
+        return apresenta_servico(servico) if servico else None
+
+    # consulta a base apenas se o serviço não estiver em cache e responde
+    # 304 sem consultar os registros quando nada foi alterado
+    nao_modificado, servico = busca_condicional(
+        "servico", servico_descricao, carrega, "servico")
+    if nao_modificado:
+        return nao_modificado
 
     if not servico:
         # se o servico não for encontrado
         error_msg = "Serviço não encontrado na base :/"
         logger.warning(
-            f"Erro ao buscar o servico '{servico_descricao}', {error_msg}")
+            "Erro ao buscar o servico '%s', %s", servico_descricao, error_msg)
         return {"message": error_msg}, 404
     else:
-        logger.debug(f"Serviço encontrado: '{servico.descricao}'")
+        logger.debug("Serviço encontrado: '%s'", servico['descricao'])
         # retorna a representação de serviço
-        return apresenta_servico(servico), 200
+        return servico, 200
 
 
-@app.delete('/servico', tags=[servico_tag],
-            responses={"204": None, "404": ErrorSchema, "500": ErrorSchema})
+@api.delete('/servico', tags=[servico_tag],
+            responses={"204": None, "404": ErrorSchema, "409": ErrorSchema,
+                       "500": ErrorSchema})
 def del_servico(form: ServicoBuscaDeleteSchema):
     """Excuir o registro de serviço cadastro com base no id"""
     id = form.id
 
-    logger.debug(f"Excluindo o Serviço ID #{id}")
+    logger.debug("Excluindo o Serviço ID #%s", id)
     try:
         # criando conexão com a base
         session = Session()
         # fazendo a remoção
         count = session.query(Servico).filter(Servico.id == id).delete()
         session.commit()
+        cache.invalida("servico")
 
         if count:
             # retorna sem representação com apenas o codigo http 204
-            logger.debug(f"Excluindo o serviço ID #{id}")
+            logger.debug("Excluindo o serviço ID #%s", id)
             return '', 204
         else:
             # se o serviço não foi encontrado, retorna o codigo not found 404
             error_msg = "Serviço não encontrado na base :/"
-            logger.warning(f"Erro ao excluir o serviço #'{id}', {error_msg}")
+            logger.warning(
+                "Erro ao excluir o serviço #'%s', %s", id, error_msg)
             return '', 404
 
+    except IntegrityError:
+        # a base recusa a exclusão de um serviço com agendamentos
+        error_msg = "o serviço está referenciado em um agendamento!"
+        logger.warning("Erro ao excluir o serviço #'%s', %s", id, error_msg)
+        return {"message": error_msg}, 409
     except Exception as e:
         # caso um erro fora do previsto
         error_msg = f"Não foi possível excluir o serviço :/{e.__str__}"
         logger.warning(
-            f"Erro ao excluir o serviço com ID #'{id}', {error_msg}")
+            "Erro ao excluir o serviço com ID #'%s', %s", id, error_msg)
+        return {"message": error_msg}, 500
+
+
+# ***************************************************  Relatórios ***************************************
+def periodo_relatorio(query: RelatorioBuscaSchema):
+    """ Retorna as datas do período do relatório. Gera ValueError quando as
+        datas são inválidas ou o período não tem entre 1 e 31 dias.
+
+    """
+    inicio = datetime.strptime(query.data_inicio, "%d/%m/%Y").date()
+    fim = datetime.strptime(query.data_fim, "%d/%m/%Y").date()
+    if not timedelta(0) <= fim - inicio < timedelta(days=31):
+        raise ValueError("O período deve ter entre 1 e 31 dias")
+    return inicio, fim
+
+
+@api.get('/relatorio/faturamento', tags=[relatorio_tag],
+         responses={"200": RelatorioFaturamentoSchema, "400": ErrorSchema,
+                    "500": ErrorSchema})
+def get_relatorio_faturamento(query: FaturamentoBuscaSchema):
+    """Consulta o faturamento por dia e profissional (ou serviço)
+
+    Retorna a quantidade de agendamentos e o faturamento, pelo valor atual
+    de cada serviço, lidos do resumo de agendamentos.
+    """
+    logger.debug("Consultando o faturamento por %s", query.agrupamento)
+    try:
+        inicio, fim = periodo_relatorio(query)
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao consultar o faturamento, %s", error_msg)
+        return {"message": error_msg}, 400
+
+    # responde 304 sem consultar o resumo quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "profissional",
+                                          "servico")
+    if nao_modificado:
+        return nao_modificado
+    try:
+        # criando conexão com a base
+        session = Session()
+        linhas = faturamento(session, inicio, fim, query.agrupamento,
+                             query.profissional_id, query.servico_id)
+        logger.debug("%d linhas de faturamento encontradas", len(linhas))
+        return apresenta_faturamento(query.agrupamento, linhas), 200
+    except Exception as e:
+        # caso um erro fora do previsto
+        error_msg = f"Não foi possível consultar o faturamento :/{str(e)}"
+        logger.warning("Erro ao consultar o faturamento, %s", error_msg)
+        return {"message": error_msg}, 500
+
+
+@api.get('/relatorio/ocupacao', tags=[relatorio_tag],
+         responses={"200": RelatorioOcupacaoSchema, "400": ErrorSchema,
+                    "500": ErrorSchema})
+def get_relatorio_ocupacao(query: RelatorioBuscaSchema):
+    """Consulta a ocupação dos profissionais por dia
+
+    Retorna os minutos agendados, pela duração atual de cada serviço, e a
+    fração do expediente ocupada, lidos do resumo de agendamentos.
+    """
+    logger.debug("Consultando a ocupação dos profissionais")
+    try:
+        inicio, fim = periodo_relatorio(query)
+    except ValueError as e:
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning("Erro ao consultar a ocupação, %s", error_msg)
+        return {"message": error_msg}, 400
+
+    # responde 304 sem consultar o resumo quando nada foi alterado
+    nao_modificado = resposta_condicional("agendamento", "profissional",
+                                          "servico")
+    if nao_modificado:
+        return nao_modificado
+    try:
+        # criando conexão com a base
+        session = Session()
+        linhas = ocupacao(session, inicio, fim, query.profissional_id)
+        logger.debug("%d linhas de ocupação encontradas", len(linhas))
+        return apresenta_ocupacao(linhas), 200
+    except Exception as e:
+        # caso um erro fora do previsto
+        error_msg = f"Não foi possível consultar a ocupação :/{str(e)}"
+        logger.warning("Erro ao consultar a ocupação, %s", error_msg)
         return {"message": error_msg}, 500
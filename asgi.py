@@ -0,0 +1,254 @@
+""" Modo ASGI da API.
+
+    As consultas de agendamento são atendidas por rotas assíncronas, com a
+    engine assíncrona do SQLAlchemy (aiosqlite no sqlite local), assim uma
+    conexão lenta não ocupa uma thread. Elas rodam no contexto de
+    requisição da aplicação Flask, com os mesmos hooks (CORS, log de
+    acesso, métricas, perfil X-Profile). As demais rotas (inclusões,
+    edições, documentação, /metrics...) são as mesmas da aplicação Flask,
+    executadas em um pool de threads pelo a2wsgi. A aplicação Flask é
+    criada no início do servidor (lifespan) ou na primeira requisição, e
+    não na importação do módulo.
+
+    Execução:
+        uvicorn asgi:app --workers 4
+"""
+from datetime import datetime
+from io import BytesIO
+import os
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from pydantic import ValidationError
+from werkzeug.wrappers import Response
+
+from app import create_app, versao_consulta, esta_atualizado,\
+                cabecalhos_versao, filtros_agendamento
+from logger import logger
+from serializacao import resposta_json
+from model import Agendamento, consulta_agendamentos,\
+                  consulta_linhas_agendamentos, pagina_keyset,\
+                  cria_engine_assincrona, db_url, pool_config, engine,\
+                  verifica_versao
+from schemas import *
+
+
+engine_assincrona, SessaoAssincrona = cria_engine_assincrona(db_url,
+                                                             pool_config)
+# aplicação Flask e as suas rotas executadas em um pool de threads, criadas
+# por aplicacao()
+app_wsgi = None
+app_threads = None
+
+# (método, caminho) -> (rota assíncrona, schema dos parâmetros de consulta)
+rotas = {}
+
+TABELAS_AGENDAMENTO = ("agendamento", "cliente", "profissional", "servico")
+
+
+def rota(metodo: str, caminho: str, schema):
+    """ Registra uma rota assíncrona, que recebe a requisição e os
+        parâmetros de consulta já validados pelo schema.
+
+    """
+    def registra(funcao):
+        rotas[(metodo, caminho)] = (funcao, schema)
+        return funcao
+    return registra
+
+
+def aplicacao():
+    """ Retorna a aplicação Flask, criada (com o pool de threads das demais
+        rotas) apenas na primeira chamada.
+
+    """
+    global app_wsgi, app_threads
+    if app_wsgi is None:
+        app_wsgi = create_app()
+        app_threads = WSGIMiddleware(
+            app_wsgi, workers=int(os.environ.get("ASGI_THREADS", 32)))
+    return app_wsgi
+
+
+def valida_consulta(requisicao, schema):
+    """ Valida os parâmetros de consulta pelo schema. Retorna o schema
+        preenchido ou a mesma resposta 422 das rotas do flask_openapi3.
+
+    """
+    try:
+        return schema(**requisicao.args.to_dict())
+    except ValidationError as e:
+        return Response(e.json(), status=422,
+                        content_type="application/json")
+
+
+async def le_corpo(receive) -> bytes:
+    partes = []
+    while True:
+        mensagem = await receive()
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body"):
+            return b"".join(partes)
+
+
+async def envia_resposta(response, environ: dict, send):
+    cabecalhos = response.get_wsgi_headers(environ)
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(nome.lower().encode("latin1"), valor.encode("latin1"))
+                    for nome, valor in cabecalhos.to_wsgi_list()],
+    })
+    await send({"type": "http.response.body",
+                "body": b"" if response.status_code == 304
+                else response.get_data()})
+
+
+async def executa_rota(funcao, schema, scope, receive, send):
+    """ Executa a rota assíncrona no contexto de requisição da aplicação
+        Flask, com os mesmos before_request, after_request e teardown das
+        rotas Flask (medição dos comandos SQL, perfil X-Profile, log de
+        acesso, métricas, CORS e encerramento da sessão). Os parâmetros de
+        consulta são validados pelo schema, com a mesma resposta 422 das
+        rotas Flask.
+
+    """
+    environ = build_environ(scope, BytesIO(await le_corpo(receive)))
+    app_wsgi = aplicacao()
+    contexto = app_wsgi.request_context(environ)
+    contexto.push()
+    erro = None
+    try:
+        try:
+            response = app_wsgi.preprocess_request()
+            if response is None:
+                query = valida_consulta(contexto.request, schema)
+                response = query if isinstance(query, Response)\
+                    else await funcao(contexto.request, query)
+        except Exception as e:
+            erro = e
+            error_msg = f"Não foi possível consultar o agendamento :/{str(e)}"
+            logger.warning("Erro ao consultar %s, %s", scope["path"],
+                           error_msg)
+            response = resposta_json({"message": error_msg}, 500)
+        response = app_wsgi.process_response(response)
+    finally:
+        contexto.pop(erro)
+    await envia_resposta(response, environ, send)
+
+
+async def app(scope, receive, send):
+    """ Aplicação ASGI. """
+    if scope["type"] == "lifespan":
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                try:
+                    verifica_versao(engine)
+                    aplicacao()
+                except RuntimeError as e:
+                    logger.error(str(e))
+                    await send({"type": "lifespan.startup.failed",
+                                "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                await engine_assincrona.dispose()
+                if app_threads is not None:
+                    app_threads.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+    aplicacao()
+    assincrona = rotas.get((scope["method"], scope["path"]))
+    if assincrona is None:
+        await app_threads(scope, receive, send)
+    else:
+        await executa_rota(*assincrona, scope, receive, send)
+
+
+# ***************************************************  Rotas assíncronas
+@rota("GET", "/agendamentos", AgendamentoListagemBuscaSchema)
+async def get_agendamentos(requisicao, query):
+    """ Mesma consulta de app.get_agendamentos, com a sessão assíncrona. """
+    try:
+        chave = None
+        if query.cursor:
+            data_agenda, pk = decodifica_cursor(query.cursor, str, int)
+            chave = (datetime.fromisoformat(data_agenda), pk)
+        filtros = filtros_agendamento(query)
+    except (TypeError, ValueError) as e:
+        # cursor ou datas em formato invalido
+        error_msg = f"Parâmetros de consulta inválidos :/{str(e)}"
+        logger.warning(
+            "Erro ao consultar os agendamentos dos clientes, %s", error_msg)
+        return resposta_json({"message": error_msg}, 400)
+
+    async with SessaoAssincrona() as sessao:
+        etag, alterado_em = await sessao.run_sync(
+            versao_consulta, requisicao.full_path, TABELAS_AGENDAMENTO)
+        if esta_atualizado(requisicao, etag, alterado_em):
+            return cabecalhos_versao(Response(status=304), etag, alterado_em)
+        agendamentos, proxima = await sessao.run_sync(
+            lambda session: pagina_keyset(
+                consulta_linhas_agendamentos(session).filter(*filtros),
+                [Agendamento.data_agenda, Agendamento.id],
+                chave, query.limit))
+
+    next_cursor = None
+    if proxima:
+        ultimo = agendamentos[-1]
+        next_cursor = codifica_cursor(ultimo.data_agenda.isoformat(),
+                                      ultimo.agenda_id)
+    return cabecalhos_versao(
+        resposta_json(apresenta_linhas_agendamentos(agendamentos,
+                                                    next_cursor)),
+        etag, alterado_em)
+
+
+async def primeiro_agendamento(requisicao, filtro):
+    """ Retorna o primeiro agendamento que atende ao filtro, como nas rotas
+        de consulta por codigo, cliente, profissional e serviço.
+
+    """
+    async with SessaoAssincrona() as sessao:
+        etag, alterado_em = await sessao.run_sync(
+            versao_consulta, requisicao.full_path, TABELAS_AGENDAMENTO)
+        if esta_atualizado(requisicao, etag, alterado_em):
+            return cabecalhos_versao(Response(status=304), etag, alterado_em)
+        agendamento = await sessao.run_sync(
+            lambda session: consulta_agendamentos(session)
+            .filter(filtro).first())
+
+    if not agendamento:
+        error_msg = "Agendamento não encontrado na base :/"
+        logger.warning("Erro ao buscar o agendamento , %s", error_msg)
+        return resposta_json({"message": error_msg}, 404)
+    return cabecalhos_versao(resposta_json(apresenta_agendamento(agendamento)),
+                             etag, alterado_em)
+
+
+@rota("GET", "/agendamento_id", AgendamentoBuscaIdSchema)
+async def get_agendamento_id(requisicao, query):
+    return await primeiro_agendamento(requisicao,
+                                      Agendamento.id == query.id)
+
+
+@rota("GET", "/agendamento_cliente", AgendamentoBuscaClienteSchema)
+async def get_agendamento_cliente(requisicao, query):
+    return await primeiro_agendamento(
+        requisicao, Agendamento.cliente_id == query.cliente_id)
+
+
+@rota("GET", "/agendamento_profissional", AgendamentoBuscaProfissionalSchema)
+async def get_agendamento_profissional(requisicao, query):
+    return await primeiro_agendamento(
+        requisicao, Agendamento.profissional_id == query.profissional_id)
+
+
+@rota("GET", "/agendamento_servico", AgendamentoBuscaServicoSchema)
+async def get_agendamento_servico(requisicao, query):
+    return await primeiro_agendamento(
+        requisicao, Agendamento.servico_id == query.servico_id)
@@ -0,0 +1,11 @@
+""" Benchmarks da API, executados a partir da raiz do projeto:
+
+    python -m benchmarks.rotas      latência e vazão de todas as rotas
+    python -m benchmarks.leitura    leituras da listagem (ORM x colunas)
+    python -m benchmarks.carga      sessões e pool de conexões sob carga
+    python -m benchmarks.sqlite     perfil de ajuste do sqlite
+    python -m benchmarks.conflito   conferência de conflito de horário
+    python -m benchmarks.log        custo do log nas requisições
+
+    As partes comuns ficam em benchmarks.comum.
+"""
@@ -0,0 +1,178 @@
+""" Teste de carga das sessões e do pool de conexões.
+
+    Executa uma longa sequência de requisições (por padrão 100 mil) pelo
+    test client do Flask, com várias threads, misturando listagens,
+    consultas, a exportação em streaming e inclusões que falham (e desfazem
+    a transação). A cada amostra registra as conexões do pool (abertas, em
+    uso e criadas desde o início), os descritores de arquivo e a memória
+    residente (RSS) do processo, e confere ao final se ficaram limitados:
+    as conexões em uso nunca passam de DB_POOL_SIZE + DB_MAX_OVERFLOW e o
+    RSS cresce menos que --limite-rss depois do aquecimento. O resultado é
+    gravado em um arquivo json e o código de saída é 1 se algum limite foi
+    ultrapassado.
+
+    Exemplo:
+        python -m benchmarks.carga --requisicoes 100000 --concorrencia 8 \\
+            --saida benchmark_carga.json
+"""
+from threading import Lock
+from urllib.parse import urlencode
+import os
+import random
+import sys
+
+from benchmarks.comum import argumentos, argumentos_requisicoes,\
+                             prepara_base, inicia_resultado,\
+                             grava_resultado, distribui
+
+
+def parametros():
+    parser = argumentos(__doc__.split("\n")[0], "benchmark_carga.json")
+    argumentos_requisicoes(parser, 100000, 8, "total de requisições")
+    parser.add_argument("--amostras", type=int, default=20,
+                        help="amostras de conexões e memória")
+    parser.add_argument("--limite-rss", type=float, default=20.0,
+                        help="crescimento máximo do RSS (MiB) após a "
+                             "primeira amostra")
+    return parser.parse_args()
+
+
+def rotas(args):
+    """ Requisições da carga, escolhidas em sequência: (método, função que
+        gera a url e o formulário da requisição).
+
+    """
+    from model import nome_gerado
+
+    aleatorio = random.Random(args.semente)
+    profissional = lambda: aleatorio.randint(1, args.profissionais)
+    return [
+        ("GET", lambda: ("/agendamentos?" + urlencode(
+            {"profissional_id": profissional(), "limit": 100}), None)),
+        ("GET", lambda: ("/agendamento_id?" + urlencode(
+            {"id": aleatorio.randint(1, args.agendamentos)}), None)),
+        ("GET", lambda: ("/cliente?" + urlencode(
+            {"nome": nome_gerado(aleatorio.randint(1, args.clientes))}),
+            None)),
+        ("GET", lambda: ("/agendamentos/exportacao?" + urlencode(
+            {"formato": "csv", "profissional_id": profissional(),
+             "data_inicio": "02/01/2023 00:00:00",
+             "data_fim": "09/01/2023 00:00:00"}), None)),
+        # cliente inexistente, em um horário livre: a chave estrangeira
+        # recusa a inclusão e a sessão precisa desfazer a transação
+        ("POST", lambda: ("/agendamento", {
+            "data_agenda": "04/01/2100 10:00:00",
+            "cliente_id": args.clientes + 1,
+            "profissional_id": profissional(),
+            "servico_id": 1,
+            "observacao": "carga"})),
+    ]
+
+
+def memoria_mb() -> float:
+    """ Memória residente (RSS) atual do processo, em MiB. """
+    try:
+        with open("/proc/self/statm") as statm:
+            paginas = int(statm.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # fora do linux vale o pico de memória
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / (2 ** 20 if sys.platform == "darwin" else 1024)
+
+
+def descritores() -> int:
+    """ Descritores de arquivo abertos pelo processo (0 fora do linux). """
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+def main():
+    args = parametros()
+    engine = prepara_base(args)
+    engine.dispose()
+
+    from sqlalchemy import event
+    from app import create_app
+
+    criadas = [0]
+
+    @event.listens_for(engine, "connect")
+    def conta_conexao(dbapi_connection, connection_record):
+        criadas[0] += 1
+
+    cliente = create_app().test_client()
+    pool = engine.pool
+    limite_pool = pool.size() + pool._max_overflow
+    sequencia = rotas(args)
+    intervalo = max(1, args.requisicoes // args.amostras)
+
+    trava = Lock()
+    amostras = []
+    status = {}
+    em_uso = [0]
+
+    def amostra(feitas: int):
+        amostras.append({
+            "requisicoes": feitas,
+            "conexoes_abertas": pool.checkedin() + pool.checkedout(),
+            "conexoes_em_uso": pool.checkedout(),
+            "conexoes_criadas": criadas[0],
+            "descritores": descritores(),
+            "rss_mb": round(memoria_mb(), 1),
+        })
+        ultima = amostras[-1]
+        print(f"{feitas:8} requisições  conexões abertas "
+              f"{ultima['conexoes_abertas']:3}  em uso "
+              f"{ultima['conexoes_em_uso']:3}  criadas "
+              f"{ultima['conexoes_criadas']:4}  descritores "
+              f"{ultima['descritores']:4}  RSS {ultima['rss_mb']:7.1f} MiB")
+
+    def trabalho(n):
+        with trava:
+            metodo, gera = sequencia[n % len(sequencia)]
+            url, formulario = gera()
+        resposta = cliente.open(url, method=metodo, data=formulario)
+        # lê o corpo inteiro, o que encerra a exportação em streaming
+        resposta.get_data()
+        resposta.close()
+        with trava:
+            status[resposta.status_code] =\
+                status.get(resposta.status_code, 0) + 1
+            em_uso[0] = max(em_uso[0], pool.checkedout())
+            if (n + 1) % intervalo == 0:
+                amostra(n + 1)
+
+    duracao = distribui(args.requisicoes, args.concorrencia, trabalho)
+    # depois da carga nenhuma conexão pode continuar emprestada
+    amostra(args.requisicoes)
+
+    crescimento = amostras[-1]["rss_mb"] - amostras[0]["rss_mb"]
+    limitado = em_uso[0] <= limite_pool and\
+        amostras[-1]["conexoes_em_uso"] == 0 and\
+        crescimento <= args.limite_rss
+    resultado = dict(inicia_resultado(args), **{
+        "duracao_s": round(duracao, 1),
+        "vazao_rps": round(args.requisicoes / duracao, 1),
+        "status": {str(codigo): quantidade
+                   for codigo, quantidade in sorted(status.items())},
+        "limite_pool": limite_pool,
+        "conexoes_em_uso_max": em_uso[0],
+        "crescimento_rss_mb": round(crescimento, 1),
+        "limitado": limitado,
+        "amostras": amostras,
+    })
+    print(f"\n{args.requisicoes} requisições em {duracao:.1f} s, "
+          f"conexões em uso no máximo {em_uso[0]} (limite {limite_pool}), "
+          f"RSS cresceu {crescimento:.1f} MiB: "
+          f"{'limitado' if limitado else 'NÃO limitado'}")
+
+    grava_resultado(args, resultado)
+    sys.exit(0 if limitado else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+""" Partes comuns dos benchmarks: parâmetros, base sintética, servidor,
+    execução concorrente das requisições, percentis e gravação do resultado.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Thread, Lock
+from urllib.parse import urlencode
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+
+def argumentos(descricao: str, saida: str, **padroes):
+    """ Cria o parser com os parâmetros comuns a todos os benchmarks: o
+        volume da base sintética, o arquivo da base, a semente e o arquivo
+        de saída.
+
+        Argumentos:
+            padroes: valores padrão próprios do benchmark (ex.:
+                agendamentos=1000000)
+    """
+    parser = argparse.ArgumentParser(description=descricao)
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--profissionais", type=int, default=20)
+    parser.add_argument("--servicos", type=int, default=10)
+    parser.add_argument("--agendamentos", type=int, default=10000)
+    parser.add_argument("--base", default="",
+                        help="arquivo sqlite (padrão: arquivo temporário)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", default=saida)
+    parser.set_defaults(**padroes)
+    return parser
+
+
+def argumentos_requisicoes(parser, requisicoes: int, concorrencia: int,
+                           ajuda: str = "requisições por rota"):
+    """ Acrescenta ao parser a quantidade de requisições e a concorrência.
+    """
+    parser.add_argument("--requisicoes", type=int, default=requisicoes,
+                        help=ajuda)
+    parser.add_argument("--concorrencia", type=int, default=concorrencia,
+                        help="requisições simultâneas")
+
+
+def argumentos_servidor(parser):
+    """ Acrescenta ao parser os workers e a porta do servidor. """
+    parser.add_argument("--workers", type=int, default=4,
+                        help="workers do gunicorn e do uvicorn")
+    parser.add_argument("--porta", type=int, default=5099)
+
+
+def prepara_base(args):
+    """ Aponta a API para a base informada em --base (ou um arquivo
+        temporário) e a popula com os dados sintéticos se ela for nova.
+
+        Retorna a engine da base.
+    """
+    base = args.base or os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    # a url da base precisa estar definida antes de importar o model
+    os.environ["DB_URL"] = f"sqlite:///{base}"
+
+    from model import engine, migra, gera_dados
+
+    nova = not os.path.exists(base) or os.path.getsize(base) == 0
+    migra(engine)
+    if nova:
+        inicio = time.perf_counter()
+        gera_dados(engine, args.clientes, args.profissionais, args.servicos,
+                   args.agendamentos, args.semente)
+        print(f"Base {base} populada em "
+              f"{time.perf_counter() - inicio:.1f} s")
+    return engine
+
+
+def inicia_resultado(args) -> dict:
+    """ Início do resultado gravado: a data e os parâmetros da execução. """
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "configuracao": {campo: valor for campo, valor in vars(args).items()
+                         if campo != "saida"},
+    }
+
+
+def grava_resultado(args, resultado: dict):
+    """ Grava o resultado em json no arquivo de --saida. """
+    with open(args.saida, "w") as saida:
+        json.dump(resultado, saida, ensure_ascii=False, indent=2)
+    print(f"\nResultado gravado em {args.saida}")
+
+
+# escala, casas decimais e símbolo de cada unidade dos percentis
+UNIDADES = {"ms": (1e3, 3, "ms"), "us": (1e6, 1, "µs")}
+
+
+def percentis(duracoes: list, unidade: str = "ms") -> dict:
+    """ p50, p95, p99 e média das durações (s), na unidade informada. Com
+        menos de duas amostras os percentis são None.
+
+    """
+    escala, casas, _ = UNIDADES[unidade]
+    chaves = [f"{nome}_{unidade}" for nome in ("p50", "p95", "p99", "media")]
+    if len(duracoes) < 2:
+        media = round(duracoes[0] * escala, casas) if duracoes else None
+        return dict(zip(chaves, (None, None, None, media)))
+    quantis = statistics.quantiles(duracoes, n=100, method="inclusive")
+    return dict(zip(chaves, (round(valor * escala, casas) for valor in (
+        quantis[49], quantis[94], quantis[98], statistics.fmean(duracoes)))))
+
+
+def formata_percentis(resultado: dict, unidade: str = "ms") -> str:
+    """ Texto com o p50, p95 e p99 do resultado ('-' quando None). """
+    simbolo = UNIDADES[unidade][2]
+    return "  ".join(
+        f"{nome} {valor:9.2f} {simbolo}" if valor is not None
+        else f"{nome} {'-':>9} {simbolo}"
+        for nome, valor in ((nome, resultado[f"{nome}_{unidade}"])
+                            for nome in ("p50", "p95", "p99")))
+
+
+def distribui(total: int, concorrencia: int, trabalho) -> float:
+    """ Executa trabalho(n) para n de 0 a total - 1 em threads, com a
+        concorrência informada. Retorna a duração total (s).
+
+    """
+    proximo = iter(range(total))
+    trava = Lock()
+
+    def trabalhador():
+        while True:
+            with trava:
+                n = next(proximo, None)
+            if n is None:
+                return
+            trabalho(n)
+
+    inicio = time.perf_counter()
+    threads = [Thread(target=trabalhador) for _ in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - inicio
+
+
+def executa(requisicao, args, nome, metodo, gera):
+    """ Executa as requisições de uma rota com a concorrência informada e
+        retorna as estatísticas de latência e vazão.
+
+    """
+    trava = Lock()
+    latencias = []
+    erros = [0]
+
+    def trabalho(n):
+        with trava:
+            pedido = gera(n)
+        inicio = time.perf_counter()
+        try:
+            status = requisicao(metodo, *pedido)
+        except (OSError, urllib.error.URLError):
+            # conexão recusada ou encerrada pelo servidor
+            status = None
+        duracao = time.perf_counter() - inicio
+        with trava:
+            if status is None or status >= 400:
+                erros[0] += 1
+            else:
+                latencias.append(duracao)
+
+    total = distribui(args.requisicoes, args.concorrencia, trabalho)
+    resultado = {
+        "requisicoes": len(latencias) + erros[0],
+        "erros": erros[0],
+        **percentis(latencias),
+        "vazao_rps": round(len(latencias) / total, 1),
+    }
+    print(f"{nome:40} {formata_percentis(resultado)}"
+          f"  {resultado['vazao_rps']:8.1f} req/s"
+          f"  erros {resultado['erros']}")
+    return resultado
+
+
+def cliente_flask():
+    """ Retorna a função que envia uma requisição pelo test client do
+        Flask, no próprio processo.
+
+    """
+    from app import create_app
+
+    cliente = create_app().test_client()
+
+    def requisicao(metodo, url, formulario, corpo=None):
+        return cliente.open(url, method=metodo, data=formulario,
+                            json=corpo).status_code
+    return requisicao
+
+
+def gunicorn(args) -> list:
+    """ Comando do servidor gunicorn com os workers e a porta informados. """
+    return ["gunicorn", "--preload", "-w", str(args.workers),
+            "-b", f"127.0.0.1:{args.porta}", "app:create_app()"]
+
+
+# tentativas, a cada 0,1 s, de conectar ao servidor iniciado
+TENTATIVAS_SERVIDOR = 300
+
+
+@contextmanager
+def servidor(args, comando: list, ambiente: dict = None):
+    """ Inicia um servidor (gunicorn ou uvicorn) com o comando informado,
+        aguarda até ele aceitar conexões e retorna a função que envia uma
+        requisição ao servidor. O servidor é encerrado ao sair do bloco.
+        Se o servidor terminar ou não responder, levanta RuntimeError com o
+        final da sua saída de erros.
+
+        Argumentos:
+            ambiente: variáveis de ambiente acrescentadas às do processo
+    """
+    endereco = f"127.0.0.1:{args.porta}"
+    # com a porta ocupada as requisições iriam para outro servidor. Como
+    # no servidor, as conexões em TIME_WAIT não impedem o bind
+    with socket.socket() as teste:
+        teste.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            teste.bind(("127.0.0.1", args.porta))
+        except OSError as e:
+            raise RuntimeError(f"porta {args.porta} ocupada: {e}")
+    # a saída de erros do servidor fica em um arquivo, para o diagnóstico
+    saida_erros = tempfile.NamedTemporaryFile(
+        "w+", prefix="servidor_", suffix=".log", delete=False)
+    processo = subprocess.Popen(
+        [sys.executable, "-m"] + comando,
+        env=dict(os.environ, **(ambiente or {})),
+        stdout=subprocess.DEVNULL, stderr=saida_erros)
+
+    def erros_servidor() -> str:
+        saida_erros.flush()
+        with open(saida_erros.name) as arquivo:
+            return "".join(arquivo.readlines()[-20:])
+
+    def requisicao(metodo, url, formulario, corpo=None):
+        dados = urlencode(formulario).encode() if formulario else None
+        cabecalhos = {}
+        if corpo is not None:
+            dados = json.dumps(corpo).encode()
+            cabecalhos["Content-Type"] = "application/json"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(
+                    f"http://{endereco}{url}", data=dados, headers=cabecalhos,
+                    method=metodo)) as resposta:
+                resposta.read()
+                return resposta.status
+        except urllib.error.HTTPError as erro:
+            return erro.code
+
+    try:
+        # aguarda o servidor aceitar conexões
+        for _ in range(TENTATIVAS_SERVIDOR):
+            if processo.poll() is not None:
+                raise RuntimeError(
+                    f"{comando[0]} encerrado com o código "
+                    f"{processo.returncode} ({saida_erros.name}):\n"
+                    f"{erros_servidor()}")
+            try:
+                requisicao("GET", "/servicos", None)
+                break
+            except urllib.error.URLError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError(
+                f"{comando[0]} não respondeu em {endereco} após "
+                f"{TENTATIVAS_SERVIDOR / 10:.0f} s ({saida_erros.name}):\n"
+                f"{erros_servidor()}")
+    except BaseException:
+        processo.terminate()
+        processo.wait()
+        saida_erros.close()
+        raise
+    try:
+        yield requisicao
+    finally:
+        processo.terminate()
+        processo.wait()
+        saida_erros.close()
+        os.remove(saida_erros.name)
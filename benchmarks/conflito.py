@@ -0,0 +1,131 @@
+""" Benchmark da conferência de conflito de horário dos agendamentos.
+
+    Cria (ou reaproveita) uma base sqlite com 1 milhão de agendamentos e
+    mede a latência (p50, p95, p99) da conferência de sobreposição de
+    horário de um profissional em instantes aleatórios do período gravado:
+    pela consulta na faixa do índice (profissional_id, data_agenda)
+    (conflito_agenda, usada em POST e PUT /agendamento), pela agenda em
+    memória dos lotes (AgendaProfissionais) e pela rota POST /agendamento
+    no test client do Flask, que responde 409 nos horários ocupados. O
+    resultado é gravado em um arquivo json.
+
+    Exemplo:
+        python -m benchmarks.conflito --agendamentos 1000000 \\
+            --conferencias 5000 --base conflito.sqlite3
+"""
+from datetime import timedelta
+import random
+import time
+
+from benchmarks.comum import argumentos, prepara_base, inicia_resultado,\
+                             grava_resultado, percentis, formata_percentis
+
+
+def parametros():
+    parser = argumentos(__doc__.split("\n")[0], "benchmark_conflito.json",
+                        clientes=10000, profissionais=50,
+                        agendamentos=1000000)
+    parser.add_argument("--conferencias", type=int, default=5000,
+                        help="conferências medidas em cada caminho")
+    return parser.parse_args()
+
+
+def estatisticas(nome: str, duracoes: list, conflitos: int) -> dict:
+    """ Percentis (µs) das durações e a proporção de horários ocupados. """
+    resultado = dict(conferencias=len(duracoes), conflitos=conflitos,
+                     **percentis(duracoes, "us"))
+    print(f"{nome:30} {formata_percentis(resultado, 'us')}"
+          f"  ocupados {conflitos}/{len(duracoes)}")
+    return resultado
+
+
+def main():
+    args = parametros()
+    engine = prepara_base(args)
+
+    from sqlalchemy import func
+    from model import Session, Agendamento, Servico, conflito_agenda,\
+                      AgendaProfissionais
+    from app import create_app
+
+    session = Session()
+    primeiro, ultimo, total = session.query(
+        func.min(Agendamento.data_agenda), func.max(Agendamento.data_agenda),
+        func.count(Agendamento.id)).one()
+    duracoes = dict(session.query(Servico.id, Servico.duracao))
+    print(f"{total} agendamentos de {primeiro} a {ultimo}")
+
+    aleatorio = random.Random(args.semente)
+    periodo = int((ultimo - primeiro).total_seconds() // 60)
+    # (profissional, início em minutos inteiros, serviço) de cada conferência
+    conferencias = [
+        (aleatorio.randint(1, args.profissionais),
+         primeiro + timedelta(minutes=aleatorio.randint(0, periodo)),
+         aleatorio.choice(list(duracoes)))
+        for _ in range(args.conferencias)]
+
+    resultado = dict(inicia_resultado(args), agendamentos=total,
+                     caminhos={})
+
+    # consulta na faixa do índice, a cada conferência
+    medidas, conflitos = [], 0
+    for profissional, inicio, servico in conferencias:
+        comeco = time.perf_counter()
+        conflito = conflito_agenda(session, profissional, inicio,
+                                   duracoes[servico])
+        medidas.append(time.perf_counter() - comeco)
+        conflitos += conflito is not None
+    resultado["caminhos"]["conflito_agenda"] = estatisticas(
+        "conflito_agenda (índice)", medidas, conflitos)
+
+    # agenda em memória, como nos lotes (POST /agendamentos/lote): os
+    # agendamentos de uma semana são carregados uma vez e cada conferência
+    # é uma busca binária
+    semana = primeiro + timedelta(days=aleatorio.randint(
+        0, max(0, (ultimo - primeiro).days - 7)))
+    lote = [(profissional, semana + timedelta(
+        minutes=aleatorio.randint(0, 7 * 24 * 60)), servico)
+        for profissional, _, servico in conferencias]
+    comeco = time.perf_counter()
+    agenda = AgendaProfissionais.carrega(
+        session, [{"profissional_id": profissional, "data_agenda": inicio,
+                   "servico_id": servico}
+                  for profissional, inicio, servico in lote], duracoes)
+    carga = time.perf_counter() - comeco
+    medidas, conflitos = [], 0
+    for profissional, inicio, servico in lote:
+        comeco = time.perf_counter()
+        conflito = agenda.conflito(profissional, inicio, duracoes[servico])
+        medidas.append(time.perf_counter() - comeco)
+        conflitos += conflito
+    resultado["caminhos"]["agenda_memoria"] = estatisticas(
+        "AgendaProfissionais (lote)", medidas, conflitos)
+    resultado["caminhos"]["agenda_memoria"]["carga_s"] = round(carga, 3)
+    print(f"{'':30} agenda da semana carregada em {carga * 1000:.1f} ms")
+    Session.remove()
+
+    # rota completa, apenas nos horários ocupados (409, sem gravação)
+    cliente = create_app().test_client()
+    medidas = []
+    for profissional, inicio, servico in conferencias:
+        comeco = time.perf_counter()
+        resposta = cliente.post("/agendamento", data={
+            "data_agenda": inicio.strftime("%d/%m/%Y %H:%M:%S"),
+            "cliente_id": 1, "profissional_id": profissional,
+            "servico_id": servico, "observacao": "benchmark"})
+        duracao = time.perf_counter() - comeco
+        if resposta.status_code == 409:
+            medidas.append(duracao)
+        elif resposta.status_code == 200:
+            # horário livre: desfaz a inclusão para não alterar a base
+            cliente.delete("/agendamento", data={
+                "id": resposta.get_json()["agenda_id"]})
+    resultado["caminhos"]["POST /agendamento (409)"] = estatisticas(
+        "POST /agendamento (409)", medidas, len(medidas))
+    engine.dispose()
+
+    grava_resultado(args, resultado)
+
+
+if __name__ == "__main__":
+    main()
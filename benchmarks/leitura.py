@@ -0,0 +1,144 @@
+""" Microbenchmark das leituras da listagem de agendamentos.
+
+    Compara a consulta pelo ORM (consulta_agendamentos, que monta os
+    objetos Agendamento, Cliente, Profissional e Servico) com a consulta
+    por colunas (consulta_linhas_agendamentos, que retorna tuplas Row),
+    incluindo a montagem da representação do AgendamentoViewSchema. Mostra
+    os registros lidos por segundo e o pico de memória (tracemalloc) de
+    cada caminho e grava o resultado em um arquivo json.
+
+    Exemplo:
+        python -m benchmarks.leitura --agendamentos 100000 --limite 100 \\
+            --paginas 200 --saida benchmark_leitura.json
+"""
+import gc
+import time
+import tracemalloc
+
+from benchmarks.comum import argumentos, prepara_base, inicia_resultado,\
+                             grava_resultado
+
+
+def parametros():
+    parser = argumentos(__doc__.split("\n")[0], "benchmark_leitura.json",
+                        agendamentos=100000)
+    parser.add_argument("--limite", type=int, default=100,
+                        help="registros por página")
+    parser.add_argument("--paginas", type=int, default=200,
+                        help="páginas lidas em sequência (cursor)")
+    parser.add_argument("--repeticoes", type=int, default=3,
+                        help="execuções de cada caminho (vale a melhor)")
+    return parser.parse_args()
+
+
+def caminhos():
+    """ Caminhos comparados: nome -> (consulta, representação da página,
+        representação de um registro, chave do cursor do último registro).
+
+    """
+    from model import Agendamento, consulta_agendamentos,\
+                      consulta_linhas_agendamentos
+    from schemas import apresenta_agendamento, apresenta_agendamentos,\
+                        apresenta_linhas_agendamentos
+
+    return {
+        "orm": (consulta_agendamentos, apresenta_agendamentos,
+                apresenta_agendamento,
+                lambda ultimo: (ultimo.data_agenda, ultimo.id)),
+        "projecao": (consulta_linhas_agendamentos,
+                     apresenta_linhas_agendamentos,
+                     lambda linha: linha._asdict(),
+                     lambda ultimo: (ultimo.data_agenda, ultimo.agenda_id)),
+    }
+
+
+def le_paginas(args, consulta, apresenta, _, chave_cursor) -> int:
+    """ Lê as páginas da listagem como a rota GET /agendamentos, uma
+        sessão por página. Retorna a quantidade de registros lidos.
+
+    """
+    from model import Session, Agendamento, pagina_keyset
+
+    lidos = 0
+    chave = None
+    for _ in range(args.paginas):
+        session = Session()
+        registros, proxima = pagina_keyset(
+            consulta(session), [Agendamento.data_agenda, Agendamento.id],
+            chave, args.limite)
+        apresenta(registros)
+        lidos += len(registros)
+        if registros:
+            chave = chave_cursor(registros[-1])
+        Session.remove()
+        if not proxima:
+            break
+    return lidos
+
+
+def le_tudo(args, consulta, _, apresenta_registro, __) -> int:
+    """ Lê todos os agendamentos em lotes, como a exportação. Retorna a
+        quantidade de registros lidos.
+
+    """
+    from model import Session, Agendamento
+
+    lidos = 0
+    session = Session()
+    for registro in consulta(session)\
+            .order_by(Agendamento.data_agenda, Agendamento.id)\
+            .yield_per(1000):
+        apresenta_registro(registro)
+        lidos += 1
+    Session.remove()
+    return lidos
+
+
+def mede(args, leitura, caminho) -> dict:
+    """ Executa a leitura pelo caminho informado e retorna a vazão (melhor
+        das repetições) e o pico de memória.
+
+    """
+    melhor = None
+    for _ in range(args.repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        lidos = leitura(args, *caminho)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+
+    # o tracemalloc deixa a execução mais lenta, então o pico de memória é
+    # medido em uma execução separada
+    gc.collect()
+    tracemalloc.start()
+    leitura(args, *caminho)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "registros": lidos,
+        "segundos": round(melhor, 4),
+        "registros_por_segundo": round(lidos / melhor, 1),
+        "pico_memoria_kib": round(pico / 1024, 1),
+    }
+
+
+def main():
+    args = parametros()
+    prepara_base(args)
+
+    resultado = dict(inicia_resultado(args), leituras={})
+    for nome_leitura, leitura in (("paginas", le_paginas),
+                                  ("exportacao", le_tudo)):
+        print(f"\nLeitura {nome_leitura}")
+        medidas = resultado["leituras"][nome_leitura] = {}
+        for nome, caminho in caminhos().items():
+            medida = medidas[nome] = mede(args, leitura, caminho)
+            print(f"{nome:10} {medida['registros']:8} registros"
+                  f"  {medida['registros_por_segundo']:10.1f} registros/s"
+                  f"  pico {medida['pico_memoria_kib']:10.1f} KiB")
+
+    grava_resultado(args, resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" Benchmark do custo do log nas requisições.
+
+    Executa as rotas do benchmarks.rotas pelo test client do Flask, no próprio
+    processo, com o log completo (console, arquivos e log de acesso, pelas
+    filas do logger.py), sem o log de acesso e com todo o log desligado
+    (logging.disable), e mostra a latência (p50, p95, p99) e a vazão de
+    cada rota em cada modo, após uma rodada de aquecimento. O resultado é
+    gravado em um arquivo json.
+
+    Exemplo:
+        python -m benchmarks.log --agendamentos 100000 --requisicoes 2000 \\
+            --saida benchmark_log.json
+"""
+import logging
+
+from benchmarks.comum import argumentos, argumentos_requisicoes,\
+                             prepara_base, inicia_resultado,\
+                             grava_resultado, executa, cliente_flask
+from benchmarks.rotas import cenarios
+
+
+def parametros():
+    parser = argumentos(__doc__.split("\n")[0], "benchmark_log.json")
+    argumentos_requisicoes(parser, 1000, 1)
+    return parser.parse_args()
+
+
+def modos():
+    """ Modos comparados: nome -> função que ajusta o log antes das
+        requisições.
+
+    """
+    acesso = logging.getLogger("acesso")
+
+    def completo():
+        logging.disable(logging.NOTSET)
+        acesso.setLevel(logging.INFO)
+
+    def sem_acesso():
+        logging.disable(logging.NOTSET)
+        acesso.setLevel(logging.WARNING)
+
+    def desligado():
+        # nenhum registro é criado, em nenhum logger
+        logging.disable(logging.CRITICAL)
+
+    return {"completo": completo, "sem acesso": sem_acesso,
+            "desligado": desligado}
+
+
+def main():
+    args = parametros()
+    prepara_base(args)
+
+    requisicao = cliente_flask()
+    resultado = dict(inicia_resultado(args), modos={})
+    # aquecimento (cache, conexões do pool e páginas da base), fora da
+    # medição, para que o primeiro modo não fique em desvantagem
+    print("\nAquecimento")
+    for nome, metodo, gera in cenarios(args):
+        executa(requisicao, args, nome, metodo, gera)
+
+    for nome_modo, ajusta in modos().items():
+        print(f"\nLog {nome_modo}")
+        ajusta()
+        resultado["modos"][nome_modo] = {
+            nome: executa(requisicao, args, nome, metodo, gera)
+            for nome, metodo, gera in cenarios(args)}
+    logging.disable(logging.NOTSET)
+
+    grava_resultado(args, resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+""" Benchmark de carga das rotas da API.
+
+    Cria uma base sqlite com o volume de dados informado (model.gerador),
+    executa as rotas pelo test client do Flask, por um servidor gunicorn
+    e/ou por um servidor uvicorn (modo ASGI) e mostra a latência (p50, p95,
+    p99) e a vazão de cada rota, gravando o resultado em um arquivo json.
+
+    Exemplo:
+        python -m benchmarks.rotas --agendamentos 100000 \\
+            --requisicoes 1000 --modo gunicorn asgi --workers 4 \\
+            --saida benchmark.json
+"""
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import random
+import time
+
+from benchmarks.comum import argumentos, argumentos_requisicoes,\
+                             argumentos_servidor, prepara_base,\
+                             inicia_resultado, grava_resultado, executa,\
+                             cliente_flask, gunicorn, servidor
+
+
+def parametros():
+    parser = argumentos(__doc__.split("\n")[0], "benchmark.json")
+    argumentos_requisicoes(parser, 500, 4)
+    parser.add_argument("--modo", nargs="+", default=["cliente"],
+                        choices=["cliente", "gunicorn", "asgi"],
+                        help="um ou mais modos de execução")
+    argumentos_servidor(parser)
+    return parser.parse_args()
+
+
+# agendamentos por requisição nas rotas de lote
+ITENS_LOTE = 10
+
+
+def criados(consulta):
+    """ Retorna a função que dá o n-ésimo registro criado pelo próprio
+        benchmark. A consulta só é feita na primeira chamada, quando as
+        inclusões da rota anterior já terminaram.
+
+    """
+    from model import Session
+
+    registros = []
+
+    def registro(n):
+        if not registros:
+            registros.extend(consulta(Session()))
+            Session.remove()
+        return registros[n % len(registros)] if registros else None
+    return registro
+
+
+def cenarios(args):
+    """ Rotas executadas no benchmark: (nome, método, função que gera a
+        requisição n). A requisição é (url, formulário) ou, nas rotas que
+        recebem json, (url, None, corpo).
+
+        Todas as rotas da API são executadas, exceto a documentação (/ e
+        /openapi) e o /metrics. As consultas vêm primeiro, sobre os dados
+        gerados; depois cada cadastro é incluído, editado e excluído pelo
+        próprio benchmark, com nomes e observações marcados com a
+        execução, assim a base volta ao estado inicial e pode ser
+        reaproveitada (--base).
+    """
+    from sqlalchemy import func
+    from model import Session, Agendamento, Cliente, Profissional, Servico,\
+                      nome_gerado
+
+    aleatorio = random.Random(args.semente)
+    profissional = lambda: aleatorio.randint(1, args.profissionais)
+    cliente = lambda: aleatorio.randint(1, args.clientes)
+    session = Session()
+    primeiro, ultimo = session.query(func.min(Agendamento.data_agenda),
+                                     func.max(Agendamento.data_agenda)).one()
+    servicos = [descricao for descricao, in session.query(
+        Servico.descricao).order_by(Servico.id).limit(args.servicos)]
+    # agendamentos gerados usados nas consultas por cliente e data
+    amostra = session.query(Agendamento.cliente_id, Agendamento.data_agenda)\
+        .filter(Agendamento.id.in_([aleatorio.randint(1, args.agendamentos)
+                                    for _ in range(100)])).all()
+    Session.remove()
+    servico = lambda: aleatorio.randint(1, len(servicos))
+    # semana e mês do início dos dados gerados
+    inicio = primeiro or datetime(2023, 1, 2)
+    semana = {"data_inicio": inicio.strftime("%d/%m/%Y"),
+              "data_fim": (inicio + timedelta(days=6)).strftime("%d/%m/%Y")}
+    mes = {"data_inicio": inicio.strftime("%d/%m/%Y"),
+           "data_fim": (inicio + timedelta(days=30)).strftime("%d/%m/%Y")}
+    # os novos agendamentos ficam depois dos já existentes, um por hora,
+    # para não haver conflito de horário nem entre execuções. Cada rota
+    # que grava usa a sua própria faixa de horas
+    novos = (ultimo or datetime(2023, 1, 1)).replace(
+        minute=0, second=0, microsecond=0) + timedelta(days=1)
+    faixas, hora = {}, 0
+    for faixa, horas in (("inclusao", args.requisicoes),
+                         ("edicao", args.requisicoes),
+                         ("inclusao_lote", args.requisicoes * ITENS_LOTE),
+                         ("edicao_lote", args.requisicoes * ITENS_LOTE)):
+        faixas[faixa] = hora
+        hora += horas
+    horario = lambda faixa, hora: novos + timedelta(
+        hours=faixas[faixa] + hora)
+    # marca dos registros criados nesta execução
+    marca = f"Benchmark {time.time_ns()}"
+    marca_lote = f"{marca} lote"
+
+    agendamento = lambda data_agenda, **campos: dict({
+        "data_agenda": data_agenda.strftime("%d/%m/%Y %H:%M:%S"),
+        "cliente_id": cliente(), "profissional_id": profissional(),
+        "servico_id": 1, "observacao": marca}, **campos)
+
+    def edicao(registro, data_agenda, observacao):
+        id, cliente_id, profissional_id, servico_id = registro
+        return {"id": id, "data_agenda": data_agenda.strftime(
+                    "%Y-%m-%d %H:%M:%S"),
+                "cliente_id": cliente_id, "profissional_id": profissional_id,
+                "servico_id": servico_id, "observacao": observacao}
+
+    def agendamentos_criados(observacao):
+        return criados(lambda session: session.query(
+            Agendamento.id, Agendamento.cliente_id,
+            Agendamento.profissional_id, Agendamento.servico_id)
+            .filter(Agendamento.observacao == observacao)
+            .order_by(Agendamento.id).all())
+
+    def cadastros_criados(modelo, coluna):
+        return criados(lambda session: [id for id, in session.query(
+            modelo.id).filter(coluna.like(f"{marca} %"))
+            .order_by(modelo.id)])
+
+    agendamento_editado = agendamentos_criados(marca)
+    agendamento_excluido = agendamentos_criados(marca)
+    lote_editado = agendamentos_criados(marca_lote)
+    lote_excluido = agendamentos_criados(marca_lote)
+    cliente_editado = cadastros_criados(Cliente, Cliente.nome)
+    cliente_excluido = cadastros_criados(Cliente, Cliente.nome)
+    profissional_editado = cadastros_criados(Profissional, Profissional.nome)
+    profissional_excluido = cadastros_criados(Profissional,
+                                              Profissional.nome)
+    servico_editado = cadastros_criados(Servico, Servico.descricao)
+    servico_excluido = cadastros_criados(Servico, Servico.descricao)
+
+    return [
+        # consultas
+        ("GET /agendamentos", "GET",
+         lambda n: ("/agendamentos?limit=100", None)),
+        ("GET /agendamentos?limit=1000", "GET",
+         lambda n: ("/agendamentos?limit=1000", None)),
+        ("GET /agendamentos?profissional_id", "GET",
+         lambda n: ("/agendamentos?" + urlencode(
+             {"profissional_id": profissional(), "limit": 100}), None)),
+        ("GET /agendamentos/exportacao", "GET",
+         lambda n: ("/agendamentos/exportacao?" + urlencode(
+             {"formato": ("ndjson", "csv")[n % 2],
+              "profissional_id": profissional(),
+              "data_inicio": f"{semana['data_inicio']} 00:00:00",
+              "data_fim": f"{semana['data_fim']} 23:59:59"}), None)),
+        ("GET /agendamento_id", "GET",
+         lambda n: ("/agendamento_id?" + urlencode(
+             {"id": aleatorio.randint(1, args.agendamentos)}), None)),
+        ("GET /agendamento", "GET",
+         lambda n: ("/agendamento?" + urlencode(
+             {"cliente_id": amostra[n % len(amostra)][0],
+              "data_agenda": amostra[n % len(amostra)][1]
+              .strftime("%d/%m/%Y %H:%M:%S")}), None)),
+        ("GET /agendamento_cliente", "GET",
+         lambda n: ("/agendamento_cliente?" + urlencode(
+             {"cliente_id": cliente()}), None)),
+        ("GET /agendamento_profissional", "GET",
+         lambda n: ("/agendamento_profissional?" + urlencode(
+             {"profissional_id": profissional()}), None)),
+        ("GET /agendamento_servico", "GET",
+         lambda n: ("/agendamento_servico?" + urlencode(
+             {"servico_id": servico()}), None)),
+        ("GET /horarios_livres", "GET",
+         lambda n: ("/horarios_livres?" + urlencode(
+             dict(semana, profissional_id=profissional(), servico_id=1)),
+             None)),
+        ("GET /clientes", "GET",
+         lambda n: ("/clientes?limit=100", None)),
+        ("GET /cliente", "GET",
+         lambda n: ("/cliente?" + urlencode(
+             {"nome": nome_gerado(cliente())}), None)),
+        ("GET /clientes/busca", "GET",
+         lambda n: ("/clientes/busca?" + urlencode(
+             {"termo": " ".join(nome_gerado(cliente()).split()[:2])}),
+             None)),
+        ("GET /profissionais", "GET",
+         lambda n: ("/profissionais?limit=100", None)),
+        ("GET /profissional", "GET",
+         lambda n: ("/profissional?" + urlencode(
+             {"nome": nome_gerado(profissional())}), None)),
+        ("GET /profissionais/busca", "GET",
+         lambda n: ("/profissionais/busca?" + urlencode(
+             {"termo": nome_gerado(profissional()).split()[0]}), None)),
+        ("GET /servicos", "GET",
+         lambda n: ("/servicos?limit=100", None)),
+        ("GET /servico", "GET",
+         lambda n: ("/servico?" + urlencode(
+             {"descricao": servicos[servico() - 1]}), None)),
+        ("GET /servicos/busca", "GET",
+         lambda n: ("/servicos/busca?" + urlencode(
+             {"termo": servicos[servico() - 1].split()[0]}), None)),
+        ("GET /relatorio/faturamento", "GET",
+         lambda n: ("/relatorio/faturamento?" + urlencode(
+             dict(mes, agrupamento=("profissional", "servico")[n % 2])),
+             None)),
+        ("GET /relatorio/ocupacao", "GET",
+         lambda n: ("/relatorio/ocupacao?" + urlencode(
+             dict(mes, profissional_id=profissional())), None)),
+        # cadastros: inclusão, edição e exclusão dos registros do benchmark
+        ("POST /cliente", "POST",
+         lambda n: ("/cliente", {"nome": f"{marca} cliente {n}"})),
+        ("PUT /cliente", "PUT",
+         lambda n: ("/cliente", {"id": cliente_editado(n),
+                                 "nome": f"{marca} cliente {n} editado"})),
+        ("DELETE /cliente", "DELETE",
+         lambda n: ("/cliente", {"id": cliente_excluido(n)})),
+        ("POST /profissional", "POST",
+         lambda n: ("/profissional", {"nome": f"{marca} profissional {n}"})),
+        ("PUT /profissional", "PUT",
+         lambda n: ("/profissional", {
+             "id": profissional_editado(n),
+             "nome": f"{marca} profissional {n} editado"})),
+        ("DELETE /profissional", "DELETE",
+         lambda n: ("/profissional", {"id": profissional_excluido(n)})),
+        ("POST /servico", "POST",
+         lambda n: ("/servico", {"descricao": f"{marca} servico {n}",
+                                 "valor": 50, "duracao": 30})),
+        ("PUT /servico", "PUT",
+         lambda n: ("/servico", {"id": servico_editado(n),
+                                 "descricao": f"{marca} servico {n} editado",
+                                 "valor": 60})),
+        ("DELETE /servico", "DELETE",
+         lambda n: ("/servico", {"id": servico_excluido(n)})),
+        # agendamentos: inclusão, edição (para outro horário) e exclusão
+        ("POST /agendamento", "POST",
+         lambda n: ("/agendamento", agendamento(horario("inclusao", n)))),
+        ("PUT /agendamento", "PUT",
+         lambda n: ("/agendamento", edicao(
+             agendamento_editado(n), horario("edicao", n), marca))),
+        ("DELETE /agendamento", "DELETE",
+         lambda n: ("/agendamento", {"id": agendamento_excluido(n)[0]})),
+        ("POST /agendamentos/lote", "POST",
+         lambda n: ("/agendamentos/lote", None, {"agendamentos": [
+             agendamento(horario("inclusao_lote", n * ITENS_LOTE + item),
+                         observacao=marca_lote)
+             for item in range(ITENS_LOTE)]})),
+        ("PUT /agendamentos/lote", "PUT",
+         lambda n: ("/agendamentos/lote", None, {"agendamentos": [
+             edicao(lote_editado(n * ITENS_LOTE + item),
+                    horario("edicao_lote", n * ITENS_LOTE + item),
+                    marca_lote)
+             for item in range(ITENS_LOTE)]})),
+        ("DELETE /agendamentos/lote", "DELETE",
+         lambda n: ("/agendamentos/lote", None, {"ids": [
+             lote_excluido(n * ITENS_LOTE + item)[0]
+             for item in range(ITENS_LOTE)]})),
+    ]
+
+
+def modo_cliente(args):
+    """ Executa as rotas pelo test client do Flask, no próprio processo. """
+    requisicao = cliente_flask()
+    return {nome: executa(requisicao, args, nome, metodo, gera)
+            for nome, metodo, gera in cenarios(args)}
+
+
+def modo_servidor(args, comando: list):
+    """ Executa as rotas em um servidor (gunicorn ou uvicorn) iniciado com
+        o comando informado, usando a base gerada.
+
+    """
+    with servidor(args, comando) as requisicao:
+        return {nome: executa(requisicao, args, nome, metodo, gera)
+                for nome, metodo, gera in cenarios(args)}
+
+
+def main():
+    args = parametros()
+    engine = prepara_base(args)
+
+    resultado = dict(inicia_resultado(args), modos={})
+    servidores = {
+        "gunicorn": gunicorn(args),
+        "asgi": ["uvicorn", "asgi:app", "--workers", str(args.workers),
+                 "--port", str(args.porta), "--log-level", "warning"],
+    }
+    for modo in args.modo:
+        print(f"\nModo {modo}")
+        # as conexões abertas não devem ser herdadas pelo servidor
+        engine.dispose()
+        try:
+            resultado["modos"][modo] = modo_cliente(args)\
+                if modo == "cliente" else modo_servidor(args, servidores[modo])
+        except RuntimeError as e:
+            # os resultados dos outros modos continuam sendo gravados
+            print(f"Modo {modo} interrompido: {e}")
+            resultado["modos"][modo] = {"erro": str(e)}
+
+    grava_resultado(args, resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+""" Benchmark do perfil de ajuste do sqlite (model/sqlite.py).
+
+    Compara a vazão das rotas POST /agendamento (gravação), GET
+    /agendamento_id (leitura) e das duas ao mesmo tempo (misto) em um
+    servidor gunicorn com vários workers, antes (SQLITE_PERFIL=padrao:
+    journal em rollback, synchronous=FULL) e depois (SQLITE_PERFIL=
+    desempenho: WAL, synchronous=NORMAL, mmap, cache e busy_timeout) do
+    ajuste. Cada perfil usa uma cópia da mesma base gerada, já que o modo
+    WAL fica gravado no arquivo. O resultado é gravado em um arquivo json.
+
+    Exemplo:
+        python -m benchmarks.sqlite --agendamentos 100000 \\
+            --requisicoes 2000 --concorrencia 8 --workers 4 \\
+            --saida benchmark_sqlite.json
+"""
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import os
+import random
+import shutil
+import sqlite3
+
+from benchmarks.comum import argumentos, argumentos_requisicoes,\
+                             argumentos_servidor, prepara_base,\
+                             inicia_resultado, grava_resultado, executa,\
+                             gunicorn, servidor
+
+perfis = ("padrao", "desempenho")
+
+
+def parametros():
+    parser = argumentos(__doc__.split("\n")[0], "benchmark_sqlite.json")
+    argumentos_requisicoes(parser, 1000, 8, "requisições por fase")
+    argumentos_servidor(parser)
+    return parser.parse_args()
+
+
+def fases(args, ultimo: datetime):
+    """ Fases executadas em cada perfil: (nome, método, função que gera a
+        url e o formulário da requisição n). Na fase mista as requisições
+        pares gravam e as ímpares leem.
+
+    """
+    aleatorio = random.Random(args.semente)
+    # os novos agendamentos ficam depois dos já existentes, um por hora,
+    # para não haver conflito de horário
+    novos = ultimo.replace(minute=0, second=0, microsecond=0) +\
+        timedelta(days=1)
+
+    def gravacao(hora: int):
+        return ("/agendamento", {
+            "data_agenda": (novos + timedelta(hours=hora))
+            .strftime("%d/%m/%Y %H:%M:%S"),
+            "cliente_id": aleatorio.randint(1, args.clientes),
+            "profissional_id": aleatorio.randint(1, args.profissionais),
+            "servico_id": 1,
+            "observacao": "benchmark"})
+
+    def leitura():
+        return ("/agendamento_id?" + urlencode(
+            {"id": aleatorio.randint(1, args.agendamentos)}), None)
+
+    return [
+        ("POST /agendamento", "POST", lambda n: gravacao(n)),
+        ("GET /agendamento_id", "GET", lambda n: leitura()),
+        ("misto", None, lambda n: gravacao(args.requisicoes + n)
+         if n % 2 == 0 else leitura()),
+    ]
+
+
+def main():
+    args = parametros()
+    # a base é gerada sem o perfil de ajuste, com o journal em rollback
+    os.environ["SQLITE_PERFIL"] = "padrao"
+    engine = prepara_base(args)
+    base = engine.url.database
+    from sqlalchemy import func
+    from model import Session, Agendamento
+
+    ultimo = Session().query(func.max(Agendamento.data_agenda)).scalar()
+    Session.remove()
+    engine.dispose()
+
+    resultado = dict(inicia_resultado(args), perfis={})
+    comando = gunicorn(args)
+    for perfil in perfis:
+        copia = f"{os.path.splitext(base)[0]}-{perfil}.sqlite3"
+        shutil.copyfile(base, copia)
+        print(f"\nPerfil {perfil}")
+        ambiente = {"DB_URL": f"sqlite:///{copia}", "SQLITE_PERFIL": perfil}
+        with servidor(args, comando, ambiente) as requisicao:
+            # na fase mista o método segue o formulário
+            mista = lambda metodo, url, formulario: requisicao(
+                metodo or ("POST" if formulario else "GET"), url, formulario)
+            resultado["perfis"][perfil] = {
+                nome: executa(mista, args, nome, metodo, gera)
+                for nome, metodo, gera in fases(args, ultimo)}
+        with sqlite3.connect(copia) as conexao:
+            resultado["perfis"][perfil]["journal_mode"] = conexao.execute(
+                "PRAGMA journal_mode").fetchone()[0]
+
+    print()
+    antes, depois = (resultado["perfis"][perfil] for perfil in perfis)
+    for nome, _, _ in fases(args, ultimo):
+        print(f"{nome:40} {antes[nome]['vazao_rps']:8.1f} req/s ->"
+              f" {depois[nome]['vazao_rps']:8.1f} req/s"
+              f"  ({depois[nome]['vazao_rps'] / antes[nome]['vazao_rps']:.1f}x)")
+
+    grava_resultado(args, resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+
+class CacheLocal:
+    """ Backend de cache em memória do processo, com expiração por tempo (TTL)
+        e descarte do item usado há mais tempo (LRU) quando fica cheio.
+
+        Implementa o mesmo subconjunto de comandos do redis usado pela
+        CacheConsultas (get, set com ex, incr e flushdb), assim os dois
+        backends são intercambiáveis.
+    """
+
+    def __init__(self, max_itens: int = 1024):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        # contadores ficam fora do LRU para nunca serem descartados
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave: str):
+        with self._lock:
+            if chave in self._contadores:
+                return str(self._contadores[chave])
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em is not None and expira_em <= time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave: str, valor: str, ex: int = None):
+        expira_em = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def incr(self, chave: str) -> int:
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + 1
+            return self._contadores[chave]
+
+    def flushdb(self):
+        with self._lock:
+            self._itens.clear()
+            self._contadores.clear()
+
+
+class CacheConsultas:
+    """ Cache de leitura (read-through) das consultas da API.
+
+        Cada entidade (cliente, profissional, servico) possui um contador de
+        versão que faz parte da chave dos itens. As rotas de inclusão,
+        edição e remoção chamam invalida(), que incrementa o contador e
+        torna obsoletos todos os itens da entidade de uma só vez, inclusive
+        nos outros workers quando o backend é compartilhado (redis).
+    """
+
+    def __init__(self, backend, ttl: int = 60):
+        self.backend = backend
+        self.ttl = ttl
+
+    def versao(self, entidade: str) -> int:
+        """ Retorna a versão atual dos dados da entidade. """
+        return int(self.backend.get(f"versao:{entidade}") or 0)
+
+    def busca(self, entidade: str, chave, carrega):
+        """ Retorna o valor em cache ou, se não existir, o valor retornado
+            por carrega(), que é guardado quando não for None.
+
+        """
+        if self.ttl <= 0:
+            return carrega()
+        item = f"{entidade}:{self.versao(entidade)}:{chave}"
+        valor = self.backend.get(item)
+        if valor is not None:
+            return json.loads(valor)
+        valor = carrega()
+        if valor is not None:
+            self.backend.set(item, json.dumps(valor), ex=self.ttl)
+        return valor
+
+    def invalida(self, entidade: str):
+        """ Descarta os itens em cache da entidade após uma alteração. """
+        self.backend.incr(f"versao:{entidade}")
+
+
+def cria_backend(url: str):
+    """ Cria o backend do cache a partir da url: vazia para o cache local do
+        processo ou redis://... para um servidor compartilhado pelos workers.
+
+    """
+    if url.startswith("redis"):
+        # dependência opcional, necessária apenas com o backend redis
+        import redis
+        return redis.Redis.from_url(url)
+    return CacheLocal(int(os.environ.get("CACHE_MAX_ITENS", 1024)))
+
+
+# CACHE_TTL=0 desativa o cache
+cache = CacheConsultas(cria_backend(os.environ.get("CACHE_URL", "")),
+                       int(os.environ.get("CACHE_TTL", 60)))
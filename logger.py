@@ -1,22 +1,31 @@
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
 import os
+import queue
 
 
-log_path = "log/"
-# Verifica se o diretorio para armexanar os logs não existe
-if not os.path.exists(log_path):
-   # então cria o diretorio
-   os.makedirs(log_path)
+# diretório dos arquivos de log
+log_path = os.environ.get("LOG_DIR", "log")
 
+# tamanho (bytes) de cada arquivo de log antes da rotação e quantidade de
+# arquivos antigos mantidos
+log_max_bytes = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+log_backup_count = int(os.environ.get("LOG_BACKUP_COUNT", 10))
+# LOG_ACESSO=0 desativa o log de acesso (um registro json por requisição)
+log_acesso = os.environ.get("LOG_ACESSO", "1").lower() in ("1", "true", "sim")
 
-dictConfig({
+configuracao = {
     "version": 1,
     "disable_existing_loggers": True,
     "formatters": {
         "default": {
             "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s",
         },
+        "json": {
+            "format": "%(message)s",
+        },
         "detailed": {
             "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d",
         }
@@ -40,17 +49,25 @@ dictConfig({
         "error_file": {
             "class": "logging.handlers.RotatingFileHandler",
             "formatter": "detailed",
-            "filename": "log/gunicorn.error.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
+            "filename": os.path.join(log_path, "gunicorn.error.log"),
+            "maxBytes": log_max_bytes,
+            "backupCount": log_backup_count,
             "delay": "True",
         },
         "detailed_file": {
             "class": "logging.handlers.RotatingFileHandler",
             "formatter": "detailed",
-            "filename": "log/gunicorn.detailed.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
+            "filename": os.path.join(log_path, "gunicorn.detailed.log"),
+            "maxBytes": log_max_bytes,
+            "backupCount": log_backup_count,
+            "delay": "True",
+        },
+        "access_file": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "formatter": "json",
+            "filename": os.path.join(log_path, "access.log"),
+            "maxBytes": log_max_bytes,
+            "backupCount": log_backup_count,
             "delay": "True",
         }
     },
@@ -59,13 +76,91 @@ dictConfig({
             "handlers": ["console", "error_file"],  #, email],
             "level": "INFO",
             "propagate": False,
+        },
+        # criado na importação deste módulo, antes da configuração, e que
+        # seria desativado pelo disable_existing_loggers
+        __name__: {},
+        "acesso": {
+            "handlers": ["access_file"],
+            "level": "INFO" if log_acesso else "WARNING",
+            "propagate": False,
         }
     },
     "root": {
         "handlers": ["console", "detailed_file"],
         "level": "INFO",
     }
-})
+}
+
+
+# pares (QueueHandler, QueueListener) de cada logger com fila
+filas = []
+# se a configuração já foi aplicada (configura_log)
+configurado = False
+
+
+def inicia_filas(*nomes):
+    """ Troca os handlers dos loggers informados (None para o root) por um
+        QueueHandler, que apenas enfileira o registro, e grava os registros
+        em uma thread separada (QueueListener) com os handlers originais.
+
+        Assim a escrita no console e nos arquivos, inclusive a rotação,
+        fica fora do tempo de resposta das requisições.
+    """
+    for nome in nomes:
+        log = logging.getLogger(nome)
+        handlers = log.handlers[:]
+        for handler in handlers:
+            log.removeHandler(handler)
+        fila_handler = QueueHandler(queue.SimpleQueue())
+        log.addHandler(fila_handler)
+        listener = QueueListener(fila_handler.queue, *handlers,
+                                 respect_handler_level=True)
+        listener.start()
+        filas.append((fila_handler, listener))
+
+
+def reinicia_filas():
+    """ A thread do listener não existe no processo filho criado por fork
+        (os workers do gunicorn com --preload), então cada filho cria novas
+        filas e listeners para os mesmos handlers.
+
+    """
+    for posicao, (fila_handler, listener) in enumerate(filas):
+        fila_handler.queue = queue.SimpleQueue()
+        listener = QueueListener(fila_handler.queue, *listener.handlers,
+                                 respect_handler_level=True)
+        listener.start()
+        filas[posicao] = (fila_handler, listener)
+
+
+def encerra_filas():
+    """ Grava os registros pendentes nas filas e encerra os listeners. """
+    while filas:
+        _, listener = filas.pop()
+        listener.stop()
+
+
+def configura_log():
+    """ Cria o diretório dos logs, aplica a configuração e inicia as filas
+        (uma thread por logger). Chamada por create_app(), apenas na
+        primeira vez, e não na importação do módulo: importar a aplicação
+        não cria diretórios nem threads.
+
+    """
+    global configurado
+    if configurado:
+        return
+    configurado = True
+    # Verifica se o diretorio para armexanar os logs não existe
+    if not os.path.exists(log_path):
+        # então cria o diretorio
+        os.makedirs(log_path)
+    dictConfig(configuracao)
+    inicia_filas(None, "gunicorn.error", "acesso")
+    os.register_at_fork(after_in_child=reinicia_filas)
+    atexit.register(encerra_filas)
 
 
 logger = logging.getLogger(__name__)
+logger_acesso = logging.getLogger("acesso")
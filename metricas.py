@@ -0,0 +1,202 @@
+from bisect import bisect_left
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+
+
+# limites (em segundos) dos buckets padrão dos histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metricas:
+    """ Registro de métricas (contadores e histogramas) no formato de texto
+        do Prometheus.
+
+        Cada thread soma os valores no seu próprio dicionário, sem lock, e
+        os dicionários só são somados na coleta (exporta). Com vários
+        processos (workers do gunicorn) cada processo grava periodicamente
+        os seus valores em um arquivo no diretório compartilhado e a coleta
+        soma os arquivos de todos os processos.
+    """
+
+    def __init__(self, diretorio: str = "", intervalo: float = 1.0):
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        # nome -> (tipo, ajuda, buckets)
+        self._metricas = {}
+        self._inicia_processo()
+        os.register_at_fork(after_in_child=self._inicia_processo)
+
+    def _inicia_processo(self):
+        """ Descarta os valores herdados do processo pai (fork) e cria o
+            arquivo próprio do processo.
+
+        """
+        self._local = threading.local()
+        # (thread, valores) de cada thread que já registrou algum valor
+        self._threads = []
+        # valores das threads já encerradas
+        self._encerradas = {}
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+        self._gravado_em = 0.0
+        self._arquivo = None
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+            # o uuid evita reaproveitar o arquivo de um processo encerrado
+            # com o mesmo pid
+            self._arquivo = os.path.join(
+                self.diretorio,
+                f"metricas_{os.getpid()}_{uuid.uuid4().hex[:8]}.json")
+
+    def contador(self, nome: str, ajuda: str):
+        """ Declara um contador. """
+        self._metricas[nome] = ("counter", ajuda, None)
+
+    def histograma(self, nome: str, ajuda: str, buckets=BUCKETS):
+        """ Declara um histograma com os limites dos buckets informados. """
+        self._metricas[nome] = ("histogram", ajuda, tuple(buckets))
+
+    def _valores(self) -> dict:
+        """ Dicionário de valores da thread atual. """
+        valores = getattr(self._local, "valores", None)
+        if valores is None:
+            valores = self._local.valores = {}
+            with self._lock:
+                self._threads.append(
+                    (weakref.ref(threading.current_thread()), valores))
+        return valores
+
+    def incrementa(self, nome: str, rotulos: tuple = (), valor: float = 1):
+        """ Soma o valor ao contador com os rótulos ((chave, valor), ...).
+        """
+        valores = self._valores()
+        chave = (nome, rotulos)
+        valores[chave] = valores.get(chave, 0) + valor
+
+    def observa(self, nome: str, valor: float, rotulos: tuple = ()):
+        """ Registra uma observação no histograma. """
+        valores = self._valores()
+        chave = (nome, rotulos)
+        contagens = valores.get(chave)
+        buckets = self._metricas[nome][2]
+        if contagens is None:
+            # uma posição por bucket, uma para +Inf e a soma no final
+            contagens = valores[chave] = [0] * (len(buckets) + 2)
+        contagens[bisect_left(buckets, valor)] += 1
+        contagens[-1] += valor
+
+    @staticmethod
+    def _soma(total: dict, valores: dict):
+        for chave, valor in valores.items():
+            if isinstance(valor, list):
+                atual = total.get(chave)
+                total[chave] = valor[:] if atual is None else\
+                    [a + b for a, b in zip(atual, valor)]
+            else:
+                total[chave] = total.get(chave, 0) + valor
+
+    def coleta(self) -> dict:
+        """ Soma os valores de todas as threads do processo. """
+        total = {}
+        with self._lock:
+            ativas = []
+            for thread, valores in self._threads:
+                if thread() is None or not thread().is_alive():
+                    # guarda os valores das threads encerradas em um só
+                    # dicionário para a coleta não crescer com elas
+                    self._soma(self._encerradas, valores.copy())
+                else:
+                    ativas.append((thread, valores))
+            self._threads = ativas
+            self._soma(total, self._encerradas)
+        for _, valores in ativas:
+            self._soma(total, valores.copy())
+        return total
+
+    def grava(self, forca: bool = False):
+        """ Grava os valores do processo no diretório compartilhado, no
+            máximo uma vez por intervalo, a não ser que forca seja True.
+
+        """
+        if not self._arquivo:
+            return
+        agora = time.monotonic()
+        if not forca and agora - self._gravado_em < self.intervalo:
+            return
+        # outra thread já está gravando
+        if not self._lock_arquivo.acquire(blocking=forca):
+            return
+        try:
+            self._gravado_em = agora
+            dados = [[nome, list(rotulos), valor]
+                     for (nome, rotulos), valor in self.coleta().items()]
+            temporario = self._arquivo + ".tmp"
+            with open(temporario, "w") as arquivo:
+                json.dump(dados, arquivo)
+            os.replace(temporario, self._arquivo)
+        finally:
+            self._lock_arquivo.release()
+
+    def _coleta_processos(self) -> dict:
+        """ Soma os valores gravados por todos os processos. """
+        self.grava(forca=True)
+        total = {}
+        for nome_arquivo in os.listdir(self.diretorio):
+            if not nome_arquivo.endswith(".json"):
+                continue
+            try:
+                caminho = os.path.join(self.diretorio, nome_arquivo)
+                with open(caminho) as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError):
+                continue
+            self._soma(total, {
+                (nome, tuple(tuple(rotulo) for rotulo in rotulos)): valor
+                for nome, rotulos, valor in dados})
+        return total
+
+    def exporta(self) -> str:
+        """ Retorna as métricas no formato de texto do Prometheus. """
+        total = self._coleta_processos() if self._arquivo else self.coleta()
+        por_metrica = {}
+        for (nome, rotulos), valor in sorted(total.items()):
+            por_metrica.setdefault(nome, []).append((rotulos, valor))
+
+        linhas = []
+        for nome, (tipo, ajuda, buckets) in self._metricas.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in por_metrica.get(nome, []):
+                if tipo == "counter":
+                    linhas.append(f"{nome}{_rotulos(rotulos)} {valor}")
+                    continue
+                acumulado = 0
+                for limite, contagem in zip(buckets + ("+Inf",), valor):
+                    acumulado += contagem
+                    linhas.append(
+                        f"{nome}_bucket"
+                        f"{_rotulos(rotulos + (('le', limite),))} "
+                        f"{acumulado}")
+                linhas.append(f"{nome}_sum{_rotulos(rotulos)} {valor[-1]}")
+                linhas.append(f"{nome}_count{_rotulos(rotulos)} {acumulado}")
+        return "\n".join(linhas) + "\n"
+
+
+def _rotulos(rotulos: tuple) -> str:
+    """ Formata os rótulos como {chave="valor",...}. """
+    if not rotulos:
+        return ""
+    return "{" + ",".join(
+        '%s="%s"' % (chave, str(valor).replace("\\", "\\\\")
+                     .replace('"', '\\"').replace("\n", "\\n"))
+        for chave, valor in rotulos) + "}"
+
+
+# METRICAS_DIR deve apontar para um diretório compartilhado (e limpo a cada
+# início do servidor) quando a API roda com vários processos
+metricas = Metricas(os.environ.get("METRICAS_DIR", ""),
+                    float(os.environ.get("METRICAS_INTERVALO", 1)))
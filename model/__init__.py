@@ -1,33 +1,83 @@
-from sqlalchemy_utils import database_exists, create_database
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine, event
 import os
 
 # importando os elementos definidos no modelo
 from model.base import Base
-from model.agendamento import Agendamento
+from model.agendamento import Agendamento, consulta_agendamentos,\
+                               consulta_linhas_agendamentos
 from model.cliente import Cliente
 from model.profissional import Profissional
 from model.servico import Servico
+from model.paginacao import pagina_keyset
+from model.sqlite import aplica_pragmas
+from model.medicao import Medicao, medicao_atual, inicia_medicao,\
+                          encerra_medicao, antes_comando, depois_comando,\
+                          erro_comando, PoolMedido, observadores_espera,\
+                          observadores_bloqueio
+from model.migracoes import migra, verifica_versao, VERSAO_ATUAL
+from model.versao import versoes_tabelas
+from model.conflito import conflito_agenda, duracao_maxima,\
+                           AgendaProfissionais
+from model.disponibilidade import horarios_livres
+from model.resumo import ResumoAgendamento, ResumoServico, reconstroi_resumo,\
+                         faturamento, ocupacao
+from model.busca import busca_nomes
+from model.gerador import gera_dados, nome_gerado
+from model.assincrono import cria_engine_assincrona
+from model.exclusao import exclui_com_agendamentos, excede_limite_exclusao,\
+                           TAMANHO_LOTE_EXCLUSAO, LIMITE_EXCLUSAO_ROTA
+from model.lote import insere_agendamentos, atualiza_agendamentos,\
+                       exclui_agendamentos
 
 db_path = "database/"
-# Verifica se o diretorio não existe
-if not os.path.exists(db_path):
-   # então cria o diretorio
-   os.makedirs(db_path)
 
-# url de acesso ao banco (essa é uma url de acesso ao sqlite local)
-db_url = 'sqlite:///%s/db.sqlite3' % db_path
+# url de acesso ao banco (por padrão uma url de acesso ao sqlite local)
+db_url = os.environ.get("DB_URL", 'sqlite:///%s/db.sqlite3' % db_path)
+
+# configuração do pool de conexões, ajustável por variáveis de ambiente
+pool_config = {
+    # QueuePool que mede a espera por uma conexão livre
+    "poolclass": PoolMedido,
+    "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", -1)),
+    "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "0").lower()
+    in ("1", "true", "sim"),
+}
+
+connect_args = {}
+if db_url.startswith("sqlite"):
+    # as conexões do pool são reutilizadas por threads diferentes
+    connect_args["check_same_thread"] = False
 
 # cria a engine de conexão com o banco
-engine = create_engine(db_url, echo=False)
+engine = create_engine(db_url, echo=False, connect_args=connect_args,
+                       **pool_config)
+
+if engine.dialect.name == "sqlite":
+    # aplica o perfil de ajuste (WAL, synchronous, mmap...) em cada conexão
+    event.listen(engine, "connect", aplica_pragmas)
+
+# contagem e tempo dos comandos SQL de cada requisição (log de acesso)
+event.listen(engine, "before_cursor_execute", antes_comando)
+event.listen(engine, "after_cursor_execute", depois_comando)
+# comandos recusados por bloqueio da base (métricas)
+event.listen(engine, "handle_error", erro_comando)
+
+
+def cria_diretorio_base():
+    """ Cria o diretório da base sqlite local. Chamada por create_app(), e
+        não na importação do model.
 
-# Instancia um criador de seção com o banco
-Session = sessionmaker(bind=engine)
+    """
+    # Verifica se o diretorio não existe
+    if not os.path.exists(db_path):
+        # então cria o diretorio
+        os.makedirs(db_path)
 
-# cria o banco se ele não existir 
-if not database_exists(engine.url):
-    create_database(engine.url) 
 
-# cria as tabelas do banco, caso não existam
-Base.metadata.create_all(engine)
+# Instancia um criador de seção com o banco. Cada thread (requisição) recebe
+# a sua própria sessão, que deve ser encerrada com Session.remove()
+Session = scoped_session(sessionmaker(bind=engine))
@@ -1,7 +1,11 @@
 from sqlalchemy import Column, String, Integer, DateTime,\
-                       ForeignKey, UniqueConstraint
+                       ForeignKey, UniqueConstraint, Index
 from model import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, joinedload
+
+from model.cliente import Cliente
+from model.profissional import Profissional
+from model.servico import Servico
 
 
 class Agendamento(Base):
@@ -10,16 +14,26 @@ class Agendamento(Base):
         UniqueConstraint('data_agenda', 'cliente_id',
                          'profissional_id', 'servico_id',
                          name='unique_agendamento_commit'),
+        # indices das consultas por cliente, profissional e serviço, já
+        # ordenados pela data para as buscas por período
+        Index('ix_agendamento_cliente_data', 'cliente_id', 'data_agenda'),
+        Index('ix_agendamento_profissional_data',
+              'profissional_id', 'data_agenda'),
+        Index('ix_agendamento_servico_data', 'servico_id', 'data_agenda'),
     )
     id = Column("pk_agenda", Integer, primary_key=True)
     data_agenda = Column(DateTime)
+    # a exclusão do cliente ou do profissional exclui os agendamentos e a
+    # de um serviço com agendamentos é recusada (migração 7)
     cliente_id = Column(Integer,
-                        ForeignKey("cliente.pk_cliente"),
+                        ForeignKey("cliente.pk_cliente", ondelete="CASCADE"),
                         nullable=False)
     profissional_id = Column(Integer,
-                             ForeignKey("profissional.pk_profissional"),
+                             ForeignKey("profissional.pk_profissional",
+                                        ondelete="CASCADE"),
                              nullable=False)
-    servico_id = Column(Integer, ForeignKey("servico.pk_servico"),
+    servico_id = Column(Integer, ForeignKey("servico.pk_servico",
+                                            ondelete="RESTRICT"),
                         nullable=False)
     observacao = Column(String(300))
 
@@ -35,3 +49,38 @@ class Agendamento(Base):
         self.profissional_id = profissional_id
         self.servico_id = servico_id
         self.observacao = observacao
+
+
+def consulta_agendamentos(session):
+    """ Retorna uma consulta de agendamentos que já traz o cliente, o
+        profissional e o serviço no mesmo SELECT, evitando uma consulta
+        extra por relacionamento ao montar a representação do agendamento.
+    """
+    return session.query(Agendamento)\
+                  .options(joinedload(Agendamento.cliente),
+                           joinedload(Agendamento.profissional),
+                           joinedload(Agendamento.servico))
+
+
+def consulta_linhas_agendamentos(session):
+    """ Retorna uma consulta somente leitura de agendamentos que seleciona
+        apenas as colunas do AgendamentoViewSchema, já com os mesmos nomes.
+
+        Os registros são tuplas (Row) e não objetos do ORM: não há identity
+        map nem relacionamentos para montar, o que deixa as listagens mais
+        rápidas e com menos memória. Row._asdict() retorna a representação
+        do agendamento.
+    """
+    return session.query(Agendamento.id.label("agenda_id"),
+                         Agendamento.data_agenda,
+                         Agendamento.observacao,
+                         Agendamento.cliente_id,
+                         Agendamento.profissional_id,
+                         Agendamento.servico_id,
+                         Cliente.nome.label("cliente"),
+                         Profissional.nome.label("profissional"),
+                         Servico.descricao.label("descricao_servico"),
+                         Servico.valor.label("valor_servico"))\
+                  .join(Agendamento.cliente)\
+                  .join(Agendamento.profissional)\
+                  .join(Agendamento.servico)
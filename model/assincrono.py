@@ -0,0 +1,38 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from model.medicao import antes_comando, depois_comando, erro_comando
+from model.sqlite import aplica_pragmas
+
+
+def url_assincrona(url: str) -> str:
+    """ Converte a url da base para o driver assíncrono (aiosqlite no
+        sqlite local).
+
+    """
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+def cria_engine_assincrona(url: str, pool_config: dict):
+    """ Cria a engine assíncrona usada no modo ASGI, com o mesmo pool,
+        perfil do sqlite e medição de comandos da engine síncrona.
+
+        Retorna a engine e a fábrica de sessões assíncronas. O driver
+        (aiosqlite) só é necessário quando esta função é chamada.
+    """
+    config = dict(pool_config, poolclass=AsyncAdaptedQueuePool)
+    engine = create_async_engine(url_assincrona(url), echo=False, **config)
+    sync_engine = engine.sync_engine
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", aplica_pragmas)
+    event.listen(sync_engine, "before_cursor_execute", antes_comando)
+    event.listen(sync_engine, "after_cursor_execute", depois_comando)
+    event.listen(sync_engine, "handle_error", erro_comando)
+    # expire_on_commit=False: os objetos continuam legíveis após o commit
+    # sem uma nova consulta (que exigiria await)
+    return engine, sessionmaker(engine, class_=AsyncSession,
+                                expire_on_commit=False)
@@ -0,0 +1,105 @@
+import re
+import unicodedata
+
+from sqlalchemy import text
+
+from model.cliente import Cliente
+from model.profissional import Profissional
+from model.servico import Servico
+
+
+# modelo -> (índice FTS5 da migração 6, coluna pesquisada)
+indices_busca = {
+    Cliente: ("busca_cliente", Cliente.nome),
+    Profissional: ("busca_profissional", Profissional.nome),
+    Servico: ("busca_servico", Servico.descricao),
+}
+# candidatos lidos do índice em cada consulta (busca_nomes) e ordenados
+# pela relevância. Um termo curto ("a", "silva") encontra centenas de
+# milhares de nomes e ordená-los todos pelo rank do FTS5 levaria centenas
+# de ms (o bm25 percorre todas as ocorrências de cada palavra), então
+# apenas as janelas de candidatos são ordenadas, em Python
+JANELA_BUSCA = 100
+# palavras do termo consideradas na busca
+MAXIMO_PALAVRAS = 5
+
+
+def normaliza(texto: str) -> str:
+    """ Texto sem acentos e em minúsculas, como no índice (unicode61 com
+        remove_diacritics).
+
+    """
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(letra for letra in decomposto
+                   if not unicodedata.combining(letra)).casefold()
+
+
+def palavras(texto: str) -> list:
+    """ Palavras do texto normalizado, separadas como no tokenizador
+        unicode61 (letras e números).
+
+    """
+    return re.findall(r"[^\W_]+", normaliza(texto))
+
+
+def _relevancia(termo: list, nome: str, codigo: int) -> tuple:
+    """ Chave de ordenação de um nome encontrado: primeiro os nomes que
+        começam pelo termo, depois os que têm mais palavras iguais às do
+        termo (e não só começando por elas) e, por fim, os nomes mais
+        curtos e os cadastrados antes.
+
+    """
+    encontradas = palavras(nome)
+    inicio = encontradas[:len(termo) - 1] == termo[:-1] and\
+        len(encontradas) >= len(termo) and\
+        encontradas[len(termo) - 1].startswith(termo[-1])
+    iguais = sum(palavra in encontradas for palavra in termo)
+    return (not inicio, -iguais, len(encontradas), len(nome), codigo)
+
+
+def busca_nomes(session, modelo, termo: str, limite: int) -> list:
+    """ Busca os registros do modelo (Cliente, Profissional ou Servico)
+        cujo nome contém palavras começando por cada palavra do termo, sem
+        diferenciar acentos e maiúsculas. "joao sil" encontra "João
+        Silva" e "Silvana João".
+
+        Os candidatos vêm de três consultas ao índice, cada uma limitada a
+        JANELA_BUSCA registros (na ordem de cadastro): os nomes que começam
+        pelo termo, os que têm todas as palavras do termo completas e os
+        que atendem à busca em geral. Assim um nome que começa pelo termo
+        entra nos candidatos mesmo cadastrado depois de muitos outros que
+        apenas contêm o termo; a ordem de cadastro só decide dentro de cada
+        consulta. Os candidatos são ordenados pela relevância
+        (_relevancia) e apenas os limite primeiros são carregados.
+
+        Retorna a lista de registros, do mais relevante ao menos.
+    """
+    termo = palavras(termo)[:MAXIMO_PALAVRAS]
+    if not termo:
+        return []
+    indice, coluna = indices_busca[modelo]
+    consulta = text(f"""
+        SELECT rowid, {coluna.name} FROM {indice}
+         WHERE {indice} MATCH :expressao
+         LIMIT :janela""")
+
+    # as palavras não têm aspas, apenas letras e números
+    expressoes = [
+        # nomes que começam pelo termo, com a última palavra incompleta
+        f"^\"{' '.join(termo)}\"*",
+        # todas as palavras do termo completas, em qualquer posição
+        " ".join(f"\"{palavra}\"" for palavra in termo),
+        # todas as palavras do termo, em qualquer posição e possivelmente
+        # incompletas
+        " ".join(f"\"{palavra}\"*" for palavra in termo),
+    ]
+    candidatos = {}
+    for expressao in expressoes:
+        candidatos.update(session.execute(
+            consulta, {"expressao": expressao, "janela": JANELA_BUSCA}).all())
+
+    codigos = sorted(candidatos, key=lambda codigo: _relevancia(
+        termo, candidatos[codigo], codigo))[:limite]
+    registros = {registro.id: registro for registro in
+                 session.query(modelo).filter(modelo.id.in_(codigos))}
+    return [registros[codigo] for codigo in codigos if codigo in registros]
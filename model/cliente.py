@@ -7,7 +7,10 @@ class Cliente(Base):
     __tablename__ = 'cliente'
     id = Column("pk_cliente", Integer, primary_key=True)
     nome = Column(String(150), unique=True)
+    # os agendamentos são excluídos pela própria base (ON DELETE CASCADE),
+    # sem carregá-los na sessão
     agendamentos = relationship("Agendamento", cascade="all,delete",
+                                passive_deletes=True,
                                 back_populates="cliente")
 
     def __init__(self, nome: str):
@@ -0,0 +1,146 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from model.agendamento import Agendamento
+from model.servico import Servico
+
+
+def duracao_maxima(session) -> int:
+    """ Retorna a maior duração (em minutos) entre os serviços cadastrados.
+
+        Nenhum agendamento que comece antes de (inicio - duracao_maxima)
+        pode ainda estar em andamento no inicio, o que limita a busca por
+        conflitos a uma faixa do índice (profissional_id, data_agenda).
+    """
+    return session.query(func.max(Servico.duracao)).scalar() or 0
+
+
+def conflito_agenda(session, profissional_id: int, inicio, duracao: int,
+                    ignora_id: int = None):
+    """ Procura um agendamento do profissional cujo horário se sobreponha
+        ao intervalo [inicio, inicio + duracao), de qualquer cliente: o
+        profissional atende um agendamento por vez, a mesma regra dos
+        horários livres (horarios_livres).
+
+        A consulta percorre apenas a faixa do índice
+        (profissional_id, data_agenda) em que pode haver sobreposição.
+
+        Retorna o codigo do agendamento em conflito ou None.
+    """
+    fim = inicio + timedelta(minutes=duracao)
+    janela = inicio - timedelta(minutes=duracao_maxima(session))
+    candidatos = session.query(Agendamento.id, Agendamento.data_agenda,
+                               Servico.duracao)\
+        .join(Servico, Agendamento.servico_id == Servico.id)\
+        .filter(Agendamento.profissional_id == profissional_id)\
+        .filter(Agendamento.data_agenda > janela)\
+        .filter(Agendamento.data_agenda < fim)
+    for id, data_agenda, duracao_agendada in candidatos:
+        if id == ignora_id:
+            continue
+        if data_agenda + timedelta(minutes=duracao_agendada) > inicio:
+            return id
+    return None
+
+
+class AgendaProfissionais:
+    """ Agenda em memória dos profissionais usada na validação dos lotes.
+
+        Para cada profissional mantém os agendamentos ordenados pelo início,
+        assim cada conferência de conflito é uma busca binária seguida da
+        verificação dos poucos agendamentos dentro da janela da duração
+        máxima dos serviços.
+    """
+
+    def __init__(self, duracao_maxima: int):
+        self.janela = timedelta(minutes=duracao_maxima)
+        self._inicios = {}
+        self._agendamentos = {}
+        self._posicao = {}
+        # campos da restrição unique_agendamento_commit dos agendamentos
+        # carregados da base
+        self.chaves = set()
+
+    @classmethod
+    def carrega(cls, session, itens: list, duracoes: dict):
+        """ Carrega da base os agendamentos dos profissionais dos itens que
+            podem se sobrepor ao período coberto pelos itens.
+
+            Argumentos:
+                itens: dados dos agendamentos (profissional_id,
+                       data_agenda e servico_id)
+                duracoes: duração de cada serviço, pelo codigo
+        """
+        agenda = cls(max(duracoes.values(), default=0))
+        if not itens:
+            return agenda
+        inicio = min(item["data_agenda"] for item in itens) - agenda.janela
+        # o limite inclui o próprio instante final para que os agendamentos
+        # já gravados nos mesmos horários do lote também sejam carregados
+        fim = max(item["data_agenda"] +
+                  timedelta(minutes=max(duracoes[item["servico_id"]], 1))
+                  for item in itens)
+        profissionais = list({item["profissional_id"] for item in itens})
+        consulta = session.query(Agendamento.id, Agendamento.profissional_id,
+                                 Agendamento.data_agenda,
+                                 Agendamento.cliente_id,
+                                 Agendamento.servico_id)\
+            .filter(Agendamento.profissional_id.in_(profissionais))\
+            .filter(Agendamento.data_agenda >= inicio)\
+            .filter(Agendamento.data_agenda < fim)
+        for id, profissional_id, data_agenda, cliente_id, servico_id\
+                in consulta:
+            agenda.adiciona(id, profissional_id, data_agenda,
+                            duracoes.get(servico_id, 0))
+            agenda.chaves.add((data_agenda, cliente_id, profissional_id,
+                               servico_id))
+        return agenda
+
+    def adiciona(self, id, profissional_id: int, inicio, duracao: int):
+        """ Inclui um agendamento na agenda do profissional. O codigo pode
+            ser None para os agendamentos ainda não gravados.
+
+        """
+        registro = (inicio, inicio + timedelta(minutes=duracao), id)
+        inicios = self._inicios.setdefault(profissional_id, [])
+        agendamentos = self._agendamentos.setdefault(profissional_id, [])
+        posicao = bisect_right(inicios, inicio)
+        inicios.insert(posicao, inicio)
+        agendamentos.insert(posicao, registro)
+        if id is not None:
+            self._posicao[id] = (profissional_id, registro)
+
+    def remove(self, id):
+        """ Retira um agendamento da agenda, se estiver carregado. """
+        if id not in self._posicao:
+            return
+        profissional_id, registro = self._posicao.pop(id)
+        inicios = self._inicios[profissional_id]
+        agendamentos = self._agendamentos[profissional_id]
+        posicao = bisect_left(inicios, registro[0])
+        while agendamentos[posicao] is not registro:
+            posicao += 1
+        del inicios[posicao]
+        del agendamentos[posicao]
+
+    def conflito(self, profissional_id: int, inicio, duracao: int,
+                 ignora_id=None) -> bool:
+        """ Informa se o intervalo [inicio, inicio + duracao) se sobrepõe a
+            um agendamento do profissional, de qualquer cliente.
+
+        """
+        agendamentos = self._agendamentos.get(profissional_id, [])
+        fim = inicio + timedelta(minutes=duracao)
+        posicao = bisect_left(self._inicios.get(profissional_id, []), fim)
+        while posicao > 0:
+            posicao -= 1
+            inicio_agendado, fim_agendado, id = agendamentos[posicao]
+            if inicio_agendado <= inicio - self.janela:
+                break
+            if id is not None and id == ignora_id:
+                continue
+            if fim_agendado > inicio:
+                return True
+        return False
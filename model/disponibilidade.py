@@ -0,0 +1,68 @@
+from datetime import datetime, time, timedelta
+import os
+
+from model.agendamento import Agendamento
+from model.conflito import duracao_maxima
+from model.servico import Servico
+
+
+# expediente usado na busca por horários livres, ajustável por variáveis de
+# ambiente. Os dias seguem datetime.weekday(): 0 é segunda-feira.
+expediente = {
+    "inicio": time.fromisoformat(os.environ.get("EXPEDIENTE_INICIO", "08:00")),
+    "fim": time.fromisoformat(os.environ.get("EXPEDIENTE_FIM", "18:00")),
+    "dias": {int(dia) for dia in
+             os.environ.get("EXPEDIENTE_DIAS", "0,1,2,3,4,5").split(",")},
+}
+
+
+def horarios_livres(session, profissional_id: int, duracao: int,
+                    inicio: datetime, fim: datetime, intervalo: int = 30):
+    """ Retorna os horários de início, dentro do expediente e do período
+        [inicio, fim), em que o profissional pode atender um serviço com a
+        duração informada (em minutos).
+
+        Os agendamentos do profissional no período são lidos com uma única
+        consulta pela faixa do índice (profissional_id, data_agenda), já
+        ordenados pelo início, e comparados com os horários candidatos em
+        uma só passada.
+    """
+    janela = inicio - timedelta(minutes=duracao_maxima(session))
+    ocupados = session.query(Agendamento.data_agenda, Servico.duracao)\
+        .join(Servico, Agendamento.servico_id == Servico.id)\
+        .filter(Agendamento.profissional_id == profissional_id)\
+        .filter(Agendamento.data_agenda > janela)\
+        .filter(Agendamento.data_agenda < fim)\
+        .order_by(Agendamento.data_agenda)\
+        .all()
+
+    duracao = timedelta(minutes=duracao)
+    passo = timedelta(minutes=intervalo)
+    livres = []
+    proximo = 0
+    # maior horário de término entre os agendamentos que começam antes do
+    # fim do horário candidato; como os candidatos são crescentes, basta
+    # avançar sobre os agendamentos uma única vez
+    ocupado_ate = datetime.min
+    dia = inicio.date()
+    while dia < fim.date() or (dia == fim.date() and fim.time() > time()):
+        if dia.weekday() in expediente["dias"]:
+            candidato = datetime.combine(dia, expediente["inicio"])
+            # mantém os candidatos alinhados ao intervalo a partir do
+            # início do expediente
+            while candidato < inicio:
+                candidato += passo
+            encerramento = min(datetime.combine(dia, expediente["fim"]), fim)
+            while candidato + duracao <= encerramento:
+                termino = candidato + duracao
+                while proximo < len(ocupados) and\
+                        ocupados[proximo][0] < termino:
+                    data_agenda, duracao_agendada = ocupados[proximo]
+                    ocupado_ate = max(ocupado_ate, data_agenda +
+                                      timedelta(minutes=duracao_agendada))
+                    proximo += 1
+                if ocupado_ate <= candidato:
+                    livres.append(candidato)
+                candidato += passo
+        dia += timedelta(days=1)
+    return livres
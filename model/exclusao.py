@@ -0,0 +1,104 @@
+import os
+import time
+
+from model.cliente import Cliente
+from model.profissional import Profissional
+
+
+# agendamentos excluídos por transação. Cada agendamento leva cerca de 25 µs
+# (índices e gatilhos de versão e de resumo), então um lote de 1000 segura o
+# bloqueio de escrita da base por cerca de 25 ms
+TAMANHO_LOTE_EXCLUSAO = int(os.environ.get("EXCLUSAO_LOTE", 1000))
+# pausa (ms) entre os lotes. Sem ela a exclusão pega o bloqueio de novo logo
+# após o commit e as outras gravações, que tentam de tempos em tempos
+# (busy_timeout), esperam até mais de 1 s
+PAUSA_EXCLUSAO = int(os.environ.get("EXCLUSAO_PAUSA", 20))
+# agendamentos que as rotas DELETE /cliente e /profissional excluem dentro
+# da requisição. São cerca de 20 mil por segundo, então acima disso a
+# exclusão passaria de alguns segundos e, com históricos grandes, do tempo
+# limite do worker (30 s no gunicorn); ela fica para o 'flask purge'
+LIMITE_EXCLUSAO_ROTA = int(os.environ.get("EXCLUSAO_LIMITE_ROTA", 10000))
+
+# modelo -> coluna do agendamento que referencia o modelo
+referencias_agendamento = {
+    Cliente: "cliente_id",
+    Profissional: "profissional_id",
+}
+
+
+def excede_limite_exclusao(conexao, modelo, codigo: int, limite: int) -> bool:
+    """ Informa se o cliente ou o profissional (modelo) tem mais de limite
+        agendamentos. A contagem para em limite + 1, pelo índice da coluna,
+        e não percorre todo o histórico.
+
+        Argumentos:
+            conexao: conexão da engine (engine.connect()), assim o comando
+                     entra na medição dos comandos SQL da requisição
+    """
+    coluna = referencias_agendamento[modelo]
+    quantidade = conexao.exec_driver_sql(f"""
+        SELECT COUNT(*) FROM (SELECT 1 FROM agendamento
+                               WHERE {coluna} = ? LIMIT ?)""",
+                                         (codigo, limite + 1)).scalar()
+    return quantidade > limite
+
+
+def _transacao_imediata(conexao, comando: str, parametros: tuple) -> int:
+    """ Executa o comando em uma transação própria, que pega o bloqueio de
+        escrita da base no início (BEGIN IMMEDIATE), e retorna a quantidade
+        de linhas do comando, sem as dos gatilhos.
+
+    """
+    with conexao.begin():
+        # o pysqlite não inicia a transação no begin(), então o BEGIN
+        # IMMEDIATE é enviado dentro dela e o commit do bloco a encerra
+        conexao.exec_driver_sql("BEGIN IMMEDIATE")
+        return conexao.exec_driver_sql(comando, parametros).rowcount
+
+
+def exclui_com_agendamentos(conexao, modelo, codigo: int,
+                            tamanho_lote: int = TAMANHO_LOTE_EXCLUSAO
+                            ) -> tuple:
+    """ Exclui o cliente ou o profissional (modelo) e todos os seus
+        agendamentos.
+
+        O ON DELETE CASCADE excluiria todo o histórico em uma única
+        transação, bloqueando as gravações da base até o fim. Por isso os
+        agendamentos são excluídos antes, em lotes de tamanho_lote, cada
+        lote em uma transação própria (BEGIN IMMEDIATE) e com uma pausa
+        (PAUSA_EXCLUSAO) para as outras gravações. O cadastro é
+        excluído por último e o cascade remove apenas os agendamentos
+        gravados durante a exclusão.
+
+        Argumentos:
+            conexao: conexão da engine (engine.connect()), assim os
+                     comandos entram na medição dos comandos SQL da
+                     requisição
+
+        Retorna (se o cadastro foi excluído, quantidade de agendamentos
+        excluídos em lotes).
+    """
+    coluna = referencias_agendamento[modelo]
+    tabela = modelo.__tablename__
+    chave = modelo.id.name
+    excluidos = 0
+
+    existe = conexao.exec_driver_sql(
+        f"SELECT 1 FROM {tabela} WHERE {chave} = ?", (codigo,)).first()
+    if existe is None:
+        return False, 0
+
+    while True:
+        quantidade = _transacao_imediata(conexao, f"""
+            DELETE FROM agendamento
+             WHERE pk_agenda IN (SELECT pk_agenda FROM agendamento
+                                  WHERE {coluna} = ? LIMIT ?)""",
+                                         (codigo, tamanho_lote))
+        excluidos += quantidade
+        if quantidade < tamanho_lote:
+            break
+        time.sleep(PAUSA_EXCLUSAO / 1000)
+
+    excluido = _transacao_imediata(
+        conexao, f"DELETE FROM {tabela} WHERE {chave} = ?", (codigo,)) > 0
+    return excluido, excluidos
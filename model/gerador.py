@@ -0,0 +1,263 @@
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+import random
+
+from model.agendamento import Agendamento
+from model.busca import indices_busca
+from model.cliente import Cliente
+from model.disponibilidade import expediente
+from model.profissional import Profissional
+from model.resumo import preenche_resumo
+from model.servico import Servico
+
+
+PRIMEIROS_NOMES = [
+    "Ana", "Beatriz", "Bruno", "Camila", "Carlos", "Daniel", "Eduarda",
+    "Felipe", "Fernanda", "Gabriel", "Helena", "Igor", "Isabela", "João",
+    "Juliana", "Lucas", "Larissa", "Marcos", "Mariana", "Natália", "Otávio",
+    "Paula", "Pedro", "Rafael", "Renata", "Sofia", "Thiago", "Vinícius",
+]
+SOBRENOMES = [
+    "Almeida", "Alves", "Barbosa", "Cardoso", "Carvalho", "Costa", "Dias",
+    "Ferreira", "Gomes", "Lima", "Martins", "Melo", "Oliveira", "Pereira",
+    "Ribeiro", "Rocha", "Rodrigues", "Santos", "Silva", "Souza",
+]
+SERVICOS = [
+    # (descrição, duração em minutos, valor base)
+    ("Corte", 30, 45.0), ("Barba", 30, 35.0), ("Escova", 45, 60.0),
+    ("Coloração", 90, 150.0), ("Manicure", 45, 40.0), ("Pedicure", 45, 45.0),
+    ("Hidratação", 60, 80.0), ("Progressiva", 120, 250.0),
+    ("Sobrancelha", 30, 30.0), ("Maquiagem", 60, 120.0),
+]
+
+# ocupação dos horários do expediente: mais procura no fim da manhã e no
+# fim da tarde, menos no almoço
+OCUPACAO_HORA = {8: 0.35, 9: 0.55, 10: 0.75, 11: 0.8, 12: 0.45, 13: 0.4,
+                 14: 0.6, 15: 0.65, 16: 0.75, 17: 0.85, 18: 0.7, 19: 0.5}
+# procura por dia da semana (0 é segunda-feira), maior no fim da semana
+OCUPACAO_DIA = [0.75, 0.8, 0.85, 0.95, 1.1, 1.2, 0.6]
+# os horários de início dos agendamentos são múltiplos deste intervalo
+PASSO_MINUTOS = 15
+TAMANHO_BLOCO = 100000
+# gatilhos executados a cada agendamento incluído, substituídos por uma
+# única atualização por lote
+GATILHOS_INCLUSAO = ("tr_versao_agendamento_insert",
+                     "tr_resumo_agendamento_insert")
+# gatilhos que incluem cada cliente, profissional e serviço no índice de
+# busca, substituídos pela inclusão de todos os registros gerados de uma vez
+GATILHOS_BUSCA = tuple(f"tr_{indice}_insert"
+                       for indice, _ in indices_busca.values())
+
+
+def _pesos_zipf(quantidade: int, expoente: float) -> list:
+    """ Pesos acumulados de uma distribuição de Zipf: poucos itens
+        concentram a maior parte da procura.
+
+    """
+    return list(accumulate(1 / (posicao ** expoente)
+                           for posicao in range(1, quantidade + 1)))
+
+
+def nome_gerado(indice: int) -> str:
+    """ Nome único formado por nome, sobrenome e o número do registro. """
+    return f"{PRIMEIROS_NOMES[indice % len(PRIMEIROS_NOMES)]} "\
+        f"{SOBRENOMES[indice // len(PRIMEIROS_NOMES) % len(SOBRENOMES)]} "\
+        f"{indice}"
+
+
+def _proximo_id(cursor, tabela: str, coluna: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX({coluna}), 0) + 1 FROM {tabela}")
+    return cursor.fetchone()[0]
+
+
+def _gatilhos(cursor, nomes: tuple) -> dict:
+    """ Comando de criação dos gatilhos existentes na base, pelo nome. """
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = "
+                   f"'trigger' AND name IN ({', '.join('?' for _ in nomes)})",
+                   nomes)
+    return dict(cursor.fetchall())
+
+
+def _preenche_busca(cursor, primeiros: dict):
+    """ Inclui nos índices de busca os registros de cada modelo com codigo
+        a partir do informado em primeiros (modelo -> codigo).
+
+    """
+    for modelo, primeiro in primeiros.items():
+        indice, coluna = indices_busca[modelo]
+        chave = modelo.id.name
+        cursor.execute(
+            f"INSERT INTO {indice} (rowid, {coluna.name}) "
+            f"SELECT {chave}, {coluna.name} FROM {modelo.__tablename__} "
+            f"WHERE {chave} >= ?", (primeiro,))
+
+
+def _grava_agendamentos(conexao, gatilhos: dict, lote: list):
+    """ Grava um lote de agendamentos em uma transação.
+
+        Os gatilhos de inclusão (GATILHOS_INCLUSAO) atualizariam a versão
+        da tabela e o resumo de agendamentos a cada linha, então eles são
+        removidos e recriados dentro da mesma transação: a versão é
+        incrementada uma única vez e o lote é somado ao resumo com um só
+        INSERT ... SELECT. As outras conexões nunca veem a tabela sem os
+        gatilhos.
+    """
+    cursor = conexao.cursor()
+    cursor.execute("BEGIN")
+    cursor.execute("SELECT COALESCE(MAX(pk_agenda), 0) FROM agendamento")
+    ultimo_id = cursor.fetchone()[0]
+    for nome in gatilhos:
+        cursor.execute(f"DROP TRIGGER {nome}")
+    cursor.executemany(
+        "INSERT INTO agendamento (data_agenda, cliente_id, profissional_id,"
+        " servico_id, observacao) VALUES (?, ?, ?, ?, ?)", lote)
+    for sql in gatilhos.values():
+        cursor.execute(sql)
+    if "tr_versao_agendamento_insert" in gatilhos:
+        cursor.execute("UPDATE tabela_versao SET versao = versao + 1, "
+                       "alterado_em = CURRENT_TIMESTAMP "
+                       "WHERE tabela = 'agendamento'")
+    if "tr_resumo_agendamento_insert" in gatilhos:
+        preenche_resumo(cursor, ultimo_id)
+    conexao.commit()
+
+
+def gera_dados(engine, clientes: int, profissionais: int, servicos: int,
+               agendamentos: int, semente: int = 42, inicio: datetime = None,
+               progresso=None) -> dict:
+    """ Gera dados sintéticos, determinísticos pela semente, para testes de
+        volume.
+
+        Os clientes e os serviços seguem uma distribuição de Zipf (poucos
+        concentram a maior parte dos agendamentos) e a ocupação varia com o
+        dia da semana e a hora, dentro do expediente. Os agendamentos de
+        cada profissional nunca se sobrepõem, o que também garante a
+        restrição unique_agendamento_commit. Os novos agendamentos começam
+        no dia seguinte ao último já gravado (ou em inicio).
+
+        Os registros são gravados em lotes de TAMANHO_BLOCO com executemany
+        direto no driver, cada lote em uma transação.
+
+        Argumentos:
+            progresso: função chamada com a quantidade de agendamentos já
+                       gravados após cada lote
+
+        Retorna a quantidade de registros gerados por tabela.
+    """
+    if agendamentos and not (clientes and profissionais and servicos and
+                             expediente["dias"]):
+        raise ValueError("Os agendamentos precisam de ao menos um cliente, "
+                         "um profissional, um serviço e um dia de "
+                         "expediente")
+    aleatorio = random.Random(semente)
+    # mesmo formato de data gravado pelo SQLAlchemy, usado nas comparações
+    # das consultas
+    converte_data = Agendamento.__table__.c.data_agenda.type\
+        .dialect_impl(engine.dialect).bind_processor(engine.dialect)\
+        or (lambda valor: valor)
+
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        primeiro_cliente = _proximo_id(cursor, "cliente", "pk_cliente")
+        primeiro_profissional = _proximo_id(cursor, "profissional",
+                                            "pk_profissional")
+        primeiro_servico = _proximo_id(cursor, "servico", "pk_servico")
+        cursor.execute("SELECT MAX(data_agenda) FROM agendamento")
+        ultimo = cursor.fetchone()[0]
+        gatilhos = _gatilhos(cursor, GATILHOS_INCLUSAO)
+        gatilhos_busca = _gatilhos(cursor, GATILHOS_BUSCA)
+
+        # como nos agendamentos, os índices de busca são preenchidos uma
+        # única vez, e não a cada registro, na mesma transação
+        cursor.execute("BEGIN")
+        for nome in gatilhos_busca:
+            cursor.execute(f"DROP TRIGGER {nome}")
+        cursor.executemany(
+            "INSERT INTO cliente (pk_cliente, nome) VALUES (?, ?)",
+            [(id, nome_gerado(id)) for id in
+             range(primeiro_cliente, primeiro_cliente + clientes)])
+        cursor.executemany(
+            "INSERT INTO profissional (pk_profissional, nome) VALUES (?, ?)",
+            [(id, nome_gerado(id)) for id in range(
+                primeiro_profissional, primeiro_profissional + profissionais)])
+        duracoes = []
+        linhas = []
+        for id in range(primeiro_servico, primeiro_servico + servicos):
+            descricao, duracao, valor = SERVICOS[id % len(SERVICOS)]
+            duracoes.append(duracao)
+            linhas.append((id, f"{descricao} {id}",
+                           round(valor * aleatorio.uniform(0.8, 1.3), 2),
+                           duracao))
+        cursor.executemany(
+            "INSERT INTO servico (pk_servico, descricao, valor, duracao) "
+            "VALUES (?, ?, ?, ?)", linhas)
+        for sql in gatilhos_busca.values():
+            cursor.execute(sql)
+        if gatilhos_busca:
+            _preenche_busca(cursor, {Cliente: primeiro_cliente,
+                                     Profissional: primeiro_profissional,
+                                     Servico: primeiro_servico})
+        conexao.commit()
+
+        if inicio is None:
+            inicio = datetime(2023, 1, 2) if ultimo is None else\
+                datetime.fromisoformat(ultimo[:10]) + timedelta(days=1)
+        inicio = inicio.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        pesos_clientes = _pesos_zipf(clientes, 0.7)
+        pesos_servicos = _pesos_zipf(servicos, 0.9)
+        total_clientes = pesos_clientes[-1]
+        total_servicos = pesos_servicos[-1]
+        # alguns profissionais são mais procurados que outros
+        procura = [aleatorio.uniform(0.6, 1.15) for _ in range(profissionais)]
+        abertura = expediente["inicio"].hour * 60 + expediente["inicio"].minute
+        fechamento = expediente["fim"].hour * 60 + expediente["fim"].minute
+
+        gerados = 0
+        lote = []
+        dia = inicio
+        while gerados < agendamentos:
+            semana = dia.weekday()
+            if semana in expediente["dias"]:
+                for posicao in range(profissionais):
+                    profissional = primeiro_profissional + posicao
+                    fator = OCUPACAO_DIA[semana] * procura[posicao]
+                    minuto = abertura
+                    while minuto < fechamento and gerados < agendamentos:
+                        if aleatorio.random() >= fator *\
+                                OCUPACAO_HORA.get(minuto // 60, 0.5):
+                            minuto += PASSO_MINUTOS
+                            continue
+                        servico = bisect(pesos_servicos,
+                                         aleatorio.random() * total_servicos)
+                        duracao = duracoes[servico]
+                        if minuto + duracao > fechamento:
+                            minuto += PASSO_MINUTOS
+                            continue
+                        cliente = bisect(pesos_clientes,
+                                         aleatorio.random() * total_clientes)
+                        lote.append((
+                            converte_data(dia + timedelta(minutes=minuto)),
+                            primeiro_cliente + cliente, profissional,
+                            primeiro_servico + servico, ""))
+                        gerados += 1
+                        # o próximo atendimento começa no primeiro horário
+                        # livre após o término deste
+                        minuto += -(-duracao // PASSO_MINUTOS) * PASSO_MINUTOS
+                    if len(lote) >= TAMANHO_BLOCO:
+                        _grava_agendamentos(conexao, gatilhos, lote)
+                        lote = []
+                        if progresso:
+                            progresso(gerados)
+            dia += timedelta(days=1)
+        if lote:
+            _grava_agendamentos(conexao, gatilhos, lote)
+            if progresso:
+                progresso(gerados)
+    finally:
+        conexao.close()
+
+    return {"clientes": clientes, "profissionais": profissionais,
+            "servicos": servicos, "agendamentos": gerados}
@@ -0,0 +1,232 @@
+from sqlalchemy.exc import IntegrityError
+
+from model.agendamento import Agendamento
+from model.conflito import AgendaProfissionais
+from model.cliente import Cliente
+from model.profissional import Profissional
+from model.servico import Servico
+
+
+# quantidade de itens por consulta IN, para não passar do limite de
+# parâmetros por comando do sqlite
+TAMANHO_BLOCO = 250
+
+MSG_DUPLICADO = "Agendamento com a mesma data já salvo na base :/"
+MSG_CONFLITO = "Existe outro agendamento com o mesmo profissional\
+ neste horário!"
+MSG_NAO_ENCONTRADO = "O Agendamento não foi encontrado na base"
+MSG_REPETIDO = "Agendamento informado mais de uma vez no lote"
+
+
+def _blocos(itens: list):
+    """ Divide a lista em blocos de TAMANHO_BLOCO itens. """
+    for inicio in range(0, len(itens), TAMANHO_BLOCO):
+        yield itens[inicio:inicio + TAMANHO_BLOCO]
+
+
+def _ids_existentes(session, coluna, ids) -> set:
+    """ Retorna quais dos ids informados existem na coluna. """
+    existentes = set()
+    for bloco in _blocos(list(ids)):
+        existentes.update(
+            valor for valor, in session.query(coluna).filter(
+                coluna.in_(bloco)))
+    return existentes
+
+
+def _valida_referencias(session, itens: list, erros: list) -> list:
+    """ Descarta os itens que referenciam cliente, profissional ou serviço
+        inexistentes, registrando o erro de cada um.
+
+        As referências do lote inteiro são conferidas com uma consulta por
+        tabela.
+    """
+    referencias = [
+        ("cliente_id", Cliente.id, "Cliente não encontrado na base"),
+        ("profissional_id", Profissional.id,
+         "Profissional não encontrado na base"),
+        ("servico_id", Servico.id, "Serviço não encontrado na base"),
+    ]
+    existentes = {
+        campo: _ids_existentes(session, coluna,
+                               {item[campo] for _, item in itens})
+        for campo, coluna, _ in referencias
+    }
+    validos = []
+    for indice, item in itens:
+        for campo, _, mensagem in referencias:
+            if item[campo] not in existentes[campo]:
+                erros.append({"indice": indice, "message": mensagem})
+                break
+        else:
+            validos.append((indice, item))
+    return validos
+
+
+def _grava(session, itens: list, executa, mensagem: str, erros: list) -> int:
+    """ Executa o comando do lote e efetiva a transação.
+
+        Se o banco recusar o lote por violação de integridade, o lote é
+        dividido ao meio até isolar os itens recusados, que são registrados
+        em erros, e os demais itens são gravados normalmente.
+
+        Retorna a quantidade de itens gravados.
+    """
+    if not itens:
+        return 0
+    try:
+        executa([item for _, item in itens])
+        session.commit()
+        return len(itens)
+    except IntegrityError:
+        session.rollback()
+        if len(itens) == 1:
+            erros.append({"indice": itens[0][0], "message": mensagem})
+            return 0
+        meio = len(itens) // 2
+        return _grava(session, itens[:meio], executa, mensagem, erros) +\
+            _grava(session, itens[meio:], executa, mensagem, erros)
+
+
+def _chave(item: dict) -> tuple:
+    """ Campos da restrição unique_agendamento_commit. """
+    return (item["data_agenda"], item["cliente_id"],
+            item["profissional_id"], item["servico_id"])
+
+
+def insere_agendamentos(session, itens: list):
+    """ Insere um lote de agendamentos em uma única transação.
+
+        Argumentos:
+            session: sessão com a base
+            itens: lista de (indice, dados do agendamento)
+
+        Retorna a quantidade de agendamentos inseridos e a lista de erros
+        dos itens recusados.
+    """
+    erros = []
+    itens = _valida_referencias(session, itens, erros)
+
+    # horários já ocupados dos profissionais no período do lote, que
+    # também incluem os agendamentos do lote que já estão gravados na base
+    duracoes = dict(session.query(Servico.id, Servico.duracao))
+    agenda = AgendaProfissionais.carrega(session,
+                                         [item for _, item in itens],
+                                         duracoes)
+
+    validos = []
+    vistos = set()
+    for indice, item in itens:
+        chave = _chave(item)
+        duracao = duracoes[item["servico_id"]]
+        if chave in agenda.chaves or chave in vistos:
+            erros.append({"indice": indice, "message": MSG_DUPLICADO})
+        elif agenda.conflito(item["profissional_id"], item["data_agenda"],
+                             duracao):
+            erros.append({"indice": indice, "message": MSG_CONFLITO})
+        else:
+            vistos.add(chave)
+            # os próximos itens do lote também não podem se sobrepor a este
+            agenda.adiciona(None, item["profissional_id"],
+                            item["data_agenda"], duracao)
+            validos.append((indice, item))
+
+    inseridos = _grava(
+        session, validos,
+        lambda lote: session.bulk_insert_mappings(Agendamento, lote),
+        MSG_DUPLICADO, erros)
+    return inseridos, sorted(erros, key=lambda erro: erro["indice"])
+
+
+def atualiza_agendamentos(session, itens: list):
+    """ Atualiza um lote de agendamentos em uma única transação, com as
+        mesmas regras e campos da edição individual (PUT /agendamento).
+
+        Cada codigo é atualizado uma única vez, pelo primeiro item que o
+        informa: as repetições são registradas como erro, como na exclusão
+        em lote.
+
+        Argumentos:
+            session: sessão com a base
+            itens: lista de (indice, dados do agendamento com o id)
+
+        Retorna a quantidade de agendamentos atualizados e a lista de erros
+        dos itens recusados.
+    """
+    erros = []
+    unicos = []
+    vistos = set()
+    for indice, item in itens:
+        if item["id"] in vistos:
+            erros.append({"indice": indice, "message": MSG_REPETIDO})
+        else:
+            vistos.add(item["id"])
+            unicos.append((indice, item))
+    itens = _valida_referencias(session, unicos, erros)
+
+    cadastrados = _ids_existentes(session, Agendamento.id,
+                                  {item["id"] for _, item in itens})
+
+    # horários já ocupados dos profissionais no período do lote
+    duracoes = dict(session.query(Servico.id, Servico.duracao))
+    agenda = AgendaProfissionais.carrega(session,
+                                         [item for _, item in itens],
+                                         duracoes)
+
+    validos = []
+    for indice, item in itens:
+        if item["id"] not in cadastrados:
+            erros.append({"indice": indice, "message": MSG_NAO_ENCONTRADO})
+            continue
+        duracao = duracoes[item["servico_id"]]
+        if agenda.conflito(item["profissional_id"], item["data_agenda"],
+                           duracao, ignora_id=item["id"]):
+            erros.append({"indice": indice, "message": MSG_CONFLITO})
+            continue
+        # substitui o horário antigo do agendamento pelo novo na agenda
+        agenda.remove(item["id"])
+        agenda.adiciona(item["id"], item["profissional_id"],
+                        item["data_agenda"], duracao)
+        validos.append((indice, {
+            "id": item["id"],
+            "data_agenda": item["data_agenda"],
+            "cliente_id": item["cliente_id"],
+            "profissional_id": item["profissional_id"],
+            "servico_id": item["servico_id"],
+            "observacao": item["observacao"],
+        }))
+
+    atualizados = _grava(
+        session, validos,
+        lambda lote: session.bulk_update_mappings(Agendamento, lote),
+        MSG_DUPLICADO, erros)
+    return atualizados, sorted(erros, key=lambda erro: erro["indice"])
+
+
+def exclui_agendamentos(session, ids: list):
+    """ Exclui um lote de agendamentos pelo codigo em uma única transação.
+
+        Cada codigo é excluído uma única vez: as repetições são registradas
+        como erro, assim o total do lote é sempre a quantidade de
+        excluídos mais a de erros.
+
+        Retorna a quantidade de agendamentos excluídos e a lista de erros
+        dos codigos não encontrados ou repetidos.
+    """
+    cadastrados = _ids_existentes(session, Agendamento.id, set(ids))
+    erros = []
+    vistos = set()
+    for indice, id in enumerate(ids):
+        if id not in cadastrados:
+            erros.append({"indice": indice, "message": MSG_NAO_ENCONTRADO})
+        elif id in vistos:
+            erros.append({"indice": indice, "message": MSG_REPETIDO})
+        vistos.add(id)
+
+    excluidos = 0
+    for bloco in _blocos(list(cadastrados)):
+        excluidos += session.query(Agendamento)\
+            .filter(Agendamento.id.in_(bloco))\
+            .delete(synchronize_session=False)
+    session.commit()
+    return excluidos, erros
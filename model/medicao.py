@@ -0,0 +1,125 @@
+from contextvars import ContextVar
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+class Medicao:
+    """ Estatísticas dos comandos SQL executados durante uma requisição:
+        quantidade de comandos e tempo total (em segundos) gasto no banco.
+
+        Quando sql é uma lista (perfil da requisição), cada comando também
+        é registrado nela com os parâmetros e a duração.
+    """
+    __slots__ = ("comandos", "tempo", "sql")
+
+    def __init__(self):
+        self.comandos = 0
+        self.tempo = 0.0
+        self.sql = None
+
+
+# medição da requisição em andamento. Cada thread (ou tarefa assíncrona)
+# possui o seu próprio contexto, então as requisições não se misturam.
+medicao_atual = ContextVar("medicao_atual", default=None)
+
+
+def inicia_medicao() -> Medicao:
+    """ Inicia a medição dos comandos SQL da requisição atual. """
+    medicao = Medicao()
+    medicao_atual.set(medicao)
+    return medicao
+
+
+def encerra_medicao():
+    """ Encerra a medição da requisição atual, retornando a Medicao. """
+    medicao = medicao_atual.get()
+    medicao_atual.set(None)
+    return medicao
+
+
+def antes_comando(conn, cursor, statement, parameters, context,
+                  executemany):
+    """ Registra o início do comando. Deve ser registrado no evento
+        "before_cursor_execute" da engine.
+
+    """
+    if medicao_atual.get() is not None:
+        conn.info.setdefault("inicio_comando", []).append(
+            time.perf_counter())
+
+
+def depois_comando(conn, cursor, statement, parameters, context,
+                   executemany):
+    """ Soma o comando e o seu tempo à medição da requisição. Deve ser
+        registrado no evento "after_cursor_execute" da engine.
+
+    """
+    _encerra_comando(conn.info, statement, parameters, executemany)
+
+
+def _encerra_comando(info: dict, statement, parameters, executemany):
+    """ Retira o início do comando das informações da conexão e, durante
+        uma medição, soma o comando e o seu tempo a ela.
+
+    """
+    inicios = info.get("inicio_comando")
+    if not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    medicao = medicao_atual.get()
+    if medicao is None:
+        return
+    medicao.comandos += 1
+    medicao.tempo += duracao
+    if medicao.sql is not None:
+        medicao.sql.append({
+            "sql": statement,
+            # os lotes podem ter milhares de parâmetros
+            "parametros": repr(parameters)[:500],
+            "executemany": executemany,
+            "ms": round(duracao * 1000, 3),
+        })
+
+
+# funções chamadas com o tempo (em segundos) de espera por uma conexão do
+# pool e a cada comando recusado por bloqueio da base (sqlite)
+observadores_espera = []
+observadores_bloqueio = []
+
+
+class PoolMedido(QueuePool):
+    """ QueuePool que informa aos observadores_espera quanto tempo cada
+        requisição esperou por uma conexão livre.
+
+    """
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            espera = time.perf_counter() - inicio
+            for observador in observadores_espera:
+                observador(espera)
+
+
+def erro_comando(contexto):
+    """ Encerra a medição do comando que falhou, que também é contado, e
+        avisa os observadores_bloqueio quando o sqlite desiste de um comando
+        após esperar o busy_timeout ("database is locked"). Deve ser
+        registrado no evento "handle_error" da engine.
+
+    """
+    # o after_cursor_execute não é chamado para o comando que falhou, então
+    # o início dele é retirado aqui. Sem isso ele ficaria na conexão do
+    # pool e os comandos seguintes usariam o início errado
+    if contexto.connection is not None and contexto.statement is not None:
+        executemany = contexto.execution_context is not None and\
+            contexto.execution_context.executemany
+        _encerra_comando(contexto.connection.info, contexto.statement,
+                         contexto.parameters, executemany)
+    mensagem = str(contexto.original_exception)
+    if "database is locked" in mensagem or "database is busy" in mensagem:
+        for observador in observadores_bloqueio:
+            observador()
@@ -0,0 +1,402 @@
+from datetime import datetime
+
+
+# Migrações do esquema da base de dados, em ordem de versão. Cada migração é
+# aplicada em uma transação própria e registrada na tabela schema_versao.
+# Novas migrações devem apenas ser adicionadas ao final da lista, nunca
+# alteradas depois de publicadas.
+
+
+def _v1_esquema_inicial(cursor):
+    """ Cria as tabelas do MVP. Em bases criadas pelo antigo create_all as
+        tabelas já existem e nada é alterado.
+
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cliente (
+            pk_cliente INTEGER NOT NULL,
+            nome VARCHAR(150),
+            PRIMARY KEY (pk_cliente),
+            UNIQUE (nome)
+        )""")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS profissional (
+            pk_profissional INTEGER NOT NULL,
+            nome VARCHAR(150),
+            PRIMARY KEY (pk_profissional),
+            UNIQUE (nome)
+        )""")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS servico (
+            pk_servico INTEGER NOT NULL,
+            descricao VARCHAR(150),
+            valor FLOAT,
+            PRIMARY KEY (pk_servico),
+            UNIQUE (descricao)
+        )""")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS agendamento (
+            pk_agenda INTEGER NOT NULL,
+            data_agenda DATETIME,
+            cliente_id INTEGER NOT NULL,
+            profissional_id INTEGER NOT NULL,
+            servico_id INTEGER NOT NULL,
+            observacao VARCHAR(300),
+            PRIMARY KEY (pk_agenda),
+            CONSTRAINT unique_agendamento_commit
+                UNIQUE (data_agenda, cliente_id, profissional_id, servico_id),
+            FOREIGN KEY(cliente_id) REFERENCES cliente (pk_cliente),
+            FOREIGN KEY(profissional_id)
+                REFERENCES profissional (pk_profissional),
+            FOREIGN KEY(servico_id) REFERENCES servico (pk_servico)
+        )""")
+
+
+def _v2_indices_agendamento(cursor):
+    """ Cria os índices de agendamento por cliente, profissional e serviço. """
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_agendamento_cliente_data
+            ON agendamento (cliente_id, data_agenda)""")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_agendamento_profissional_data
+            ON agendamento (profissional_id, data_agenda)""")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_agendamento_servico_data
+            ON agendamento (servico_id, data_agenda)""")
+
+
+def _v3_versao_tabelas(cursor):
+    """ Cria o contador de versão de cada tabela, incrementado por gatilhos
+        a cada inclusão, alteração ou remoção. É usado para gerar o ETag e o
+        Last-Modified das consultas sem ler os registros.
+
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tabela_versao (
+            tabela VARCHAR(50) NOT NULL PRIMARY KEY,
+            versao INTEGER NOT NULL,
+            alterado_em DATETIME NOT NULL
+        )""")
+    for tabela in ("agendamento", "cliente", "profissional", "servico"):
+        cursor.execute(
+            "INSERT OR IGNORE INTO tabela_versao (tabela, versao, alterado_em)"
+            " VALUES (?, 1, CURRENT_TIMESTAMP)", (tabela,))
+        for operacao in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS
+                    tr_versao_{tabela}_{operacao.lower()}
+                AFTER {operacao} ON {tabela}
+                BEGIN
+                    UPDATE tabela_versao
+                       SET versao = versao + 1,
+                           alterado_em = CURRENT_TIMESTAMP
+                     WHERE tabela = '{tabela}';
+                END""")
+
+
+def _v4_duracao_servico(cursor):
+    """ Adiciona a duração (em minutos) do serviço, usada na verificação de
+        conflitos de horário do profissional.
+
+    """
+    cursor.execute("ALTER TABLE servico "
+                   "ADD COLUMN duracao INTEGER NOT NULL DEFAULT 30")
+
+
+# tabelas de resumo dos agendamentos por dia -> colunas agrupadas além do dia
+_RESUMOS = {
+    "resumo_agendamento": ("profissional_id", "servico_id"),
+    "resumo_servico": ("servico_id",),
+}
+
+
+def _atualiza_resumos(registro: str, sinal: str) -> str:
+    """ Comandos de gatilho que somam (sinal "+", registro NEW) ou subtraem
+        (sinal "-", registro OLD) um agendamento nas tabelas de resumo. Na
+        subtração a combinação que fica sem agendamentos é removida.
+
+    """
+    comandos = []
+    for tabela, colunas in _RESUMOS.items():
+        valores = ", ".join(f"{registro}.{coluna}" for coluna in colunas)
+        comandos.append(f"""
+            INSERT INTO {tabela} (dia, {", ".join(colunas)}, quantidade)
+            VALUES (date({registro}.data_agenda), {valores}, {sinal}1)
+                ON CONFLICT (dia, {", ".join(colunas)})
+                DO UPDATE SET quantidade = quantidade {sinal} 1;""")
+        if sinal == "-":
+            filtro = " AND ".join(f"{coluna} = {registro}.{coluna}"
+                                  for coluna in colunas)
+            comandos.append(f"""
+            DELETE FROM {tabela}
+             WHERE dia = date({registro}.data_agenda) AND {filtro}
+               AND quantidade = 0;""")
+    return "".join(comandos)
+
+
+def _v5_resumo_agendamento(cursor):
+    """ Cria os resumos da quantidade de agendamentos por dia, profissional
+        e serviço (resumo_agendamento) e por dia e serviço (resumo_servico),
+        mantidos por gatilhos a cada inclusão, alteração ou remoção de
+        agendamento, e os preenche com os agendamentos já gravados. Os
+        relatórios de faturamento e ocupação leem apenas os resumos.
+
+    """
+    for tabela, colunas in _RESUMOS.items():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabela} (
+                dia DATE NOT NULL,
+                {" INTEGER NOT NULL, ".join(colunas)} INTEGER NOT NULL,
+                quantidade INTEGER NOT NULL,
+                PRIMARY KEY (dia, {", ".join(colunas)})
+            )""")
+        cursor.execute(f"""
+            INSERT INTO {tabela} (dia, {", ".join(colunas)}, quantidade)
+            SELECT date(data_agenda), {", ".join(colunas)}, COUNT(*)
+              FROM agendamento
+             WHERE data_agenda IS NOT NULL
+             GROUP BY date(data_agenda), {", ".join(colunas)}""")
+    # relatórios de um profissional
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_resumo_agendamento_profissional_dia
+            ON resumo_agendamento (profissional_id, dia)""")
+
+    soma = _atualiza_resumos("NEW", "+")
+    subtrai = _atualiza_resumos("OLD", "-")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_resumo_agendamento_insert
+        AFTER INSERT ON agendamento
+        WHEN NEW.data_agenda IS NOT NULL
+        BEGIN {soma}
+        END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_resumo_agendamento_delete
+        AFTER DELETE ON agendamento
+        WHEN OLD.data_agenda IS NOT NULL
+        BEGIN {subtrai}
+        END""")
+    # a alteração sai do resumo antigo e entra no novo; os dois gatilhos
+    # cobrem as alterações de/para data vazia
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_resumo_agendamento_update_old
+        AFTER UPDATE OF data_agenda, profissional_id, servico_id
+        ON agendamento
+        WHEN OLD.data_agenda IS NOT NULL
+        BEGIN {subtrai}
+        END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_resumo_agendamento_update_new
+        AFTER UPDATE OF data_agenda, profissional_id, servico_id
+        ON agendamento
+        WHEN NEW.data_agenda IS NOT NULL
+        BEGIN {soma}
+        END""")
+
+
+# índices de busca textual -> (tabela, chave primária, coluna pesquisada)
+_BUSCAS = {
+    "busca_cliente": ("cliente", "pk_cliente", "nome"),
+    "busca_profissional": ("profissional", "pk_profissional", "nome"),
+    "busca_servico": ("servico", "pk_servico", "descricao"),
+}
+
+
+def _v6_busca_nomes(cursor):
+    """ Cria os índices FTS5 dos nomes de clientes e profissionais e das
+        descrições de serviços, sem acentos e sem diferenciar maiúsculas,
+        com índices de prefixo de até 8 letras para a busca enquanto o
+        nome é digitado. Os índices guardam apenas os termos (o texto fica
+        na própria tabela), são mantidos por gatilhos e preenchidos com os
+        registros já gravados.
+
+    """
+    for indice, (tabela, chave, coluna) in _BUSCAS.items():
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+                {coluna},
+                content='{tabela}',
+                content_rowid='{chave}',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='1 2 3 4 5 6 7 8'
+            )""")
+        # preenche o índice e junta os segmentos gerados em um só
+        for comando in ("rebuild", "optimize"):
+            cursor.execute(f"INSERT INTO {indice} ({indice}) VALUES (?)",
+                           (comando,))
+
+        inclui = f"""
+            INSERT INTO {indice} (rowid, {coluna})
+            VALUES (NEW.{chave}, NEW.{coluna});"""
+        remove = f"""
+            INSERT INTO {indice} ({indice}, rowid, {coluna})
+            VALUES ('delete', OLD.{chave}, OLD.{coluna});"""
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS tr_{indice}_insert
+            AFTER INSERT ON {tabela}
+            BEGIN {inclui}
+            END""")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS tr_{indice}_delete
+            AFTER DELETE ON {tabela}
+            BEGIN {remove}
+            END""")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS tr_{indice}_update
+            AFTER UPDATE OF {chave}, {coluna} ON {tabela}
+            BEGIN {remove}{inclui}
+            END""")
+
+
+def _v7_exclusao_em_cascata(cursor):
+    """ Recria a tabela agendamento com as regras de exclusão das chaves
+        estrangeiras: a exclusão do cliente ou do profissional exclui os
+        seus agendamentos (ON DELETE CASCADE) e a exclusão de um serviço
+        com agendamentos é recusada (ON DELETE RESTRICT).
+
+        O sqlite não altera as restrições de uma tabela existente, então a
+        tabela é copiada para uma nova, com os mesmos índices e gatilhos.
+        Os agendamentos órfãos, deixados pelas exclusões feitas sem a
+        verificação das chaves estrangeiras, são excluídos antes da cópia
+        (os gatilhos atualizam os resumos).
+
+        Migração offline: a cópia de toda a tabela roda em uma única
+        transação e bloqueia as gravações até o fim (cerca de 11 s com 1
+        milhão de agendamentos). Deve ser aplicada com a API parada.
+    """
+    cursor.execute("""
+        DELETE FROM agendamento
+         WHERE cliente_id NOT IN (SELECT pk_cliente FROM cliente)
+            OR profissional_id NOT IN (SELECT pk_profissional
+                                         FROM profissional)
+            OR servico_id NOT IN (SELECT pk_servico FROM servico)""")
+    # índices e gatilhos são excluídos junto com a tabela antiga
+    cursor.execute("""
+        SELECT sql FROM sqlite_master
+         WHERE tbl_name = 'agendamento' AND type IN ('index', 'trigger')
+           AND sql IS NOT NULL""")
+    objetos = [sql for sql, in cursor.fetchall()]
+
+    cursor.execute("""
+        CREATE TABLE agendamento_nova (
+            pk_agenda INTEGER NOT NULL,
+            data_agenda DATETIME,
+            cliente_id INTEGER NOT NULL,
+            profissional_id INTEGER NOT NULL,
+            servico_id INTEGER NOT NULL,
+            observacao VARCHAR(300),
+            PRIMARY KEY (pk_agenda),
+            CONSTRAINT unique_agendamento_commit
+                UNIQUE (data_agenda, cliente_id, profissional_id, servico_id),
+            FOREIGN KEY(cliente_id) REFERENCES cliente (pk_cliente)
+                ON DELETE CASCADE,
+            FOREIGN KEY(profissional_id)
+                REFERENCES profissional (pk_profissional) ON DELETE CASCADE,
+            FOREIGN KEY(servico_id) REFERENCES servico (pk_servico)
+                ON DELETE RESTRICT
+        )""")
+    colunas = "pk_agenda, data_agenda, cliente_id, profissional_id, "\
+        "servico_id, observacao"
+    cursor.execute(f"INSERT INTO agendamento_nova ({colunas}) "
+                   f"SELECT {colunas} FROM agendamento")
+    cursor.execute("DROP TABLE agendamento")
+    cursor.execute("ALTER TABLE agendamento_nova RENAME TO agendamento")
+    for sql in objetos:
+        cursor.execute(sql)
+
+
+MIGRACOES = [
+    (1, "esquema inicial", _v1_esquema_inicial),
+    (2, "indices de agendamento", _v2_indices_agendamento),
+    (3, "versao das tabelas", _v3_versao_tabelas),
+    (4, "duracao do servico", _v4_duracao_servico),
+    (5, "resumo de agendamentos", _v5_resumo_agendamento),
+    (6, "busca de nomes", _v6_busca_nomes),
+    (7, "exclusao em cascata", _v7_exclusao_em_cascata),
+]
+
+# versão do esquema esperada pela aplicação
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_base(engine) -> int:
+    """ Retorna a versão do esquema gravada na base, ou 0 quando a base
+        ainda não foi migrada.
+
+    """
+    with engine.connect() as conexao:
+        existe = conexao.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'schema_versao'").first()
+        if not existe:
+            return 0
+        return conexao.exec_driver_sql(
+            "SELECT COALESCE(MAX(versao), 0) FROM schema_versao").scalar()
+
+
+def verifica_versao(engine):
+    """ Confere se a base está na versão esperada pela aplicação.
+
+        Gera RuntimeError quando existem migrações pendentes.
+    """
+    versao = versao_base(engine)
+    if versao < VERSAO_ATUAL:
+        raise RuntimeError(
+            f"Base de dados na versão {versao}, a aplicação espera a versão "
+            f"{VERSAO_ATUAL}. Execute 'flask migrate'.")
+
+
+def migra(engine, ate: int = VERSAO_ATUAL) -> list:
+    """ Aplica as migrações pendentes até a versão informada.
+
+        Cada migração roda em uma transação própria (BEGIN IMMEDIATE), assim
+        os bloqueios de escrita duram apenas uma etapa e, com o journal em
+        WAL, as leituras dos workers em execução continuam atendidas. As
+        migrações que reescrevem uma tabela inteira (a 7, que copia a
+        tabela agendamento) seguram o bloqueio durante toda a cópia e são
+        offline: devem ser aplicadas com a API parada. A versão é lida
+        novamente com o bloqueio de escrita, assim duas execuções
+        simultâneas não aplicam a mesma migração.
+
+        Retorna a lista das migrações aplicadas por esta execução.
+    """
+    aplicadas = []
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_versao (
+                versao INTEGER NOT NULL PRIMARY KEY,
+                descricao VARCHAR(200),
+                aplicada_em DATETIME
+            )""")
+        conexao.commit()
+        cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_versao")
+        versao = cursor.fetchone()[0]
+
+        for numero, descricao, migracao in MIGRACOES:
+            if numero <= versao or numero > ate:
+                continue
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # outra execução pode ter aplicado a migração depois da
+                # leitura acima; com o bloqueio a versão não muda mais
+                cursor.execute(
+                    "SELECT COALESCE(MAX(versao), 0) FROM schema_versao")
+                versao = cursor.fetchone()[0]
+                if numero <= versao:
+                    conexao.rollback()
+                    continue
+                migracao(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_versao (versao, descricao, aplicada_em)"
+                    " VALUES (?, ?, ?)",
+                    (numero, descricao, datetime.now().isoformat(" ")))
+                conexao.commit()
+            except Exception:
+                conexao.rollback()
+                raise
+            aplicadas.append((numero, descricao))
+        cursor.close()
+    finally:
+        conexao.close()
+    return aplicadas
@@ -0,0 +1,23 @@
+from sqlalchemy import tuple_
+
+
+def pagina_keyset(query, colunas, chave, limite: int):
+    """ Aplica a paginação por chave (keyset) na consulta.
+
+        Argumentos:
+            query: consulta já filtrada
+            colunas: colunas da chave de ordenação, terminando na chave primária
+            chave: valores da chave do último registro da página anterior ou
+                   None para a primeira página
+            limite: quantidade máxima de registros da página
+
+        Retorna os registros da página e se existe uma próxima página.
+    """
+    if chave is not None:
+        if len(colunas) == 1:
+            query = query.filter(colunas[0] > chave[0])
+        else:
+            query = query.filter(tuple_(*colunas) > tuple_(*chave))
+    # busca um registro a mais apenas para saber se existe a próxima página
+    registros = query.order_by(*colunas).limit(limite + 1).all()
+    return registros[:limite], len(registros) > limite
@@ -8,7 +8,11 @@ class Profissional(Base):
 
     id = Column("pk_profissional", Integer, primary_key=True)
     nome = Column(String(150), unique=True)
-    agendamentos = relationship("Agendamento", back_populates="profissional")
+    # os agendamentos são excluídos pela própria base (ON DELETE CASCADE),
+    # sem carregá-los na sessão
+    agendamentos = relationship("Agendamento", cascade="all,delete",
+                                passive_deletes=True,
+                                back_populates="profissional")
 
     def __init__(self, nome: str):
         """
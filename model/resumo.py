@@ -0,0 +1,156 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Column, Date, Integer, Index, func
+
+from model import Base
+from model.disponibilidade import expediente
+from model.profissional import Profissional
+from model.servico import Servico
+
+
+# As tabelas de resumo são mantidas pelos gatilhos tr_resumo_agendamento_*
+# (migração 5) a cada inclusão, alteração ou remoção de agendamento e nunca
+# são gravadas pela aplicação.
+
+
+class ResumoAgendamento(Base):
+    """ Quantidade de agendamentos por dia, profissional e serviço. """
+    __tablename__ = 'resumo_agendamento'
+    __table_args__ = (
+        # relatórios de um profissional
+        Index('ix_resumo_agendamento_profissional_dia',
+              'profissional_id', 'dia'),
+    )
+
+    dia = Column(Date, primary_key=True)
+    profissional_id = Column(Integer, primary_key=True)
+    servico_id = Column(Integer, primary_key=True)
+    quantidade = Column(Integer, nullable=False)
+
+
+class ResumoServico(Base):
+    """ Quantidade de agendamentos por dia e serviço, usada no faturamento
+        por serviço sem percorrer os profissionais.
+
+    """
+    __tablename__ = 'resumo_servico'
+
+    dia = Column(Date, primary_key=True)
+    servico_id = Column(Integer, primary_key=True)
+    quantidade = Column(Integer, nullable=False)
+
+
+def preenche_resumo(cursor, desde_id: int = 0):
+    """ Soma nos resumos os agendamentos com codigo maior que desde_id. """
+    for resumo in (ResumoAgendamento, ResumoServico):
+        colunas = ", ".join(coluna.name for coluna in resumo.__table__.c
+                            if coluna.name not in ("dia", "quantidade"))
+        cursor.execute(f"""
+            INSERT INTO {resumo.__tablename__} (dia, {colunas}, quantidade)
+            SELECT date(data_agenda), {colunas}, COUNT(*)
+              FROM agendamento
+             WHERE pk_agenda > ? AND data_agenda IS NOT NULL
+             GROUP BY date(data_agenda), {colunas}
+                ON CONFLICT (dia, {colunas})
+                DO UPDATE SET quantidade = quantidade + excluded.quantidade""",
+                       (desde_id,))
+
+
+def reconstroi_resumo(engine) -> int:
+    """ Refaz os resumos a partir de todos os agendamentos, em uma única
+        transação.
+
+        Retorna a quantidade de linhas do resumo por dia, profissional e
+        serviço.
+    """
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("DELETE FROM resumo_agendamento")
+            cursor.execute("DELETE FROM resumo_servico")
+            preenche_resumo(cursor)
+            cursor.execute("SELECT COUNT(*) FROM resumo_agendamento")
+            linhas = cursor.fetchone()[0]
+            conexao.commit()
+        except Exception:
+            conexao.rollback()
+            raise
+        cursor.close()
+    finally:
+        conexao.close()
+    return linhas
+
+
+def faturamento(session, inicio: date, fim: date, agrupamento: str,
+                profissional_id: int = None, servico_id: int = None):
+    """ Retorna o faturamento por dia e profissional (ou serviço) no
+        período [inicio, fim], ordenado pelo dia: (dia, codigo, nome,
+        agendamentos, faturamento).
+
+        Lê apenas os resumos, com o valor atual de cada serviço. Sem o
+        filtro de profissional, o faturamento por serviço vem do
+        resumo_servico.
+    """
+    resumo = ResumoServico if agrupamento == "servico" and\
+        profissional_id is None else ResumoAgendamento
+    if agrupamento == "servico":
+        codigo, nome = resumo.servico_id, Servico.descricao
+    else:
+        codigo, nome = resumo.profissional_id, Profissional.nome
+    consulta = session.query(
+        resumo.dia, codigo, nome, func.sum(resumo.quantidade),
+        func.sum(resumo.quantidade * Servico.valor))\
+        .join(Servico, resumo.servico_id == Servico.id)
+    if agrupamento != "servico":
+        consulta = consulta.join(
+            Profissional, resumo.profissional_id == Profissional.id)
+    consulta = _filtra(consulta, resumo, inicio, fim, profissional_id,
+                       servico_id)
+    return consulta.group_by(resumo.dia, codigo)\
+                   .order_by(resumo.dia, codigo).all()
+
+
+def ocupacao(session, inicio: date, fim: date, profissional_id: int = None):
+    """ Retorna a ocupação dos profissionais por dia no período
+        [inicio, fim], ordenada pelo dia: (dia, codigo, nome, agendamentos,
+        minutos agendados, minutos do expediente).
+
+        Lê apenas o resumo, com a duração atual de cada serviço. Os dias
+        fora do expediente têm 0 minutos de expediente.
+    """
+    consulta = session.query(
+        ResumoAgendamento.dia, ResumoAgendamento.profissional_id,
+        Profissional.nome, func.sum(ResumoAgendamento.quantidade),
+        func.sum(ResumoAgendamento.quantidade * Servico.duracao))\
+        .join(Servico, ResumoAgendamento.servico_id == Servico.id)\
+        .join(Profissional,
+              ResumoAgendamento.profissional_id == Profissional.id)
+    consulta = _filtra(consulta, ResumoAgendamento, inicio, fim,
+                       profissional_id)
+    linhas = consulta.group_by(ResumoAgendamento.dia,
+                               ResumoAgendamento.profissional_id)\
+                     .order_by(ResumoAgendamento.dia,
+                               ResumoAgendamento.profissional_id).all()
+    return [tuple(linha) + (_minutos_expediente(linha[0]),)
+            for linha in linhas]
+
+
+def _filtra(consulta, resumo, inicio: date, fim: date,
+            profissional_id: int = None, servico_id: int = None):
+    """ Aplica o período e os filtros opcionais na consulta do resumo. """
+    consulta = consulta.filter(resumo.dia >= inicio, resumo.dia <= fim)
+    if profissional_id is not None:
+        consulta = consulta.filter(resumo.profissional_id == profissional_id)
+    if servico_id is not None:
+        consulta = consulta.filter(resumo.servico_id == servico_id)
+    return consulta
+
+
+def _minutos_expediente(dia: date) -> int:
+    if dia.weekday() not in expediente["dias"]:
+        return 0
+    abertura = datetime.combine(dia, expediente["inicio"])
+    fechamento = datetime.combine(dia, expediente["fim"])
+    return (fechamento - abertura) // timedelta(minutes=1)
@@ -9,14 +9,19 @@ class Servico(Base):
     id = Column("pk_servico", Integer, primary_key=True)
     descricao = Column(String(150), unique=True)
     valor = Column(Float)
+    # duração do serviço em minutos
+    duracao = Column(Integer, nullable=False, default=30)
     agendamentos = relationship("Agendamento", back_populates="servico")
 
-    def __init__(self, descricao: str, valor: float):
+    def __init__(self, descricao: str, valor: float, duracao: int = 30):
         """
         Cria um servico
 
         Argumentos:
             descricao: descrição do servico
+            valor: valor do servico
+            duracao: duração do servico em minutos
         """
         self.descricao = descricao
         self.valor = valor
+        self.duracao = duracao
@@ -0,0 +1,38 @@
+import os
+
+
+# perfil de ajuste do sqlite aplicado em cada nova conexão. Os valores podem
+# ser alterados por variáveis de ambiente e SQLITE_PERFIL=padrao desativa
+# todos os ajustes, mantendo o comportamento padrão do sqlite.
+pragmas = {
+    # leitores não são bloqueados pelos escritores
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    # com WAL, NORMAL só sincroniza o disco nos checkpoints
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # leitura do arquivo por memória mapeada (em bytes)
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # valores negativos são em KiB: 64 MiB de cache de páginas por conexão
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64000)),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+    # tempo de espera (ms) por um bloqueio antes de gerar "database is locked"
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+}
+
+perfil = os.environ.get("SQLITE_PERFIL", "desempenho")
+
+
+def aplica_pragmas(dbapi_connection, connection_record):
+    """ Aplica o perfil de ajuste do sqlite em uma nova conexão.
+
+        As chaves estrangeiras (e as exclusões em cascata) são verificadas
+        em todos os perfis, já que o sqlite as desativa por padrão em cada
+        conexão.
+
+        Deve ser registrado no evento "connect" da engine.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    if perfil != "padrao":
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+    cursor.close()
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+from sqlalchemy import bindparam, text
+
+
+def versoes_tabelas(session, tabelas):
+    """ Retorna os contadores de versão das tabelas informadas, na mesma
+        ordem, e a data (UTC) da alteração mais recente entre elas.
+
+        Os contadores são mantidos por gatilhos na tabela tabela_versao.
+    """
+    consulta = text("SELECT tabela, versao, alterado_em FROM tabela_versao "
+                    "WHERE tabela IN :tabelas")\
+        .bindparams(bindparam("tabelas", expanding=True))
+    linhas = {tabela: (versao, alterado_em) for tabela, versao, alterado_em
+              in session.execute(consulta, {"tabelas": list(tabelas)})}
+    versoes = [linhas[tabela][0] for tabela in tabelas]
+    alterado_em = max(datetime.fromisoformat(linhas[tabela][1])
+                      for tabela in tabelas)
+    return versoes, alterado_em.replace(tzinfo=timezone.utc)
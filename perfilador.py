@@ -0,0 +1,56 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+
+
+# segredo que deve ser enviado no cabeçalho X-Profile (ou no parâmetro
+# profile) para gerar o perfil de uma requisição. Vazio desativa o recurso.
+segredo = os.environ.get("PERFIL_SEGREDO", "")
+# diretório onde os perfis são gravados
+diretorio = os.environ.get(
+    "PERFIL_DIR", os.path.join(os.environ.get("LOG_DIR", "log"), "perfis"))
+
+
+def solicitado(valor: str) -> bool:
+    """ Informa se o valor enviado pelo cliente confere com o segredo. """
+    if not segredo or not valor:
+        return False
+    return hmac.compare_digest(valor.encode(), segredo.encode())
+
+
+class PerfilRequisicao:
+    """ Perfil (cProfile) da execução de uma única requisição.
+
+        Ao encerrar são gravados no diretório dos perfis:
+            <id>.prof: estatísticas do cProfile, que podem ser abertas com
+                       pstats, snakeviz ou convertidas em flame graph
+            <id>.json: dados da requisição, comandos SQL executados e o
+                       resumo das funções com maior tempo acumulado
+    """
+
+    def __init__(self):
+        self.id = time.strftime("%Y%m%d%H%M%S") + "_" + uuid.uuid4().hex[:8]
+        self._profile = cProfile.Profile()
+
+    def inicia(self):
+        self._profile.enable()
+
+    def encerra(self, dados: dict, sql: list) -> str:
+        """ Encerra o perfil e grava os arquivos, retornando o id. """
+        self._profile.disable()
+        os.makedirs(diretorio, exist_ok=True)
+        arquivo = os.path.join(diretorio, self.id)
+        self._profile.dump_stats(arquivo + ".prof")
+
+        resumo = io.StringIO()
+        pstats.Stats(self._profile, stream=resumo)\
+            .sort_stats("cumulative").print_stats(40)
+        with open(arquivo + ".json", "w") as saida:
+            json.dump({**dados, "sql": sql, "resumo": resumo.getvalue()},
+                      saida, ensure_ascii=False, indent=2, default=str)
+        return self.id
@@ -1,10 +1,23 @@
 from schemas.error import ErrorSchema
 
+from schemas.paginacao import PaginacaoSchema, codifica_cursor, decodifica_cursor
+
+from schemas.busca import BuscaTextoSchema
+
 from schemas.agendamento import AgendamentoSchema, AgendamentoBuscaSchema, ListagemAgendamentoSchema,\
                                 AgendamentoViewSchema, apresenta_agendamento,apresenta_agendamentos,\
+                                apresenta_linhas_agendamentos,\
                                 AgendamentoDelSchema, AgendamentoBuscaDelSchema, AgendamentoBuscaClienteSchema,\
                                 AgendamentoBuscaProfissionalSchema, AgendamentoBuscaServicoSchema,\
-                                AgendamentoBuscaIdSchema, AgendamentoEditSchema
+                                AgendamentoBuscaIdSchema, AgendamentoEditSchema,\
+                                AgendamentoListagemBuscaSchema, AgendamentoExportacaoSchema,\
+                                AgendamentoFiltroSchema,\
+                                exporta_agendamentos_ndjson, exporta_agendamentos_csv,\
+                                AgendamentoLoteSchema, AgendamentoLoteEditSchema, AgendamentoLoteDelSchema,\
+                                AgendamentoLoteResultadoSchema, apresenta_resultado_lote
+
+from schemas.disponibilidade import DisponibilidadeBuscaSchema, DisponibilidadeViewSchema,\
+                                    apresenta_disponibilidade
 
 from schemas.cliente import ClienteSchema, ClienteBuscaSchema, ListagemClienteSchema,\
                             ClienteViewSchema, apresenta_cliente, apresenta_clientes,\
@@ -17,3 +30,7 @@ from schemas.profissional import ProfissionalSchema, ProfissionalBuscaSchema, Li
 from schemas.servico import ServicoSchema, ServicoBuscaSchema, ListagemServicoSchema,\
                             ServicoViewSchema, apresenta_servico, apresenta_servicos,\
                             ServicoDelSchema,ServicoEditSchema, ServicoBuscaDeleteSchema
+
+from schemas.relatorio import RelatorioBuscaSchema, FaturamentoBuscaSchema, FaturamentoViewSchema,\
+                              RelatorioFaturamentoSchema, OcupacaoViewSchema, RelatorioOcupacaoSchema,\
+                              apresenta_faturamento, apresenta_ocupacao
@@ -1,10 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from model.agendamento import Agendamento
 from model.servico import Servico
-from typing import List
+from typing import Iterable, List, Literal, Optional
+import csv
+import io
+import json
 from datetime import datetime
 
 from model.cliente import Cliente
+from schemas.paginacao import PaginacaoSchema
 
 
 class AgendamentoSchema(BaseModel):
@@ -57,7 +61,32 @@ class AgendamentoBuscaServicoSchema(BaseModel):
     servico_id = 1
 
 
-def apresenta_agendamentos(agendamentos: List[Agendamento]):
+class AgendamentoFiltroSchema(BaseModel):
+    """ Define os filtros das consultas de agendamentos. As datas seguem o
+        formato dd/mm/aaaa hh:mm:ss e todos os filtros são opcionais.
+
+    """
+    data_inicio: Optional[str] = None
+    data_fim: Optional[str] = None
+    cliente_id: Optional[int] = None
+    profissional_id: Optional[int] = None
+    servico_id: Optional[int] = None
+
+
+class AgendamentoListagemBuscaSchema(PaginacaoSchema, AgendamentoFiltroSchema):
+    """ Define os filtros e a paginação da listagem de agendamentos. """
+
+
+class AgendamentoExportacaoSchema(AgendamentoFiltroSchema):
+    """ Define os filtros e o formato (ndjson ou csv) da exportação
+        de agendamentos.
+
+    """
+    formato: Literal["ndjson", "csv"] = "ndjson"
+
+
+def apresenta_agendamentos(agendamentos: List[Agendamento],
+                           next_cursor: Optional[str] = None):
     """ Retorna uma representação do agendamento seguindo o schema definido em
         AgendamentoViewSchema.
 
@@ -78,7 +107,19 @@ def apresenta_agendamentos(agendamentos: List[Agendamento]):
             "valor_servico": agendamento.servico.valor
         })
 
-    return {"agendamentos": result}
+    return {"agendamentos": result, "next_cursor": next_cursor}
+
+
+def apresenta_linhas_agendamentos(linhas: list,
+                                  next_cursor: Optional[str] = None):
+    """ Retorna a representação dos agendamentos lidos por
+        consulta_linhas_agendamentos, cujas colunas já têm os nomes do
+        AgendamentoViewSchema.
+
+    """
+    campos = linhas[0]._fields if linhas else ()
+    return {"agendamentos": [dict(zip(campos, linha)) for linha in linhas],
+            "next_cursor": next_cursor}
 
 
 class AgendamentoViewSchema(BaseModel):
@@ -99,6 +140,7 @@ class ListagemAgendamentoSchema(BaseModel):
     """ Define como uma listagem de agendamentos será retornada.
     """
     agendamentos: List[AgendamentoViewSchema]
+    next_cursor: Optional[str] = None
 
 
 class AgendamentoBuscaDelSchema(BaseModel):
@@ -128,6 +170,54 @@ class AgendamentoEditSchema(BaseModel):
     observacao: str = ''
 
 
+# quantidade máxima de itens aceitos em cada lote
+LIMITE_LOTE = 10000
+
+
+class AgendamentoLoteSchema(BaseModel):
+    """ Define como um lote de novos agendamentos deve ser inserido """
+    agendamentos: List[AgendamentoSchema] = Field(..., max_items=LIMITE_LOTE)
+
+
+class AgendamentoLoteEditSchema(BaseModel):
+    """ Define como um lote de agendamentos deve ser editado """
+    agendamentos: List[AgendamentoEditSchema] = Field(...,
+                                                      max_items=LIMITE_LOTE)
+
+
+class AgendamentoLoteDelSchema(BaseModel):
+    """ Define como um lote de agendamentos deve ser excluído, pelo codigo
+        dos agendamentos.
+
+    """
+    ids: List[int] = Field(..., max_items=LIMITE_LOTE)
+
+
+class AgendamentoLoteErroSchema(BaseModel):
+    """ Define como o erro de um item do lote será retornado. O indice é a
+        posição do item na lista enviada.
+
+    """
+    indice: int = 0
+    message: str = ""
+
+
+class AgendamentoLoteResultadoSchema(BaseModel):
+    """ Define como o resultado do processamento de um lote será retornado
+    """
+    total: int = 1
+    processados: int = 1
+    erros: List[AgendamentoLoteErroSchema] = []
+
+
+def apresenta_resultado_lote(total: int, processados: int, erros: list):
+    """ Retorna uma representação do resultado do lote seguindo o schema
+        definido em AgendamentoLoteResultadoSchema.
+
+    """
+    return {"total": total, "processados": processados, "erros": erros}
+
+
 def apresenta_agendamento(agendamento: Agendamento):
     """ Retorna uma representação do agendamento seguindo o schema definido em
         AgendamentoViewSchema.
@@ -145,3 +235,61 @@ def apresenta_agendamento(agendamento: Agendamento):
         "descricao_servico": agendamento.servico.descricao,
         "valor_servico": agendamento.servico.valor
     }
+
+
+# colunas da exportação, na mesma ordem do AgendamentoViewSchema
+COLUNAS_EXPORTACAO = ["agenda_id", "data_agenda", "observacao", "cliente_id",
+                      "profissional_id", "servico_id", "cliente",
+                      "profissional", "descricao_servico", "valor_servico"]
+
+# quantidade de registros agrupados em cada bloco enviado ao cliente
+TAMANHO_BLOCO_EXPORTACAO = 500
+
+
+def _linha_exportacao(agendamento):
+    """ Retorna os dados de um agendamento (Row de
+        consulta_linhas_agendamentos) para a exportação, com a data no
+        formato ISO 8601.
+
+    """
+    linha = agendamento._asdict()
+    if linha["data_agenda"] is not None:
+        linha["data_agenda"] = linha["data_agenda"].isoformat()
+    return linha
+
+
+def exporta_agendamentos_ndjson(agendamentos: Iterable):
+    """ Gera a exportação dos agendamentos em NDJSON (um objeto JSON por
+        linha), em blocos, sem manter a listagem inteira em memória.
+
+    """
+    bloco = []
+    for agendamento in agendamentos:
+        bloco.append(json.dumps(_linha_exportacao(agendamento),
+                                ensure_ascii=False))
+        if len(bloco) >= TAMANHO_BLOCO_EXPORTACAO:
+            yield "\n".join(bloco) + "\n"
+            bloco = []
+    if bloco:
+        yield "\n".join(bloco) + "\n"
+
+
+def exporta_agendamentos_csv(agendamentos: Iterable):
+    """ Gera a exportação dos agendamentos em CSV com cabeçalho, em blocos,
+        sem manter a listagem inteira em memória.
+
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUNAS_EXPORTACAO)
+    writer.writeheader()
+    linhas = 0
+    for agendamento in agendamentos:
+        writer.writerow(_linha_exportacao(agendamento))
+        linhas += 1
+        if linhas >= TAMANHO_BLOCO_EXPORTACAO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            linhas = 0
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+
+
+# limite máximo de registros devolvidos pela busca
+LIMITE_BUSCA = 50
+
+
+class BuscaTextoSchema(BaseModel):
+    """ Define a busca por parte do nome (ou da descrição), sem diferenciar
+        acentos e maiúsculas. Cada palavra do termo pode estar incompleta.
+
+    """
+    termo: str = Field("joao sil", min_length=1, max_length=150)
+    limit: int = Field(10, ge=1, le=LIMITE_BUSCA)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from model.cliente import Cliente
-from typing import List
+from typing import List, Optional
 from model import Base
 
 
@@ -33,9 +33,11 @@ class ClenteBuscaDeleteSchema(BaseModel):
 class ListagemClienteSchema(BaseModel):
     """ Define como uma listagem de clientes que será retornada."""
     clientes: List[ClienteListaSchema]
+    next_cursor: Optional[str] = None
 
 
-def apresenta_clientes(clientes: List[Cliente]):
+def apresenta_clientes(clientes: List[Cliente],
+                       next_cursor: Optional[str] = None):
     """ Retorna uma representação do cliente seguido o schema definido em
         ClienteViewSchema
     """
@@ -45,7 +47,7 @@ def apresenta_clientes(clientes: List[Cliente]):
             "id": cliente.id,
             "nome": cliente.nome
         })
-    return {"clientes": result}
+    return {"clientes": result, "next_cursor": next_cursor}
 
 
 class ClienteViewSchema(BaseModel):
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+
+
+class DisponibilidadeBuscaSchema(BaseModel):
+    """ Define como deve ser a estrutura da busca por horários livres. As
+        datas seguem o formato dd/mm/aaaa e o período inclui as duas datas.
+
+    """
+    profissional_id: int = 1
+    servico_id: int = 1
+    data_inicio: str = "03/04/2023"
+    data_fim: str = "08/04/2023"
+    intervalo: int = Field(30, ge=5, le=240,
+                           description="minutos entre os horários")
+
+
+class DisponibilidadeViewSchema(BaseModel):
+    """ Define como os horários livres serão retornados """
+    profissional_id: int = 1
+    servico_id: int = 1
+    duracao: int = 30
+    horarios: List[str] = ["03/04/2023 08:00:00"]
+
+
+def apresenta_disponibilidade(profissional_id: int, servico_id: int,
+                              duracao: int, horarios: List[datetime]):
+    """ Retorna uma representação dos horários livres seguindo o schema
+        definido em DisponibilidadeViewSchema, no mesmo formato de data
+        aceito pela inclusão de agendamento.
+
+    """
+    return {
+        "profissional_id": profissional_id,
+        "servico_id": servico_id,
+        "duracao": duracao,
+        "horarios": [horario.strftime("%d/%m/%Y %H:%M:%S")
+                     for horario in horarios]
+    }
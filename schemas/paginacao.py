@@ -0,0 +1,51 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Optional
+import json
+
+from pydantic import BaseModel, Field
+
+
+# limite máximo de registros devolvidos em uma página da listagem
+LIMITE_MAXIMO = 1000
+
+
+class PaginacaoSchema(BaseModel):
+    """ Define os parâmetros de paginação das listagens. O cursor é o valor
+        de next_cursor devolvido pela página anterior.
+
+    """
+    limit: int = Field(100, ge=1, le=LIMITE_MAXIMO)
+    cursor: Optional[str] = None
+
+
+def codifica_cursor(*valores) -> str:
+    """ Gera um cursor opaco a partir dos valores da chave do último registro
+        da página.
+
+    """
+    texto = json.dumps(valores, separators=(",", ":"))
+    return urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodifica_cursor(cursor: str, *tipos) -> list:
+    """ Recupera os valores da chave gravados no cursor.
+
+        Argumentos:
+            tipos: tipo de cada coluna da chave de ordenação, na ordem da
+                   ordenação (por exemplo str, int para data e codigo)
+
+        Gera ValueError quando o cursor não foi gerado pela API: valores
+        que não formam uma lista com um valor do tipo esperado para cada
+        coluna da chave.
+    """
+    try:
+        valores = json.loads(urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("cursor inválido")
+    if not isinstance(valores, list) or len(valores) != len(tipos):
+        raise ValueError("cursor inválido")
+    for valor, tipo in zip(valores, tipos):
+        # bool é subclasse de int no python, mas não é um codigo válido
+        if not isinstance(valor, tipo) or isinstance(valor, bool):
+            raise ValueError("cursor inválido")
+    return valores
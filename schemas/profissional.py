@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from model.profissional import Profissional
-from typing import List
+from typing import List, Optional
 from model import Base
 
 
@@ -36,9 +36,11 @@ class ProfissionalBuscaExclusaoSchema(BaseModel):
 class ListagemProfissionalSchema(BaseModel):
     """Define como uma listagem de profissionais que será retornada. """
     profissionais: List[ClienteListaSchema]
+    next_cursor: Optional[str] = None
 
 
-def apresenta_profissionais(profissionais: List[Profissional]):
+def apresenta_profissionais(profissionais: List[Profissional],
+                            next_cursor: Optional[str] = None):
     """ Retorna uma representação do profissional seguido o schema definido em
         ProfissionalViewSchema
 
@@ -49,7 +51,7 @@ def apresenta_profissionais(profissionais: List[Profissional]):
             "id": profissional.id,
             "nome": profissional.nome
         })
-    return {"profissionais": result}
+    return {"profissionais": result, "next_cursor": next_cursor}
 
 
 class ProfissionalViewSchema(BaseModel):
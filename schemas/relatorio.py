@@ -0,0 +1,99 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+
+class RelatorioBuscaSchema(BaseModel):
+    """ Define o período dos relatórios. As datas seguem o formato
+        dd/mm/aaaa e o período inclui as duas datas.
+
+    """
+    data_inicio: str = "02/01/2023"
+    data_fim: str = "31/01/2023"
+    profissional_id: Optional[int] = None
+
+
+class FaturamentoBuscaSchema(RelatorioBuscaSchema):
+    """ Define o período, o agrupamento (por profissional ou por serviço) e
+        os filtros do relatório de faturamento.
+
+    """
+    agrupamento: Literal["profissional", "servico"] = "profissional"
+    servico_id: Optional[int] = None
+
+
+class FaturamentoViewSchema(BaseModel):
+    """ Define como o faturamento de um dia será retornado. O codigo e o
+        nome são do profissional ou do serviço, conforme o agrupamento.
+
+    """
+    dia: str = "02/01/2023"
+    codigo: int = 1
+    nome: str = "Carlos"
+    agendamentos: int = 1
+    faturamento: float = 10.00
+
+
+class RelatorioFaturamentoSchema(BaseModel):
+    """ Define como o relatório de faturamento será retornado. """
+    agrupamento: str = "profissional"
+    total: float = 10.00
+    faturamento: List[FaturamentoViewSchema]
+
+
+class OcupacaoViewSchema(BaseModel):
+    """ Define como a ocupação de um profissional em um dia será retornada.
+        A ocupação é a fração do expediente com agendamentos (vazia nos
+        dias fora do expediente).
+
+    """
+    dia: str = "02/01/2023"
+    profissional_id: int = 1
+    profissional: str = "Carlos"
+    agendamentos: int = 1
+    minutos_agendados: int = 30
+    minutos_expediente: int = 600
+    ocupacao: Optional[float] = 0.05
+
+
+class RelatorioOcupacaoSchema(BaseModel):
+    """ Define como o relatório de ocupação será retornado. """
+    ocupacao: List[OcupacaoViewSchema]
+
+
+def apresenta_faturamento(agrupamento: str, linhas: list):
+    """ Retorna uma representação do faturamento seguindo o schema definido
+        em RelatorioFaturamentoSchema.
+
+    """
+    result = []
+    for dia, codigo, nome, agendamentos, valor in linhas:
+        result.append({
+            "dia": dia.strftime("%d/%m/%Y"),
+            "codigo": codigo,
+            "nome": nome,
+            "agendamentos": agendamentos,
+            "faturamento": round(valor or 0, 2)
+        })
+    return {"agrupamento": agrupamento,
+            "total": round(sum(item["faturamento"] for item in result), 2),
+            "faturamento": result}
+
+
+def apresenta_ocupacao(linhas: list):
+    """ Retorna uma representação da ocupação seguindo o schema definido em
+        RelatorioOcupacaoSchema.
+
+    """
+    result = []
+    for dia, codigo, nome, agendamentos, minutos, expediente in linhas:
+        result.append({
+            "dia": dia.strftime("%d/%m/%Y"),
+            "profissional_id": codigo,
+            "profissional": nome,
+            "agendamentos": agendamentos,
+            "minutos_agendados": minutos,
+            "minutos_expediente": expediente,
+            "ocupacao": round(minutos / expediente, 4) if expediente
+            else None
+        })
+    return {"ocupacao": result}
@@ -1,12 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from model.servico import Servico
-from typing import List
+from typing import List, Optional
 
 
 class ServicoSchema(BaseModel):
     """Define com um novo serviço a ser inserido """
     descricao: str = "Corte de cabelo"
     valor: float = 10.00
+    duracao: int = Field(30, ge=1, description="duração em minutos")
 
 
 class ServicoBuscaSchema(BaseModel):
@@ -26,13 +27,19 @@ class ServicoBuscaDeleteSchema(BaseModel):
 
 
 class ServicoEditSchema(BaseModel):
-    """ Define como editar um servico """
+    """ Define como editar um servico. Sem a duração, a duração cadastrada
+        é mantida.
+
+    """
     id: int = 1
     descricao: str = "Escova"
     valor: float = 10.00
+    duracao: Optional[int] = Field(None, ge=1,
+                                   description="duração em minutos")
 
 
-def apresenta_servicos(servicos: List[Servico]):
+def apresenta_servicos(servicos: List[Servico],
+                       next_cursor: Optional[str] = None):
     """ Retorna uma representação do servico seguido o schema definido em
         ServicoViewSchema
 
@@ -42,9 +49,10 @@ def apresenta_servicos(servicos: List[Servico]):
         result.append({
             "id": servico.id,
             "descricao": servico.descricao,
-            "valor": servico.valor
+            "valor": servico.valor,
+            "duracao": servico.duracao
         })
-    return {"servicos": result}
+    return {"servicos": result, "next_cursor": next_cursor}
 
 
 class ServicoViewSchema(BaseModel):
@@ -52,11 +60,13 @@ class ServicoViewSchema(BaseModel):
     id: int = 1
     descricao: str = "Corte masculino"
     valor: float = 10.00
+    duracao: int = 30
 
 
 class ListagemServicoSchema(BaseModel):
     """ Define como uma listagem de serviços que será retornada. """
     servicos: List[ServicoViewSchema]
+    next_cursor: Optional[str] = None
 
 
 class ServicoDelSchema(BaseModel):
@@ -76,5 +86,6 @@ def apresenta_servico(servico: Servico):
     return {
         "id": servico.id,
         "descricao": servico.descricao,
-        "valor": servico.valor
+        "valor": servico.valor,
+        "duracao": servico.duracao
     }
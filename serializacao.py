@@ -0,0 +1,135 @@
+""" Serialização json das respostas da API.
+
+    As respostas em dicionário são serializadas pelo codificador escolhido
+    em JSON_CODIFICADOR: "orjson" (padrão, quando a biblioteca está
+    instalada) ou "padrao", o json da biblioteca padrão com as mesmas
+    opções do jsonify do Flask. Os dois codificadores geram o mesmo json:
+    datas no formato http (como o Flask), Decimal e UUID como texto e as
+    tuplas Row das consultas por colunas como objetos.
+"""
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from functools import lru_cache
+from uuid import UUID
+import json
+import os
+
+from flask import current_app
+from flask.json import JSONEncoder
+from sqlalchemy.engine import Row
+
+from logger import logger
+
+try:
+    # dependência opcional, sem ela as respostas usam a biblioteca padrão
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DIAS_HTTP = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MESES_HTTP = (None, "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug",
+              "Sep", "Oct", "Nov", "Dec")
+
+
+@lru_cache(maxsize=4096)
+def data_http(valor: date) -> str:
+    """ Mesmo resultado do werkzeug.http.http_date (datas sem fuso são
+        consideradas UTC), sem passar pelo email.utils. Os agendamentos se
+        repetem nos mesmos horários, então o texto de cada data é guardado
+        em cache.
+
+    """
+    if not isinstance(valor, datetime):
+        valor = datetime.combine(valor, time())
+    elif valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc)
+    return f"{DIAS_HTTP[valor.weekday()]}, {valor.day:02d} "\
+        f"{MESES_HTTP[valor.month]} {valor.year:04d} {valor.hour:02d}:"\
+        f"{valor.minute:02d}:{valor.second:02d} GMT"
+
+
+def converte(valor):
+    """ Converte os valores que o json não representa diretamente, da
+        mesma forma que o JSONEncoder do Flask, além das tuplas Row.
+
+    """
+    if isinstance(valor, Row):
+        return dict(zip(valor._fields, valor))
+    if isinstance(valor, date):
+        return data_http(valor)
+    if isinstance(valor, (Decimal, UUID)):
+        return str(valor)
+    if is_dataclass(valor):
+        return asdict(valor)
+    if hasattr(valor, "__html__"):
+        return str(valor.__html__())
+    raise TypeError(f"Object of type {type(valor).__name__} "
+                    "is not JSON serializable")
+
+
+class CodificadorJSON(JSONEncoder):
+    """ JSONEncoder do Flask que também serializa as tuplas Row. """
+
+    def default(self, o):
+        if isinstance(o, Row):
+            return dict(zip(o._fields, o))
+        if isinstance(o, date):
+            return data_http(o)
+        return super().default(o)
+
+
+def codifica_padrao(dados, indenta: bool) -> bytes:
+    """ Serializa com o json da biblioteca padrão, como o jsonify. """
+    config = current_app.config
+    texto = json.dumps(dados, cls=CodificadorJSON,
+                       ensure_ascii=config["JSON_AS_ASCII"],
+                       sort_keys=config["JSON_SORT_KEYS"],
+                       indent=2 if indenta else None,
+                       separators=(", ", ": ") if indenta else (",", ":"))
+    return f"{texto}\n".encode()
+
+
+def codifica_orjson(dados, indenta: bool) -> bytes:
+    """ Serializa com o orjson. O texto é sempre utf-8, sem os escapes
+        \\uXXXX do JSON_AS_ASCII.
+
+    """
+    # as datas passam por converte para manter o formato http do Flask
+    opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS |\
+        orjson.OPT_APPEND_NEWLINE
+    if current_app.config["JSON_SORT_KEYS"]:
+        opcoes |= orjson.OPT_SORT_KEYS
+    if indenta:
+        opcoes |= orjson.OPT_INDENT_2
+    return orjson.dumps(dados, default=converte, option=opcoes)
+
+
+# nome -> função que serializa os dados em bytes
+codificadores = {"padrao": codifica_padrao}
+if orjson is not None:
+    codificadores["orjson"] = codifica_orjson
+
+nome_codificador = os.environ.get("JSON_CODIFICADOR", "orjson")
+if nome_codificador not in codificadores:
+    logger.warning("Codificador json %s indisponível, usando o padrao",
+                   nome_codificador)
+    nome_codificador = "padrao"
+codifica = codificadores[nome_codificador]
+
+
+def resposta_json(dados, status: int = 200):
+    """ Resposta json com o codificador configurado, equivalente ao
+        jsonify do Flask.
+
+    """
+    indenta = current_app.config["JSONIFY_PRETTYPRINT_REGULAR"] or\
+        current_app.debug
+    response = current_app.response_class(
+        codifica(dados, indenta), status=status,
+        mimetype=current_app.config["JSONIFY_MIMETYPE"])
+    # dados originais, para quem precisa deles (log de acesso) não ter que
+    # desserializar o corpo
+    response.dados = dados
+    return response
@@ -0,0 +1,90 @@
+""" Testes da API.
+
+    A url da base precisa estar definida antes de importar o model, então
+    os testes usam uma base sqlite temporária, migrada e populada com os
+    dados sintéticos do model.gerador. Cada classe de testes recebe a base
+    no estado inicial (prepara_base no setUpClass), sem depender das
+    alterações feitas pelos outros módulos nem da ordem de execução. Os
+    logs também ficam no diretório temporário, fora do log/ do projeto.
+
+    Execução, a partir da raiz do projeto:
+        python -m pytest -q tests
+    ou
+        python -m nose2
+"""
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+temporario = tempfile.mkdtemp(prefix="testes_api_")
+os.environ["DB_URL"] = "sqlite:///" + os.path.join(temporario,
+                                                   "testes.sqlite3")
+os.environ["LOG_DIR"] = os.path.join(temporario, "log")
+# o log de acesso grava um arquivo por requisição
+os.environ.setdefault("LOG_ACESSO", "0")
+
+# volume da base de testes
+CLIENTES = 50
+PROFISSIONAIS = 5
+SERVICOS = 5
+AGENDAMENTOS = 500
+
+# cópia em memória da base recém-populada
+_inicial = None
+
+
+def prepara_base():
+    """ Deixa a base de testes no estado inicial: na primeira chamada a
+        migra, popula e guarda uma cópia em memória; nas seguintes restaura
+        a cópia (backup do sqlite), descartando as alterações dos testes
+        anteriores. Os itens do cache de consultas também são descartados.
+
+        Retorna a engine da base.
+    """
+    global _inicial
+    from model import engine, Session, migra, gera_dados
+    from cache import cache
+
+    Session.remove()
+    engine.dispose()
+    if _inicial is None:
+        migra(engine)
+        gera_dados(engine, CLIENTES, PROFISSIONAIS, SERVICOS, AGENDAMENTOS)
+        engine.dispose()
+    base = sqlite3.connect(engine.url.database)
+    try:
+        if _inicial is None:
+            _inicial = sqlite3.connect(":memory:")
+            base.backup(_inicial)
+        else:
+            _inicial.backup(base)
+    finally:
+        base.close()
+    for entidade in ("cliente", "profissional", "servico"):
+        cache.invalida(entidade)
+    return engine
+
+
+@contextmanager
+def conta_comandos(engine):
+    """ Registra os comandos SQL enviados à base dentro do bloco, como
+        pares (comando, parâmetros).
+
+        Uso:
+            with conta_comandos(engine) as comandos:
+                ...
+            len(comandos)
+    """
+    from sqlalchemy import event
+
+    comandos = []
+
+    def registra(conn, cursor, statement, parameters, context, executemany):
+        comandos.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", registra)
+    try:
+        yield comandos
+    finally:
+        event.remove(engine, "before_cursor_execute", registra)
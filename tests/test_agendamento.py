@@ -0,0 +1,98 @@
+""" Regras de horário dos agendamentos e edição de serviços: a edição
+    grava a nova data, um profissional nunca tem dois agendamentos
+    sobrepostos (nem do mesmo cliente) e a edição de um serviço sem a
+    duração mantém a duração cadastrada.
+"""
+import unittest
+
+from tests import prepara_base
+
+
+class TestAgendamento(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        prepara_base()
+        from app import create_app
+
+        cls.cliente = create_app().test_client()
+
+    def inclui(self, data_agenda: str, cliente_id: int,
+               profissional_id: int, servico_id: int = 1):
+        return self.cliente.post("/agendamento", data={
+            "data_agenda": data_agenda, "cliente_id": cliente_id,
+            "profissional_id": profissional_id, "servico_id": servico_id,
+            "observacao": "teste"})
+
+    def test_edicao_grava_a_data(self):
+        inclusao = self.inclui("04/01/2100 10:00:00", 1, 1)
+        self.assertEqual(inclusao.status_code, 200, inclusao.data)
+        codigo = inclusao.get_json()["agenda_id"]
+
+        edicao = self.cliente.put("/agendamento", data={
+            "id": codigo, "data_agenda": "2100-01-05 10:00:00",
+            "cliente_id": 1, "profissional_id": 1, "servico_id": 1,
+            "observacao": "teste"})
+        self.assertEqual(edicao.status_code, 204, edicao.data)
+        agendamento = self.cliente.get(
+            "/agendamento?cliente_id=1&data_agenda=05/01/2100 10:00:00")
+        self.assertEqual(agendamento.status_code, 200)
+        self.assertEqual(agendamento.get_json()["agenda_id"], codigo)
+
+        # o horário novo fica ocupado e o antigo, livre
+        self.assertEqual(self.inclui("05/01/2100 10:00:00", 2, 1)
+                         .status_code, 409)
+        self.assertEqual(self.inclui("04/01/2100 10:00:00", 2, 1)
+                         .status_code, 200)
+
+    def test_edicao_para_horario_ocupado(self):
+        self.assertEqual(self.inclui("04/02/2100 10:00:00", 1, 4)
+                         .status_code, 200)
+        inclusao = self.inclui("04/02/2100 14:00:00", 2, 4)
+        codigo = inclusao.get_json()["agenda_id"]
+
+        # mesmo conflito da inclusão, com o mesmo código 409
+        edicao = self.cliente.put("/agendamento", data={
+            "id": codigo, "data_agenda": "2100-02-04 10:10:00",
+            "cliente_id": 2, "profissional_id": 4, "servico_id": 1,
+            "observacao": "teste"})
+        self.assertEqual(edicao.status_code, 409, edicao.data)
+        self.assertEqual(self.inclui("04/02/2100 10:10:00", 3, 4)
+                         .status_code, 409)
+
+    def test_edicao_em_lote_grava_a_data(self):
+        inclusao = self.inclui("04/03/2100 10:00:00", 1, 3)
+        codigo = inclusao.get_json()["agenda_id"]
+
+        lote = self.cliente.put("/agendamentos/lote", json={"agendamentos": [{
+            "id": codigo, "data_agenda": "2100-03-05 10:00:00",
+            "cliente_id": 1, "profissional_id": 3, "servico_id": 1,
+            "observacao": "teste"}]})
+        self.assertEqual(lote.get_json()["processados"], 1, lote.data)
+        self.assertEqual(self.inclui("05/03/2100 10:00:00", 2, 3)
+                         .status_code, 409)
+
+    def test_mesmo_cliente_nao_sobrepoe(self):
+        self.assertEqual(self.inclui("01/02/2100 10:00:00", 1, 2)
+                         .status_code, 200)
+        sobreposto = self.inclui("01/02/2100 10:05:00", 1, 2, servico_id=2)
+        self.assertEqual(sobreposto.status_code, 409, sobreposto.data)
+
+    def test_edicao_de_servico_mantem_duracao(self):
+        inclusao = self.cliente.post("/servico", data={
+            "descricao": "Servico do teste de duracao", "valor": 50,
+            "duracao": 45})
+        self.assertEqual(inclusao.status_code, 201, inclusao.data)
+        codigo = inclusao.get_json()["id"]
+
+        edicao = self.cliente.put("/servico", data={
+            "id": codigo, "descricao": "Servico do teste de duracao",
+            "valor": 60})
+        self.assertEqual(edicao.status_code, 204, edicao.data)
+        servico = self.cliente.get(
+            "/servico?descricao=Servico do teste de duracao").get_json()
+        self.assertEqual((servico["valor"], servico["duracao"]), (60, 45))
+
+
+if __name__ == "__main__":
+    unittest.main()
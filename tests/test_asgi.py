@@ -0,0 +1,108 @@
+""" Rotas assíncronas do modo ASGI: passam pelos mesmos hooks da aplicação
+    Flask (CORS, perfil X-Profile) e validam os parâmetros com a mesma
+    resposta 422 das rotas Flask. Importar o asgi não cria a aplicação.
+"""
+import asyncio
+import json
+import tempfile
+import unittest
+from urllib.parse import urlsplit
+
+from tests import prepara_base
+from tests.test_importacao import importa
+
+
+async def chama(aplicacao, url: str, cabecalhos: dict):
+    """ Envia uma requisição GET à aplicação ASGI e retorna o status, os
+        cabeçalhos e o corpo da resposta.
+
+    """
+    partes = urlsplit(url)
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": partes.path, "root_path": "",
+        "query_string": partes.query.encode(),
+        "headers": [(nome.lower().encode(), valor.encode())
+                    for nome, valor in cabecalhos.items()],
+        "server": ("localhost", 80), "client": ("127.0.0.1", 50000),
+    }
+    mensagens = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    await aplicacao(scope, receive, send)
+    inicio = mensagens[0]
+    return (inicio["status"],
+            {nome.decode(): valor.decode()
+             for nome, valor in inicio["headers"]},
+            b"".join(mensagem.get("body", b"") for mensagem in mensagens[1:]))
+
+
+class TestRotasAssincronas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        prepara_base()
+        import asgi
+
+        cls.asgi = asgi
+        cls.cliente = asgi.aplicacao().test_client()
+
+    def executa(self, *requisicoes):
+        """ Executa as requisições (url, cabeçalhos) em um único loop, que
+            também encerra as conexões da engine assíncrona.
+
+        """
+        async def todas():
+            try:
+                return [await chama(self.asgi.app, url, cabecalhos)
+                        for url, cabecalhos in requisicoes]
+            finally:
+                await self.asgi.engine_assincrona.dispose()
+        return asyncio.run(todas())
+
+    def test_importacao_sem_aplicacao(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            saida = importa("import os, asgi\n"
+                            "print(asgi.app_wsgi is None, os.listdir('.'))",
+                            cwd=diretorio).stdout
+        self.assertEqual(saida.splitlines()[-1], "True []")
+
+    def test_cabecalhos_cors(self):
+        origem = {"Origin": "http://localhost:3000"}
+        (status, cabecalhos, _), = self.executa(("/agendamentos", origem))
+        self.assertEqual(status, 200)
+        esperado = self.cliente.get("/agendamentos", headers=origem)
+        self.assertEqual(cabecalhos["access-control-allow-origin"],
+                         esperado.headers["Access-Control-Allow-Origin"])
+
+    def test_erro_de_validacao_igual_ao_flask(self):
+        (status, cabecalhos, corpo), = self.executa(
+            ("/agendamento_id?id=abc", {}))
+        esperado = self.cliente.get("/agendamento_id?id=abc")
+        self.assertEqual(status, 422)
+        self.assertEqual(esperado.status_code, 422)
+        self.assertEqual(cabecalhos["content-type"], "application/json")
+        self.assertEqual(json.loads(corpo), esperado.get_json())
+
+    def test_perfil_da_requisicao(self):
+        import perfilador
+
+        segredo, diretorio = perfilador.segredo, perfilador.diretorio
+        perfilador.segredo = "segredo-dos-testes"
+        perfilador.diretorio = tempfile.mkdtemp(prefix="perfis_")
+        try:
+            (status, cabecalhos, _), = self.executa(
+                ("/agendamento_id?id=1", {"X-Profile": "segredo-dos-testes"}))
+        finally:
+            perfilador.segredo, perfilador.diretorio = segredo, diretorio
+        self.assertEqual(status, 200)
+        self.assertIn("x-profile-id", cabecalhos)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+""" Busca de nomes: um nome que começa pelo termo é encontrado mesmo
+    cadastrado depois de mais nomes que a janela de candidatos.
+"""
+import unittest
+
+from tests import prepara_base
+
+
+class TestBuscaNomes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        prepara_base()
+        from model import Session, Cliente, busca_nomes
+        from model.busca import JANELA_BUSCA
+
+        cls.Session = Session
+        cls.Cliente = Cliente
+        cls.busca_nomes = staticmethod(busca_nomes)
+        session = Session()
+        # nomes que apenas contêm o termo, cadastrados antes do mais
+        # relevante
+        session.add_all([Cliente(nome=f"Maria Zuleica Teste {numero}")
+                         for numero in range(JANELA_BUSCA + 20)])
+        session.add(Cliente(nome="Zuleica Teste"))
+        session.commit()
+        Session.remove()
+
+    @classmethod
+    def tearDownClass(cls):
+        session = cls.Session()
+        session.query(cls.Cliente).filter(
+            cls.Cliente.nome.like("%Zuleica Teste%"))\
+            .delete(synchronize_session=False)
+        session.commit()
+        cls.Session.remove()
+
+    def test_nome_que_comeca_pelo_termo_fora_da_janela(self):
+        session = self.Session()
+        try:
+            encontrados = self.busca_nomes(session, self.Cliente, "zulei", 5)
+        finally:
+            self.Session.remove()
+        self.assertEqual(encontrados[0].nome, "Zuleica Teste")
+        self.assertEqual(len(encontrados), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
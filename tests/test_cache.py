@@ -0,0 +1,58 @@
+""" Consultas de cliente, profissional e serviço pelo cache: com o item em
+    cache a rota, inclusive a revalidação pelo ETag (304), não faz nenhum
+    acesso à base.
+"""
+import unittest
+
+from tests import prepara_base, conta_comandos
+
+
+class TestConsultaEmCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = prepara_base()
+        from app import create_app
+        from model import nome_gerado
+
+        cls.cliente = create_app().test_client()
+        cls.cliente.get("/")
+        cls.nome_gerado = staticmethod(nome_gerado)
+
+    def consulta(self, url: str, **cabecalhos):
+        with conta_comandos(self.engine) as comandos:
+            resposta = self.cliente.get(url, headers=cabecalhos)
+        return resposta, comandos
+
+    def test_consulta_em_cache_sem_acesso_a_base(self):
+        url = "/cliente?nome=" + self.nome_gerado(1)
+        primeira, _ = self.consulta(url)
+        self.assertEqual(primeira.status_code, 200)
+        etag = primeira.headers["ETag"]
+
+        segunda, comandos = self.consulta(url)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda.headers["ETag"], etag)
+        self.assertEqual(comandos, [])
+
+        nao_modificada, comandos = self.consulta(url, **{"If-None-Match":
+                                                         etag})
+        self.assertEqual(nao_modificada.status_code, 304)
+        self.assertEqual(comandos, [])
+
+    def test_alteracao_renova_o_etag(self):
+        url = "/cliente?nome=" + self.nome_gerado(2)
+        etag = self.consulta(url)[0].headers["ETag"]
+
+        edicao = self.cliente.put("/cliente", data={
+            "id": 3, "nome": "Cliente Renomeado Pelo Teste"})
+        self.assertEqual(edicao.status_code, 204)
+
+        resposta, comandos = self.consulta(url, **{"If-None-Match": etag})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta.headers["ETag"], etag)
+        self.assertTrue(comandos)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+""" Exclusão de clientes pela rota: acima de LIMITE_EXCLUSAO_ROTA
+    agendamentos (variável de ambiente EXCLUSAO_LIMITE_ROTA) a rota responde
+    409 e indica o 'flask purge', sem excluir nada. Os comandos da exclusão
+    entram na medição dos comandos SQL da requisição.
+"""
+import unittest
+
+from tests import prepara_base, conta_comandos
+
+
+class TestExclusaoCliente(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = prepara_base()
+        import app
+
+        cls.app = app
+        cls.cliente = app.create_app().test_client()
+
+    def setUp(self):
+        self.limite = self.app.LIMITE_EXCLUSAO_ROTA
+        self.app.LIMITE_EXCLUSAO_ROTA = 0
+
+    def tearDown(self):
+        self.app.LIMITE_EXCLUSAO_ROTA = self.limite
+
+    def test_historico_acima_do_limite(self):
+        from model import Session, Agendamento
+
+        codigo = Session().query(Agendamento.cliente_id).first()[0]
+        Session.remove()
+        resposta = self.cliente.delete("/cliente", data={"id": codigo})
+        self.assertEqual(resposta.status_code, 409)
+        self.assertIn(f"flask purge cliente {codigo}",
+                      resposta.get_json()["message"])
+        self.assertGreater(Session().query(Agendamento).filter(
+            Agendamento.cliente_id == codigo).count(), 0)
+        Session.remove()
+
+    def test_sem_agendamentos(self):
+        nome = "Cliente Sem Agendamentos Do Teste"
+        self.assertEqual(self.cliente.post(
+            "/cliente", data={"nome": nome}).status_code, 200)
+        codigo = self.cliente.get("/cliente", query_string={
+            "nome": nome}).get_json()["id"]
+        resposta = self.cliente.delete("/cliente", data={"id": codigo})
+        self.assertEqual(resposta.status_code, 204)
+
+
+    def test_comandos_da_exclusao_medidos(self):
+        self.app.LIMITE_EXCLUSAO_ROTA = self.limite
+        nome = "Cliente Com Agendamentos Do Teste"
+        self.cliente.post("/cliente", data={"nome": nome})
+        codigo = self.cliente.get("/cliente", query_string={
+            "nome": nome}).get_json()["id"]
+        for hora in (10, 11):
+            self.assertEqual(self.cliente.post("/agendamento", data={
+                "data_agenda": f"09/01/2100 {hora}:00:00",
+                "cliente_id": codigo, "profissional_id": 1,
+                "servico_id": 1, "observacao": "teste"}).status_code, 200)
+
+        with conta_comandos(self.engine) as comandos:
+            resposta = self.cliente.delete("/cliente", data={"id": codigo})
+        self.assertEqual(resposta.status_code, 204, resposta.data)
+        exclusoes = [comando for comando, _ in comandos
+                     if comando.lstrip().startswith("DELETE")]
+        # os agendamentos, em um lote, e o cliente
+        self.assertEqual(len(exclusoes), 2, comandos)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+""" Custo da importação da aplicação (python -X importtime): importar o
+    app.py deve caber no orçamento de tempo e não pode criar diretórios nem
+    threads, que ficam para o create_app().
+
+    O orçamento (ms) pode ser ajustado pela variável de ambiente
+    IMPORTACAO_LIMITE_MS em máquinas mais lentas.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# orçamento do tempo cumulativo da importação do app (ms)
+LIMITE_MS = float(os.environ.get("IMPORTACAO_LIMITE_MS", 1500))
+# importações medidas, vale a mais rápida
+REPETICOES = 3
+
+
+def importa(codigo: str, *opcoes, cwd: str = raiz):
+    """ Executa o código em um novo interpretador, com a raiz do projeto no
+        PYTHONPATH.
+
+    """
+    ambiente = dict(os.environ, PYTHONPATH=raiz)
+    return subprocess.run([sys.executable, *opcoes, "-c", codigo],
+                          cwd=cwd, env=ambiente, capture_output=True,
+                          text=True, check=True)
+
+
+def tempo_importacao_ms() -> float:
+    """ Tempo cumulativo (ms) da importação do módulo app informado pelo
+        -X importtime.
+
+    """
+    saida = importa("import app", "-X", "importtime").stderr
+    for linha in saida.splitlines():
+        # import time: self [us] | cumulative | imported package
+        campos = [campo.strip() for campo in linha.split("|")]
+        if len(campos) == 3 and campos[2] == "app":
+            return int(campos[1]) / 1000
+    raise AssertionError(f"importação do app não encontrada:\n{saida}")
+
+
+class TestImportacao(unittest.TestCase):
+
+    def test_tempo_de_importacao(self):
+        tempo = min(tempo_importacao_ms() for _ in range(REPETICOES))
+        self.assertLessEqual(
+            tempo, LIMITE_MS,
+            f"importar o app levou {tempo:.0f} ms (limite {LIMITE_MS:.0f} ms)")
+
+    def test_importacao_sem_efeitos(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            saida = importa(
+                "import json, os, threading\n"
+                "import app\n"
+                "print(json.dumps([threading.active_count(),"
+                " sorted(os.listdir('.'))]))", cwd=diretorio).stdout
+        threads, criados = json.loads(saida.splitlines()[-1])
+        self.assertEqual(threads, 1)
+        self.assertEqual(criados, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
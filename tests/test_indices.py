@@ -0,0 +1,71 @@
+""" Plano de execução (EXPLAIN QUERY PLAN) das consultas de agendamentos
+    por cliente, profissional e serviço e da conferência de conflito de
+    horário: todas devem usar os índices ix_agendamento_* da migração 2, e
+    não percorrer a tabela inteira.
+"""
+from datetime import datetime
+import unittest
+
+from tests import prepara_base, conta_comandos
+
+
+class TestIndicesAgendamento(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = prepara_base()
+        from app import create_app
+
+        cls.cliente = create_app().test_client()
+        cls.cliente.get("/")
+
+    def plano(self, comando: str, parametros) -> str:
+        with self.engine.connect() as conexao:
+            linhas = conexao.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + comando, parametros).all()
+        return "\n".join(linha[-1] for linha in linhas)
+
+    def planos_agendamento(self, comandos: list) -> list:
+        """ Planos dos comandos que leem a tabela agendamento. """
+        planos = [self.plano(comando, parametros)
+                  for comando, parametros in comandos
+                  if comando.lstrip().upper().startswith("SELECT") and
+                  "FROM agendamento" in comando]
+        self.assertTrue(planos, comandos)
+        return planos
+
+    def confere_indice(self, plano: str, indice: str):
+        self.assertIn(f"USING INDEX {indice}", plano.replace(
+            "USING COVERING INDEX", "USING INDEX"))
+        self.assertNotIn("SCAN agendamento", plano)
+
+    def test_consultas_por_cadastro(self):
+        for url, indice in (
+                ("/agendamento_cliente?cliente_id=1",
+                 "ix_agendamento_cliente_data"),
+                ("/agendamento_profissional?profissional_id=1",
+                 "ix_agendamento_profissional_data"),
+                ("/agendamento_servico?servico_id=1",
+                 "ix_agendamento_servico_data")):
+            with self.subTest(url=url):
+                with conta_comandos(self.engine) as comandos:
+                    resposta = self.cliente.get(url)
+                self.assertEqual(resposta.status_code, 200, resposta.data)
+                for plano in self.planos_agendamento(comandos):
+                    self.confere_indice(plano, indice)
+
+    def test_conflito_de_horario(self):
+        from model import Session, conflito_agenda
+
+        session = Session()
+        try:
+            with conta_comandos(self.engine) as comandos:
+                conflito_agenda(session, 1, datetime(2023, 1, 2, 9), 30)
+        finally:
+            Session.remove()
+        for plano in self.planos_agendamento(comandos):
+            self.confere_indice(plano, "ix_agendamento_profissional_data")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+""" Quantidade de comandos SQL das rotas que apresentam agendamentos: a
+    listagem deve ler os agendamentos com o cliente, o profissional e o
+    serviço em uma única consulta, sem um SELECT a mais por registro.
+"""
+import unittest
+
+from tests import prepara_base, conta_comandos
+
+
+class TestComandosListagem(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = prepara_base()
+        from app import create_app
+
+        cls.cliente = create_app().test_client()
+        # a primeira requisição também confere a versão da base
+        cls.cliente.get("/")
+
+    def comandos(self, url: str) -> list:
+        with conta_comandos(self.engine) as comandos:
+            resposta = self.cliente.get(url)
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+        return comandos
+
+    def test_listagem_nao_cresce_com_a_pagina(self):
+        pequena = self.comandos("/agendamentos?limit=5")
+        grande = self.comandos("/agendamentos?limit=500")
+        self.assertEqual(len(pequena), len(grande), grande)
+        # versão das tabelas (ETag) e a página de agendamentos
+        self.assertLessEqual(len(grande), 2, grande)
+
+    def test_listagem_filtrada(self):
+        comandos = self.comandos("/agendamentos?limit=500&profissional_id=1")
+        self.assertLessEqual(len(comandos), 2, comandos)
+
+    def test_consultas_de_um_agendamento(self):
+        for url in ("/agendamento_id?id=1",
+                    "/agendamento_cliente?cliente_id=1",
+                    "/agendamento_profissional?profissional_id=1",
+                    "/agendamento_servico?servico_id=1"):
+            with self.subTest(url=url):
+                comandos = self.comandos(url)
+                self.assertLessEqual(len(comandos), 2, comandos)
+
+
+class TestCursorInvalido(unittest.TestCase):
+    """ Cursores que não foram gerados pela API (json válido, mas com outro
+        formato) são recusados com o código 400.
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        prepara_base()
+        from app import create_app
+        from schemas import codifica_cursor
+
+        cls.cliente = create_app().test_client()
+        cls.codifica_cursor = staticmethod(codifica_cursor)
+
+    def test_cursores_invalidos(self):
+        cursores = {
+            "vazio": self.codifica_cursor(),
+            "objeto": self.codifica_cursor({"a": 1}),
+            "texto no codigo": self.codifica_cursor("1"),
+            "booleano": self.codifica_cursor(True),
+            "valores a mais": self.codifica_cursor(1, 2),
+        }
+        for rota in ("/clientes", "/profissionais", "/servicos",
+                     "/agendamentos"):
+            for nome, cursor in cursores.items():
+                with self.subTest(rota=rota, cursor=nome):
+                    resposta = self.cliente.get(rota, query_string={
+                        "cursor": cursor})
+                    self.assertEqual(resposta.status_code, 400,
+                                     resposta.data)
+                    self.assertIn("cursor inválido",
+                                  resposta.get_json()["message"])
+
+    def test_cursor_valido(self):
+        resposta = self.cliente.get("/clientes", query_string={
+            "cursor": self.codifica_cursor(1), "limit": 2})
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
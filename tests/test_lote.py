@@ -0,0 +1,63 @@
+""" Resultado da exclusão e da edição de agendamentos em lote: todo item
+    enviado é contado como processado ou como erro (total = processados +
+    erros) e um codigo repetido é processado uma única vez.
+"""
+import unittest
+
+from tests import prepara_base, AGENDAMENTOS
+
+
+class TestExclusaoLote(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        prepara_base()
+        from app import create_app
+
+        cls.cliente = create_app().test_client()
+
+    def test_codigos_repetidos_e_inexistentes(self):
+        ids = [AGENDAMENTOS, AGENDAMENTOS, AGENDAMENTOS + 1000,
+               AGENDAMENTOS]
+        resposta = self.cliente.delete("/agendamentos/lote",
+                                       json={"ids": ids})
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+        resultado = resposta.get_json()
+
+        self.assertEqual(resultado["total"], len(ids))
+        self.assertEqual(resultado["processados"], 1)
+        self.assertEqual([erro["indice"] for erro in resultado["erros"]],
+                         [1, 2, 3])
+        self.assertEqual(resultado["total"],
+                         resultado["processados"] + len(resultado["erros"]))
+
+
+    def test_edicao_com_codigo_repetido(self):
+        inclusao = self.cliente.post("/agendamento", data={
+            "data_agenda": "06/01/2100 10:00:00", "cliente_id": 1,
+            "profissional_id": 1, "servico_id": 1, "observacao": "teste"})
+        codigo = inclusao.get_json()["agenda_id"]
+        item = {"id": codigo, "cliente_id": 1, "profissional_id": 1,
+                "servico_id": 1, "observacao": "teste"}
+
+        resposta = self.cliente.put("/agendamentos/lote", json={
+            "agendamentos": [
+                dict(item, data_agenda="2100-01-07 10:00:00"),
+                dict(item, data_agenda="2100-01-08 10:00:00")]})
+        self.assertEqual(resposta.status_code, 200, resposta.data)
+        resultado = resposta.get_json()
+
+        self.assertEqual(resultado["total"], 2)
+        self.assertEqual(resultado["processados"], 1)
+        self.assertEqual([(erro["indice"], erro["message"])
+                          for erro in resultado["erros"]],
+                         [(1, "Agendamento informado mais de uma vez no "
+                              "lote")])
+        # vale o primeiro item do codigo
+        agendamento = self.cliente.get(
+            "/agendamento?cliente_id=1&data_agenda=07/01/2100 10:00:00")
+        self.assertEqual(agendamento.get_json()["agenda_id"], codigo)
+
+
+if __name__ == "__main__":
+    unittest.main()
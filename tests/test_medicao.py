@@ -0,0 +1,43 @@
+""" Medição dos comandos SQL: um comando recusado pela base (IntegrityError)
+    é contado e não deixa o seu início na conexão do pool, o que
+    desencontraria o tempo dos comandos seguintes.
+"""
+import time
+import unittest
+
+from tests import prepara_base
+
+
+class TestMedicaoComErro(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = prepara_base()
+
+    def test_comando_recusado(self):
+        from sqlalchemy.exc import IntegrityError
+        from model import inicia_medicao, encerra_medicao
+
+        inicio = time.perf_counter()
+        medicao = inicia_medicao()
+        try:
+            with self.engine.connect() as conexao:
+                with self.assertRaises(IntegrityError):
+                    # codigo já cadastrado
+                    conexao.exec_driver_sql(
+                        "INSERT INTO cliente (pk_cliente, nome) "
+                        "VALUES (1, 'Cliente Repetido Do Teste')")
+                self.assertEqual(conexao.info.get("inicio_comando"), [])
+                conexao.exec_driver_sql("SELECT 1").all()
+                self.assertEqual(conexao.info.get("inicio_comando"), [])
+        finally:
+            encerra_medicao()
+        decorrido = time.perf_counter() - inicio
+
+        self.assertEqual(medicao.comandos, 2)
+        self.assertGreater(medicao.tempo, 0)
+        self.assertLessEqual(medicao.tempo, decorrido)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+""" Migrações simultâneas: duas execuções do migra (dois 'flask migrate')
+    que leram a mesma versão antes do bloqueio de escrita aplicam cada
+    migração uma única vez, sem erro.
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+
+class TestMigracoesSimultaneas(unittest.TestCase):
+
+    def test_versao_lida_com_o_bloqueio(self):
+        from sqlalchemy import create_engine, event
+        from model import migracoes, migra, VERSAO_ATUAL
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            url = "sqlite:///" + os.path.join(diretorio, "migracao.sqlite3")
+            engine_a = create_engine(url)
+            engine_b = create_engine(
+                url, connect_args={"check_same_thread": False})
+            aguardando = threading.Event()
+
+            @event.listens_for(engine_b, "connect")
+            def observa(dbapi_connection, connection_record):
+                # a segunda execução chegou ao BEGIN IMMEDIATE e espera o
+                # bloqueio de escrita da primeira
+                dbapi_connection.set_trace_callback(
+                    lambda comando: comando.startswith("BEGIN IMMEDIATE")
+                    and aguardando.set())
+
+            resultados = {}
+
+            def segunda_execucao():
+                try:
+                    resultados["b"] = migra(engine_b)
+                except Exception as e:
+                    resultados["b"] = e
+
+            numero, descricao, primeira = migracoes.MIGRACOES[0]
+            segunda = threading.Thread(target=segunda_execucao)
+
+            def primeira_com_concorrencia(cursor):
+                # inicia a segunda execução, que lê a versão 0, durante a
+                # primeira migração da primeira execução
+                if threading.current_thread() is not segunda:
+                    segunda.start()
+                    self.assertTrue(aguardando.wait(10))
+                primeira(cursor)
+
+            originais = migracoes.MIGRACOES
+            migracoes.MIGRACOES = [(numero, descricao,
+                                    primeira_com_concorrencia)]\
+                + originais[1:]
+            try:
+                resultados["a"] = migra(engine_a)
+            finally:
+                migracoes.MIGRACOES = originais
+                segunda.join()
+            with engine_a.connect() as conexao:
+                versoes = [versao for versao, in conexao.exec_driver_sql(
+                    "SELECT versao FROM schema_versao ORDER BY versao")]
+            engine_a.dispose()
+            engine_b.dispose()
+
+        self.assertNotIsInstance(resultados["b"], Exception)
+        aplicadas = sorted(numero for numero, _ in
+                           resultados["a"] + resultados["b"])
+        self.assertEqual(aplicadas, list(range(1, VERSAO_ATUAL + 1)))
+        self.assertEqual(versoes, aplicadas)
+
+
+if __name__ == "__main__":
+    unittest.main()